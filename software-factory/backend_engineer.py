@@ -8,25 +8,34 @@ This agent is responsible for:
 - Providing setup and run instructions
 """
 
-from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable, RunnableParallel
 from langchain_core.tools import Tool
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+from code_blocks import CodeBlock, CodeBlockStreamParser
+from streaming import TokenSink, astream_phase
+from token_budget import SectionCutoff, astream_until, plan_cutoff, stream_until
+import asyncio
 import os
+import threading
 
+# langchain_classic is slow to import and only needed in agent mode
+if TYPE_CHECKING:
+    from langchain_classic.agents import AgentExecutor
 
-class BackendEngineer:
-    """Backend Software Engineer Agent that designs and implements solutions."""
-    
-    def __init__(self, llm: BaseChatModel):
-        self.llm = llm
-        self.agent = self._create_agent()
-    
-    def _create_agent(self) -> AgentExecutor:
-        """Create the Backend Software Engineer agent."""
-        
-        system_prompt = """You are a Backend Software Engineer in a software development company.
+
+# Agent modes: "chain" answers in a single LLM call; "agent" runs the
+# tool-calling AgentExecutor
+MODES = ("chain", "agent")
+
+# Sections code generation relies on; a candidate without them is unusable
+REQUIRED_SECTIONS = ("architecture", "code")
+
+SYSTEM_PROMPT = """You are a Backend Software Engineer in a software development company.
 
 Your responsibilities:
 - Design the system architecture
@@ -65,8 +74,112 @@ When you receive requirements, produce a complete solution in the following form
 
 Generate complete, working code that can be executed immediately."""
 
+
+class CandidateScorer:
+    """
+    Checks an implementation candidate against the required format as it streams.
+    
+    A candidate passes when it has every required section, at least one
+    complete non-shell code block, and no unterminated block.
+    """
+    
+    def __init__(self):
+        self._parser = CodeBlockStreamParser()
+        self._blocks: List[CodeBlock] = []
+        self._finished = False
+    
+    def feed(self, text: str) -> None:
+        """Consume a chunk of the candidate's output."""
+        self._blocks.extend(self._parser.feed(text))
+    
+    def finish(self) -> Dict[str, Any]:
+        """Score the complete candidate."""
+        if not self._finished:
+            self._blocks.extend(self._parser.finish())
+            self._finished = True
+        missing = [
+            title for title in REQUIRED_SECTIONS
+            if not any(section.startswith(title) for section in self._parser.sections)
+        ]
+        code_blocks = sum(1 for block in self._blocks if block.complete and not block.is_shell)
+        incomplete = sum(1 for block in self._blocks if not block.complete)
+        return {
+            "passed": not missing and code_blocks > 0 and not incomplete,
+            "missing_sections": missing,
+            "code_blocks": code_blocks,
+            "incomplete_blocks": incomplete
+        }
+
+
+class BackendEngineer:
+    """Backend Software Engineer Agent that designs and implements solutions."""
+    
+    def __init__(self, llm: BaseChatModel, mode: str = "chain", stop_early: bool = False):
+        """
+        Args:
+            llm: Chat model to use
+            mode: "chain" for a single prompt -> LLM -> parser call, or "agent"
+                for the tool-calling AgentExecutor
+            stop_early: Stop generating once the architecture, project structure
+                and code are complete, before the setup and usage instructions
+                (chain mode only: an agent run cannot be cut short)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.llm = llm
+        self.mode = mode
+        self.stop_early = stop_early and mode == "chain"
+        self.agent = self._create_agent() if mode == "agent" else self._create_chain()
+        self._text_chain: Optional[Runnable] = None
+        self._candidate_chain: Optional[Runnable] = None
+    
+    @property
+    def text_chain(self) -> Runnable:
+        """Single-call chain streaming plain text, for generations stopped early; built on first use."""
+        if self._text_chain is None:
+            self._text_chain = self._prompt() | self.llm | StrOutputParser()
+        return self._text_chain
+    
+    @property
+    def candidate_chain(self) -> Runnable:
+        """
+        Single-call chain for speculative candidates, built on first use.
+        
+        Candidates always use a single call, even in agent mode: an agent run
+        cannot be scored token by token. They also bypass the response cache:
+        every candidate sends the same prompt, so cached candidates would all
+        be the same answer, and a cached model does not stream, so a
+        candidate could be neither scored nor cancelled while it generates.
+        """
+        if self._candidate_chain is None:
+            llm = self.llm
+            if llm.cache not in (None, False) or llm.disable_streaming:
+                llm = llm.model_copy(update={"cache": False, "disable_streaming": False})
+            self._candidate_chain = self._prompt() | llm | StrOutputParser()
+        return self._candidate_chain
+    
+    def _prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_PROMPT),
+            ("human", "{input}"),
+        ])
+    
+    def _create_chain(self) -> Runnable:
+        """
+        Create the single-call chain: prompt -> LLM -> output parser.
+        
+        `generate_code` is a no-op, so an agent run in which the model calls it
+        costs a second LLM call that resends the whole scratchpad, code
+        included. The chain returns the same {"output": ...} shape in one call.
+        """
+        return RunnableParallel(output=self._prompt() | self.llm | StrOutputParser())
+    
+    def _create_agent(self) -> "AgentExecutor":
+        """Create the Backend Software Engineer agent."""
+        from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
+        
         prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", SYSTEM_PROMPT),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ])
@@ -82,29 +195,237 @@ Generate complete, working code that can be executed immediately."""
         agent = create_tool_calling_agent(self.llm, tools, prompt)
         return AgentExecutor(agent=agent, tools=tools, verbose=True)
     
-    def implement(self, requirements: str) -> Dict[str, Any]:
+    def implement(self, requirements: str, candidates: int = 1) -> Dict[str, Any]:
         """
         Implement the solution based on requirements.
         
         Args:
             requirements: Requirements specification from Requirements Engineer
+            candidates: Number of candidate implementations generated concurrently;
+                the first one to pass the format check is kept and the others
+                are cancelled (1 generates a single implementation)
             
         Returns:
             Dictionary containing the implementation details
         """
-        input_text = f"""Based on the following requirements, design and implement a complete solution:
-
-{requirements}
+        if candidates > 1:
+            return self._implement_speculative(requirements, candidates)
+        if self.stop_early:
+            cutoff = plan_cutoff()
+            return self._stopped_result(
+                stream_until(self.text_chain, {"input": self._build_input(requirements)}, cutoff), cutoff
+            )
+        result = self.agent.invoke({"input": self._build_input(requirements)})
+        return {
+            "implementation": result["output"],
+            "raw_response": result
+        }
 
-Remember:
-- Generate complete, executable Python code
-- Include error handling and logging
-- Provide clear setup and usage instructions
-- Focus on terminal-based execution"""
+    async def aimplement(self, requirements: str, candidates: int = 1) -> Dict[str, Any]:
+        """
+        Async version of implement() for concurrent builds.
         
-        result = self.agent.invoke({"input": input_text})
+        Args:
+            requirements: Requirements specification from Requirements Engineer
+            candidates: Number of candidate implementations generated concurrently
+            
+        Returns:
+            Dictionary containing the implementation details
+        """
+        if candidates > 1:
+            return await self._aimplement_speculative(requirements, candidates)
+        if self.stop_early:
+            cutoff = plan_cutoff()
+            return self._stopped_result(
+                await astream_until(self.text_chain, {"input": self._build_input(requirements)}, cutoff), cutoff
+            )
+        result = await self.agent.ainvoke({"input": self._build_input(requirements)})
         return {
             "implementation": result["output"],
             "raw_response": result
         }
 
+    async def astream_implement(self, requirements: str, sink: Optional[TokenSink] = None) -> Dict[str, Any]:
+        """
+        Implement the solution, streaming the output to a sink as it is generated.
+        
+        Args:
+            requirements: Requirements specification from Requirements Engineer
+            sink: Destination for the streamed tokens
+            
+        Returns:
+            Dictionary containing the implementation details and streaming statistics
+        """
+        cutoff = plan_cutoff() if self.stop_early else None
+        result, stats = await astream_phase(self.agent, {"input": self._build_input(requirements)}, sink, cutoff=cutoff)
+        response = {
+            "implementation": result["output"],
+            "stream_stats": stats
+        }
+        if cutoff and cutoff.stopped_at:
+            response["stopped_at"] = cutoff.stopped_at
+        return response
+
+    def _implement_speculative(self, requirements: str, candidates: int) -> Dict[str, Any]:
+        """Generate candidates in threads; stop the rest once one passes."""
+        inputs = {"input": self._build_input(requirements)}
+        stop = threading.Event()
+        
+        def generate(index: int) -> Optional[Dict[str, Any]]:
+            scorer = CandidateScorer()
+            cutoff = plan_cutoff() if self.stop_early else None
+            parts = []
+            stream = self.candidate_chain.stream(inputs)
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        return None
+                    parts.append(chunk)
+                    scorer.feed(chunk)
+                    if cutoff and cutoff.feed(chunk):
+                        break
+            finally:
+                stream.close()
+            return self._candidate(index, parts, scorer, cutoff)
+        
+        finished, errors = [], []
+        with ThreadPoolExecutor(max_workers=candidates) as executor:
+            # Each candidate runs in a copy of this context so its LLM calls count towards the current phase
+            futures = [executor.submit(copy_context().run, generate, index) for index in range(candidates)]
+            for future in as_completed(futures):
+                try:
+                    candidate = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if candidate is None:
+                    continue
+                finished.append(candidate)
+                if candidate["score"]["passed"]:
+                    stop.set()
+                    break
+        return self._select_candidate(finished, errors, candidates)
+
+    async def _aimplement_speculative(self, requirements: str, candidates: int) -> Dict[str, Any]:
+        """Generate candidates as tasks; cancel the rest once one passes."""
+        inputs = {"input": self._build_input(requirements)}
+        
+        async def generate(index: int) -> Dict[str, Any]:
+            scorer = CandidateScorer()
+            cutoff = plan_cutoff() if self.stop_early else None
+            parts = []
+            stream = self.candidate_chain.astream(inputs)
+            try:
+                async for chunk in stream:
+                    parts.append(chunk)
+                    scorer.feed(chunk)
+                    if cutoff and cutoff.feed(chunk):
+                        break
+            finally:
+                await stream.aclose()
+            return self._candidate(index, parts, scorer, cutoff)
+        
+        tasks = [asyncio.create_task(generate(index)) for index in range(candidates)]
+        finished, errors = [], []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    candidate = await next_done
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                finished.append(candidate)
+                if candidate["score"]["passed"]:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return self._select_candidate(finished, errors, candidates)
+
+    def _candidate(
+        self,
+        index: int,
+        parts: List[str],
+        scorer: CandidateScorer,
+        cutoff: Optional[SectionCutoff]
+    ) -> Dict[str, Any]:
+        """A finished candidate: its output (without the heading it was stopped at) and score."""
+        candidate = {
+            "index": index,
+            "output": cutoff.text if cutoff else "".join(parts),
+            "score": scorer.finish()
+        }
+        if cutoff and cutoff.stopped_at:
+            candidate["stopped_at"] = cutoff.stopped_at
+        return candidate
+
+    def _stopped_result(self, implementation: str, cutoff: SectionCutoff) -> Dict[str, Any]:
+        """Result of a generation streamed through a cutoff, noting the heading it stopped at."""
+        result = {
+            "implementation": implementation,
+            "raw_response": {"output": implementation}
+        }
+        if cutoff.stopped_at:
+            result["stopped_at"] = cutoff.stopped_at
+        return result
+
+    def _select_candidate(
+        self,
+        finished: List[Dict[str, Any]],
+        errors: List[Exception],
+        candidates: int
+    ) -> Dict[str, Any]:
+        """
+        Pick the passing candidate, or the best-formed one if none passed.
+        
+        Raises:
+            Exception: The first candidate's error if every candidate failed
+        """
+        if not finished:
+            raise errors[0]
+        # Ties go to the candidate that finished first
+        winner = max(
+            finished,
+            key=lambda candidate: (
+                candidate["score"]["passed"],
+                -len(candidate["score"]["missing_sections"]),
+                -candidate["score"]["incomplete_blocks"],
+                candidate["score"]["code_blocks"] > 0
+            )
+        )
+        result = {
+            "implementation": winner["output"],
+            "raw_response": {"output": winner["output"]},
+            "speculation": {
+                "candidates": candidates,
+                "finished": len(finished),
+                "failed": len(errors),
+                "cancelled": candidates - len(finished) - len(errors),
+                "selected": winner["index"],
+                "score": winner["score"]
+            }
+        }
+        if "stopped_at" in winner:
+            result["stopped_at"] = winner["stopped_at"]
+        return result
+
+    def _build_input(self, requirements: str) -> str:
+        """
+        Render the agent input for a requirements specification.
+        
+        The fixed instructions come before the requirements so that, after
+        the system prompt, they are part of the prompt prefix Ollama can reuse
+        from the previous build.
+        """
+        return f"""Design and implement a complete solution for the requirements below.
+
+Remember:
+- Generate complete, executable Python code
+- Include error handling and logging
+- Provide clear setup and usage instructions
+- Focus on terminal-based execution
+
+Requirements:
+{requirements}"""
+
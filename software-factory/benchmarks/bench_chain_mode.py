@@ -0,0 +1,85 @@
+"""
+Chain Mode Benchmark
+
+Compares the single-call chain mode of the Requirements and Backend
+Engineers with the tool-calling agent mode. The scripted model calls the
+agents' no-op finalisation tool before answering, as tool-calling models
+commonly do, so every agent-mode phase pays an extra round-trip that
+resends the prompt and the scratchpad.
+
+Reports LLM calls, prompt/completion tokens and wall time per build and
+what chain mode saves.
+
+Usage:
+    python benchmarks/bench_chain_mode.py
+    python benchmarks/bench_chain_mode.py --latency 0.2 --files 8
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from contextlib import redirect_stdout
+from orchestrator import SoftwareFactoryOrchestrator
+from scripted_llm import ScriptedChatModel
+from typing import Any, Dict
+import argparse
+import json
+import tempfile
+
+
+IDEA = "Build a command line currency converter"
+PHASES = ("requirements", "implementation")
+FIELDS = ("llm_calls", "prompt_tokens", "completion_tokens", "wall_seconds")
+
+
+def measure(agent_mode: bool, latency: float, files: int, file_bytes: int) -> Dict[str, Dict[str, Any]]:
+    """Per-phase metrics of one build in the given mode."""
+    llm = ScriptedChatModel(latency=latency, files=files, file_bytes=file_bytes, noop_tool_calls=True)
+    orchestrator = SoftwareFactoryOrchestrator(llm=llm, agent_mode=agent_mode)
+    with tempfile.TemporaryDirectory() as output_dir:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            result = orchestrator.build(IDEA, output_dir)
+    phases = result["metrics"]["phases"]
+    return {phase: {field: phases[phase][field] for field in FIELDS} for phase in PHASES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chain mode vs. agent mode round-trips and tokens")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per LLM call (default: 0.05)")
+    parser.add_argument("--files", type=int, default=5, help="Files in the generated plan (default: 5)")
+    parser.add_argument("--file-bytes", type=int, default=4096, help="Bytes per generated file (default: 4096)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    report = {
+        mode: measure(mode == "agent", args.latency, args.files, args.file_bytes)
+        for mode in ("agent", "chain")
+    }
+    report["saved"] = {
+        phase: {
+            field: round(report["agent"][phase][field] - report["chain"][phase][field], 3)
+            for field in FIELDS
+        }
+        for phase in PHASES
+    }
+
+    print("=" * 80)
+    print("🔗 CHAIN MODE vs. AGENT MODE (per build)")
+    print("=" * 80)
+    print(f"   {'phase':<16} {'mode':<7} {'LLM calls':>9} {'prompt tok':>11} {'compl. tok':>11} {'seconds':>9}")
+    for phase in PHASES:
+        for mode in ("agent", "chain", "saved"):
+            row = report[mode][phase]
+            print(f"   {phase:<16} {mode:<7} {row['llm_calls']:>9} {row['prompt_tokens']:>11} "
+                  f"{row['completion_tokens']:>11} {row['wall_seconds']:>8.2f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
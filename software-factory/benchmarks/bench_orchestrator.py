@@ -0,0 +1,229 @@
+"""
+Orchestrator Benchmarks
+
+Drives the orchestrator and the agents against the scripted chat model, with
+no network and no Ollama, to catch performance regressions in the agent
+plumbing itself:
+
+- framework overhead per phase: wall time minus simulated model time
+- `write_file` throughput: direct, through the agent's tool, and as one buffered batch
+- peak Python memory per build
+- throughput scaling of concurrent builds (build_many)
+
+Usage:
+    python benchmarks/bench_orchestrator.py
+    python benchmarks/bench_orchestrator.py --latency 0.05 --runs 10 --json bench.json
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from contextlib import contextmanager, redirect_stdout
+from orchestrator import SoftwareFactoryOrchestrator
+from implementator import Implementator
+from scripted_llm import ScriptedChatModel
+from typing import Any, Dict, Iterator, List
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+
+IDEA = "Build a command line currency converter"
+
+
+@contextmanager
+def _quiet() -> Iterator[None]:
+    """Silence the agents' verbose console output while measuring."""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        yield
+
+
+def bench_phase_overhead(runs: int, latency: float, files: int, file_bytes: int, fast_path: bool) -> Dict[str, Any]:
+    """
+    Median framework overhead per phase over `runs` sequential builds.
+
+    Overhead is the phase's wall time minus `latency` for each LLM call it made.
+    """
+    llm = ScriptedChatModel(latency=latency, files=files, file_bytes=file_bytes)
+    orchestrator = SoftwareFactoryOrchestrator(llm=llm, fast_path=fast_path)
+    samples: Dict[str, List[Dict[str, float]]] = {}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for run in range(runs):
+            with _quiet():
+                result = orchestrator.build(f"{run} {IDEA}", output_dir)
+            for phase, metrics in result["metrics"]["phases"].items():
+                overhead = metrics["wall_seconds"] - metrics["llm_calls"] * latency
+                samples.setdefault(phase, []).append({
+                    "overhead": overhead,
+                    "llm_calls": metrics["llm_calls"],
+                    "tool_calls": metrics["tool_calls"]
+                })
+
+    report = {}
+    for phase, phase_samples in samples.items():
+        overhead = statistics.median(s["overhead"] for s in phase_samples)
+        calls = phase_samples[0]["llm_calls"]
+        report[phase] = {
+            "overhead_ms": round(overhead * 1000, 2),
+            "llm_calls": calls,
+            "tool_calls": phase_samples[0]["tool_calls"],
+            "overhead_per_call_ms": round(overhead * 1000 / calls, 2) if calls else None
+        }
+    return report
+
+
+def bench_write_throughput(files: int, file_bytes: int) -> Dict[str, Any]:
+    """Files/s and MB/s for writing files directly, through the `write_file` tool, and as one buffered batch."""
+    implementator = Implementator(ScriptedChatModel())
+    write_file_tool = implementator.agent.tools[0]
+    content = "x" * file_bytes
+    report = {}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, write in (
+            ("direct", lambda i: implementator._write_file(f"pkg/file_{i}.py", content)),
+            ("tool", lambda i: write_file_tool.invoke({"filename": f"pkg/file_{i}.py", "content": content}))
+        ):
+            implementator.current_working_dir = os.path.join(output_dir, name)
+            started = time.perf_counter()
+            for i in range(files):
+                write(i)
+            elapsed = time.perf_counter() - started
+            report[name] = {
+                "files_per_second": round(files / elapsed, 1),
+                "mb_per_second": round(files * file_bytes / elapsed / 1e6, 2)
+            }
+
+        batch = {f"pkg/file_{i}.py": content for i in range(files)}
+        started = time.perf_counter()
+        implementator.write_files(batch, os.path.join(output_dir, "buffered"))
+        elapsed = time.perf_counter() - started
+        report["buffered"] = {
+            "files_per_second": round(files / elapsed, 1),
+            "mb_per_second": round(files * file_bytes / elapsed / 1e6, 2)
+        }
+    return report
+
+
+def bench_memory(files: int, file_bytes: int, fast_path: bool) -> Dict[str, Any]:
+    """Peak Python heap allocated during one build (tracemalloc)."""
+    llm = ScriptedChatModel(files=files, file_bytes=file_bytes)
+    orchestrator = SoftwareFactoryOrchestrator(llm=llm, fast_path=fast_path)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        # Warm-up build so one-off imports and caches are not counted
+        with _quiet():
+            orchestrator.build(f"{IDEA} warm-up", output_dir)
+        tracemalloc.start()
+        try:
+            with _quiet():
+                orchestrator.build(IDEA, output_dir)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"peak_mb": round(peak / 1e6, 2)}
+
+
+def bench_scaling(
+    ideas: int,
+    levels: List[int],
+    latency: float,
+    files: int,
+    file_bytes: int,
+    fast_path: bool
+) -> List[Dict[str, Any]]:
+    """Batch throughput at each concurrency level, with speedup over sequential builds."""
+    curve = []
+    for concurrency in levels:
+        llm = ScriptedChatModel(latency=latency, files=files, file_bytes=file_bytes)
+        orchestrator = SoftwareFactoryOrchestrator(llm=llm, fast_path=fast_path)
+        with tempfile.TemporaryDirectory() as output_dir:
+            with _quiet():
+                summary = asyncio.run(orchestrator.build_many(
+                    [f"{i} {IDEA}" for i in range(ideas)], output_dir, concurrency=concurrency
+                ))
+        curve.append({
+            "concurrency": concurrency,
+            "seconds": summary["seconds"],
+            "ideas_per_minute": summary["ideas_per_minute"],
+            "failed": summary["failed"]
+        })
+
+    baseline = curve[0]["ideas_per_minute"] / curve[0]["concurrency"]
+    for point in curve:
+        speedup = point["ideas_per_minute"] / baseline if baseline else 0.0
+        point["speedup"] = round(speedup, 2)
+        point["efficiency"] = round(speedup / point["concurrency"], 2)
+    return curve
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("=" * 80)
+    print("🏁 ORCHESTRATOR BENCHMARKS")
+    print("=" * 80)
+    settings = report["settings"]
+    print(f"latency {settings['latency'] * 1000:.0f} ms/call, {settings['files']} files x "
+          f"{settings['file_bytes']} bytes, fast path {'on' if settings['fast_path'] else 'off'}")
+
+    print("\n⏱️  Framework overhead per phase (median)")
+    for phase, row in report["phase_overhead"].items():
+        per_call = f"{row['overhead_per_call_ms']:.2f} ms/call" if row["overhead_per_call_ms"] is not None else "-"
+        print(f"   {phase:<16} {row['overhead_ms']:9.2f} ms  {row['llm_calls']:>3} LLM  "
+              f"{row['tool_calls']:>3} tools  {per_call}")
+
+    print("\n💾 write_file throughput")
+    for name, row in report["write_throughput"].items():
+        print(f"   {name:<16} {row['files_per_second']:9.1f} files/s  {row['mb_per_second']:8.2f} MB/s")
+
+    print(f"\n🧠 Peak memory per build: {report['memory']['peak_mb']:.2f} MB")
+
+    print("\n📈 Concurrent build scaling")
+    for point in report["scaling"]:
+        print(f"   concurrency {point['concurrency']:>3}  {point['seconds']:7.2f}s  "
+              f"{point['ideas_per_minute']:9.1f} ideas/min  x{point['speedup']:.2f} "
+              f"({point['efficiency'] * 100:.0f}% efficiency)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline orchestrator benchmarks")
+    parser.add_argument("--runs", type=int, default=5, help="Builds per overhead measurement (default: 5)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per LLM call (default: 0.02)")
+    parser.add_argument("--files", type=int, default=5, help="Files in the generated plan (default: 5)")
+    parser.add_argument("--file-bytes", type=int, default=4096, help="Bytes per generated file (default: 4096)")
+    parser.add_argument("--write-files", type=int, default=500, help="Files written by the throughput benchmark (default: 500)")
+    parser.add_argument("--ideas", type=int, default=16, help="Ideas per scaling measurement (default: 16)")
+    parser.add_argument("--concurrency-levels", default="1,2,4,8", help="Comma-separated concurrency levels (default: 1,2,4,8)")
+    parser.add_argument("--fast-path", action="store_true", help="Enable the fast path (default: every file goes through the agent)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency_levels.split(",")]
+    report = {
+        "settings": {
+            "latency": args.latency,
+            "files": args.files,
+            "file_bytes": args.file_bytes,
+            "fast_path": args.fast_path
+        },
+        "phase_overhead": bench_phase_overhead(args.runs, args.latency, args.files, args.file_bytes, args.fast_path),
+        "write_throughput": bench_write_throughput(args.write_files, args.file_bytes),
+        "memory": bench_memory(args.files, args.file_bytes, args.fast_path),
+        "scaling": bench_scaling(args.ideas, levels, args.latency, args.files, args.file_bytes, args.fast_path)
+    }
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Startup Benchmark
+
+Measures CLI startup and orchestrator spawn cost in fresh interpreters,
+using `python -X importtime` for the import breakdown:
+
+- `main.py --help` wall time
+- import time of `main` and of `orchestrator`, with the slowest packages
+- constructing a SoftwareFactoryOrchestrator
+- building each agent on first use (the cost moved out of startup)
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --json startup.json
+"""
+
+from typing import Any, Dict, List, Tuple
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Snippets timed in a fresh interpreter; each prints its own elapsed seconds
+CONSTRUCT = """
+import time
+started = time.perf_counter()
+from orchestrator import SoftwareFactoryOrchestrator
+orchestrator = SoftwareFactoryOrchestrator()
+print(time.perf_counter() - started)
+"""
+
+FIRST_AGENT = """
+import time
+from orchestrator import SoftwareFactoryOrchestrator
+orchestrator = SoftwareFactoryOrchestrator(cache_dir=None)
+timings = {{}}
+for agent in ({agents}):
+    started = time.perf_counter()
+    getattr(orchestrator, agent)
+    timings[agent] = time.perf_counter() - started
+started = time.perf_counter()
+orchestrator.implementator.agent
+timings["implementator.agent"] = time.perf_counter() - started
+import json
+print(json.dumps(timings))
+"""
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable] + args, cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+    )
+
+
+def parse_importtime(stderr: str, module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        Cumulative import seconds of `module`, and (package, cumulative
+        seconds) for every third-party package it pulled in, slowest first
+    """
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        seconds = int(cumulative) / 1e6
+        name = name.strip()
+        if name == module:
+            total = seconds
+        package = name.split(".")[0]
+        # Skip the project's own modules and interpreter startup
+        if package == "site" or os.path.exists(os.path.join(PROJECT_DIR, f"{package}.py")):
+            continue
+        packages[package] = max(packages.get(package, 0.0), seconds)
+    return total, sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def bench_help(repeat: int) -> float:
+    """Median wall time of `python main.py --help`."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _run(["main.py", "--help"])
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def bench_import(module: str, repeat: int, top: int) -> Dict[str, Any]:
+    """Median import time of a module in a fresh interpreter, with its slowest packages."""
+    totals = []
+    packages: List[Tuple[str, float]] = []
+    for _ in range(repeat):
+        total, packages = parse_importtime(_run(["-X", "importtime", "-c", f"import {module}"]).stderr, module)
+        totals.append(total)
+    return {
+        "seconds": round(statistics.median(totals), 4),
+        "slowest_packages": [(name, round(seconds, 4)) for name, seconds in packages[:top]]
+    }
+
+
+def bench_construct(repeat: int) -> float:
+    """Median time to import the orchestrator and construct it."""
+    return statistics.median(float(_run(["-c", CONSTRUCT]).stdout) for _ in range(repeat))
+
+
+def bench_first_agent() -> Dict[str, float]:
+    """Time to build each agent on first use, and the Implementator's tool-calling agent."""
+    agents = '"requirements_engineer", "backend_engineer", "implementator"'
+    timings = json.loads(_run(["-c", FIRST_AGENT.format(agents=agents)]).stdout)
+    return {name: round(seconds, 4) for name, seconds in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup and orchestrator spawn benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement (default: 5)")
+    parser.add_argument("--top", type=int, default=8, help="Slowest packages to list (default: 8)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    report = {
+        "help_seconds": round(bench_help(args.repeat), 4),
+        "import_main": bench_import("main", args.repeat, args.top),
+        "import_orchestrator": bench_import("orchestrator", args.repeat, args.top),
+        "construct_seconds": round(bench_construct(args.repeat), 4),
+        "first_use_seconds": bench_first_agent()
+    }
+
+    print("=" * 80)
+    print("🚀 STARTUP BENCHMARK")
+    print("=" * 80)
+    print(f"   main.py --help                  {report['help_seconds'] * 1000:9.1f} ms")
+    print(f"   import main                     {report['import_main']['seconds'] * 1000:9.1f} ms")
+    print(f"   import orchestrator             {report['import_orchestrator']['seconds'] * 1000:9.1f} ms")
+    print(f"   import + construct orchestrator {report['construct_seconds'] * 1000:9.1f} ms")
+    print("\n   Built on first use:")
+    for name, seconds in report["first_use_seconds"].items():
+        print(f"   {name:<31} {seconds * 1000:9.1f} ms")
+    print("\n   Slowest packages imported by orchestrator:")
+    for name, seconds in report["import_orchestrator"]["slowest_packages"]:
+        print(f"   {name:<31} {seconds * 1000:9.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
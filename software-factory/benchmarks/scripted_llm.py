@@ -0,0 +1,236 @@
+"""
+Scripted Chat Model
+
+A deterministic stand-in for Ollama used by the benchmarks. It recognises
+each agent by its system prompt and answers with canned output:
+
+- Requirements Engineer: a fixed requirements specification
+- Backend Engineer: an implementation plan with `files` code blocks of
+  `file_bytes` bytes each
+- Implementator: one `write_file` tool call per turn until every file in its
+  input has been written, then a final answer
+- Implementator repairing a file: the planned code for that file from the
+  plan excerpt in its input, as a complete file
+
+With `noop_tool_calls`, an agent that has a finalisation tool bound
+(`analyze_requirements`, `generate_code`) calls it once before answering, as
+tool-calling models commonly do.
+
+Every call waits `latency` seconds before answering (and `token_delay`
+seconds per token when streamed), so measured time minus the simulated
+model time is the orchestration overhead.
+"""
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+from code_blocks import extract_files, parse_code_blocks
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+import asyncio
+import json
+import re
+import threading
+import time
+
+
+REQUIREMENTS = """## Final Requirements
+### Functional
+- Convert amounts between currencies from the command line
+- Load exchange rates from a JSON file
+### Non-Functional
+- Respond in under 100 ms
+### Assumptions
+- Rates are updated manually
+### Constraints
+- Python 3.10+, standard library only
+"""
+
+# Rough characters per token, for simulated usage metadata and streaming
+CHARS_PER_TOKEN = 4
+
+
+def make_plan(files: int = 3, file_bytes: int = 2048) -> str:
+    """Implementation plan in the Backend Engineer's format with `files` code blocks."""
+    paths = ["main.py"] + [f"app/module_{i}.py" for i in range(1, files)]
+    line = "# padding line to reach the requested file size ......................\n"
+    sections = []
+    for index, path in enumerate(paths):
+        body = f'"""{path}"""\n\n\ndef handler_{index}(value):\n    return value\n'
+        body += line * max(0, (file_bytes - len(body)) // len(line))
+        sections.append(f"### {path}\n```python\n{body}```\n")
+
+    structure = "\n".join(f"- `{path}`" for path in paths)
+    return (
+        "## Architecture\n- Single-process CLI\n\n"
+        f"## Project Structure\n{structure}\n\n"
+        "## Code\n" + "\n".join(sections) + "\n"
+        "## Setup Instructions\n- python -m venv .venv\n\n"
+        "## Usage\n- python main.py\n"
+    )
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Offline chat model with canned agent responses and configurable latency."""
+
+    latency: float = 0.0
+    token_delay: float = 0.0
+    files: int = 3
+    file_bytes: int = 2048
+    noop_tool_calls: bool = False
+
+    _calls: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def calls(self) -> int:
+        """Number of model calls answered so far."""
+        return self._calls
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _respond(self, messages: List[BaseMessage], tools: Sequence[Dict[str, Any]] = ()) -> AIMessage:
+        with self._lock:
+            self._calls += 1
+
+        system = messages[0].content if messages else ""
+        noop_tools = [tool["function"]["name"] for tool in tools if tool["function"]["name"] != "write_file"]
+        if self.noop_tool_calls and noop_tools and not any(isinstance(m, ToolMessage) for m in messages):
+            message = AIMessage(content="", tool_calls=[{
+                "name": noop_tools[0], "args": {"__arg1": "done"}, "id": "call_noop", "type": "tool_call"
+            }])
+        elif "Requirements Engineer" in system:
+            message = AIMessage(content=REQUIREMENTS)
+        elif "Backend Software Engineer" in system:
+            message = AIMessage(content=make_plan(self.files, self.file_bytes))
+        elif "fixing a generated file" in system:
+            message = self._repair_turn(messages)
+        else:
+            message = self._implementator_turn(messages)
+
+        prompt_tokens = sum(_count_tokens(str(m.content)) for m in messages)
+        output = message.content or json.dumps([call["args"] for call in message.tool_calls])
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": _count_tokens(output),
+            "total_tokens": prompt_tokens + _count_tokens(output)
+        }
+        return message
+
+    def _implementator_turn(self, messages: List[BaseMessage]) -> AIMessage:
+        """Write the next unwritten file, or finish once they are all written."""
+        request = next((str(m.content) for m in messages if m.type == "human"), "")
+        files = extract_files(request)["files"]
+        if not files:
+            # Single block requests (pipeline overlap) name the file explicitly
+            blocks = parse_code_blocks(request).blocks
+            filename = re.search(r"^Filename:\s*(\S+)", request, re.MULTILINE)
+            if blocks:
+                files = {filename.group(1) if filename else "main.py": blocks[0].content}
+
+        written = sum(1 for m in messages if isinstance(m, ToolMessage))
+        pending = list(files.items())[written:]
+        if not pending:
+            return AIMessage(content=f"Wrote {len(files)} file(s).")
+
+        filename, content = pending[0]
+        return AIMessage(content="", tool_calls=[{
+            "name": "write_file",
+            "args": {"filename": filename, "content": content},
+            "id": f"call_{written}",
+            "type": "tool_call"
+        }])
+
+    def _repair_turn(self, messages: List[BaseMessage]) -> AIMessage:
+        """Answer a repair request with the file's planned code (its current content if there is none)."""
+        request = next((str(m.content) for m in messages if m.type == "human"), "")
+        planned, _, current = request.partition("Current content:")
+        blocks = parse_code_blocks(planned).blocks or parse_code_blocks(current).blocks
+        content = blocks[0].content if blocks else ""
+        return AIMessage(content=f"```python\n{content}```")
+
+    def _delay(self, message: AIMessage) -> float:
+        return self.latency + self.token_delay * message.usage_metadata["output_tokens"]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        message = self._respond(messages, kwargs.get("tools", ()))
+        time.sleep(self._delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        message = self._respond(messages, kwargs.get("tools", ()))
+        await asyncio.sleep(self._delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._respond(messages, kwargs.get("tools", ()))
+        time.sleep(self.latency)
+        for chunk in self._chunks(message):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            if run_manager and chunk.message.content:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._respond(messages, kwargs.get("tools", ()))
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(message):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            if run_manager and chunk.message.content:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        """Split a response into token-sized chunks; tool calls and usage ride on the last one."""
+        content = message.content
+        for start in range(0, len(content), CHARS_PER_TOKEN):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=content[start:start + CHARS_PER_TOKEN]))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata
+        ))
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"latency": self.latency, "files": self.files, "file_bytes": self.file_bytes}
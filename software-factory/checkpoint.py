@@ -0,0 +1,93 @@
+"""
+Phase Checkpoints
+
+Persists the output of each build phase under the project directory as soon
+as the phase completes, so that a failed or killed build can be resumed
+without paying again for the phases that already succeeded.
+
+Each checkpoint records a fingerprint of the inputs that produced it; a
+checkpoint is only reused when the fingerprint of the current inputs matches.
+"""
+
+from tracing import span
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import tempfile
+
+
+class CheckpointStore:
+    """Atomic, fingerprinted per-phase checkpoints for one project."""
+
+    DIRNAME = ".checkpoints"
+
+    def __init__(self, project_dir: str):
+        self.checkpoint_dir = os.path.join(project_dir, self.DIRNAME)
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """Stable hash of the inputs to a phase."""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, phase: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{phase}.json")
+
+    def load(self, phase: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a phase's checkpointed output.
+
+        Args:
+            phase: Phase name
+            fingerprint: Fingerprint of the current inputs to the phase
+
+        Returns:
+            The saved output, or None if there is no checkpoint for these inputs
+        """
+        try:
+            with open(self._path(phase), "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if checkpoint.get("fingerprint") != fingerprint:
+            return None
+        return checkpoint.get("output")
+
+    def save(self, phase: str, fingerprint: str, output: Dict[str, Any]) -> str:
+        """
+        Atomically write a phase's output.
+
+        The raw agent response is not persisted: it holds LangChain objects
+        that are not JSON-serializable and is not needed to resume.
+
+        Args:
+            phase: Phase name
+            fingerprint: Fingerprint of the inputs that produced the output
+            output: Phase result dictionary
+
+        Returns:
+            Path to the checkpoint file
+        """
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        checkpoint = {
+            "phase": phase,
+            "fingerprint": fingerprint,
+            "output": {k: v for k, v in output.items() if k != "raw_response"}
+        }
+
+        path = self._path(phase)
+        with span("checkpoint", "io", phase=phase):
+            fd, tmp_path = tempfile.mkstemp(dir=self.checkpoint_dir, prefix=f".{phase}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(checkpoint, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return path
@@ -0,0 +1,348 @@
+"""
+Code Block Parsing
+
+Parses the Backend Engineer's markdown output (`## Architecture`,
+`## Project Structure`, fenced `## Code` blocks, ...) into code blocks.
+
+The parser is incremental: it can be fed the token stream while the Backend
+Engineer is still generating, and hands back each code block as soon as its
+closing fence arrives.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import re
+
+
+# Extensions recognised when looking for a filename next to a code block
+FILE_EXTENSIONS = (
+    "py", "txt", "md", "rst", "json", "yaml", "yml", "toml", "cfg", "ini", "env",
+    "sh", "bash", "js", "ts", "html", "css", "sql", "xml", "csv", "lock",
+)
+
+_FILENAME = (
+    r"(?:[\w.-]+/)*"
+    r"(?:[\w-][\w.-]*\.(?:" + "|".join(FILE_EXTENSIONS) + r")|Dockerfile|Makefile|\.env|\.gitignore)"
+)
+_FILENAME_RE = re.compile(r"(?<![\w./-])(" + _FILENAME + r")(?![\w/-])")
+_FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})\s*(.*?)\s*$")
+_SECTION_RE = re.compile(r"^##\s+(.+?)\s*#*\s*$")
+_COMMENT_FILENAME_RE = re.compile(
+    r"^\s*(?:#|//|--|<!--)\s*(?:file(?:name)?\s*:\s*)?(" + _FILENAME + r")\s*(?:-->)?\s*$",
+    re.IGNORECASE
+)
+
+# Longest plan excerpt sent to the Implementator for a single file, in characters
+MAX_EXCERPT_CHARS = 6000
+
+# Fence languages that hold commands to run rather than file contents
+SHELL_LANGUAGES = {"bash", "sh", "shell", "console", "zsh", "powershell", "cmd"}
+
+
+@dataclass
+class CodeBlock:
+    """A fenced code block from the implementation markdown."""
+
+    content: str
+    language: str = ""
+    info: str = ""
+    section: str = ""
+    filename_hint: Optional[str] = None
+    complete: bool = True
+
+    @property
+    def is_shell(self) -> bool:
+        return self.language.lower() in SHELL_LANGUAGES
+
+
+def find_filename(text: str) -> Optional[str]:
+    """Return the first filename-like token in a short piece of text."""
+    match = _FILENAME_RE.search(text.replace("**", "").replace("`", " "))
+    if not match:
+        return None
+    filename = match.group(1)
+    return filename[2:] if filename.startswith("./") else filename
+
+
+def comment_filename(content: str) -> Optional[str]:
+    """Filename from a leading `# path/to/file.py` style comment in a code block."""
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        match = _COMMENT_FILENAME_RE.match(line)
+        return match.group(1) if match else None
+    return None
+
+
+class CodeBlockStreamParser:
+    """
+    Incremental parser over the Backend Engineer's token stream.
+
+    Feed it text as it arrives; every call returns the code blocks whose
+    closing fence has been seen so far.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._section = ""
+        self._in_fence = False
+        self._fence = ""
+        self._info = ""
+        self._block_lines: List[str] = []
+        self._hint_line = ""
+        self.sections: Dict[str, List[str]] = {}
+        # Lowercased section title -> the title as written
+        self.titles: Dict[str, str] = {}
+        self.blocks: List[CodeBlock] = []
+
+    @property
+    def section(self) -> str:
+        """Title of the `## ` section being parsed (empty before the first one)."""
+        return self._section
+
+    @property
+    def in_fence(self) -> bool:
+        """True while inside a code block."""
+        return self._in_fence
+
+    def feed(self, text: str) -> List[CodeBlock]:
+        """Consume a chunk of text and return the code blocks completed by it."""
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        blocks = []
+        for line in lines:
+            block = self._consume_line(line)
+            if block is not None:
+                blocks.append(block)
+        return blocks
+
+    def finish(self) -> List[CodeBlock]:
+        """Flush the remaining text; an unterminated block is returned as incomplete."""
+        blocks = []
+        if self._pending:
+            block = self._consume_line(self._pending)
+            self._pending = ""
+            if block is not None:
+                blocks.append(block)
+        if self._in_fence:
+            blocks.append(self._close_block(complete=False))
+        return blocks
+
+    def section_text(self, title: str) -> str:
+        """Text seen so far under a `## <title>` section (case-insensitive)."""
+        return "\n".join(self.sections.get(title.lower(), []))
+
+    def _consume_line(self, line: str) -> Optional[CodeBlock]:
+        section = None if self._in_fence else _SECTION_RE.match(line)
+        if section:
+            self._section = section.group(1).strip()
+            self.sections.setdefault(self._section.lower(), [])
+            self.titles.setdefault(self._section.lower(), self._section)
+            self._hint_line = ""
+            return None
+        if self._section:
+            self.sections[self._section.lower()].append(line)
+
+        fence = _FENCE_RE.match(line)
+        if self._in_fence:
+            if fence and not fence.group(2) and fence.group(1)[0] == self._fence[0] \
+                    and len(fence.group(1)) >= len(self._fence):
+                return self._close_block(complete=True)
+            self._block_lines.append(line)
+            return None
+
+        if fence:
+            self._in_fence = True
+            self._fence = fence.group(1)
+            self._info = fence.group(2)
+            self._block_lines = []
+            return None
+
+        if line.strip():
+            self._hint_line = line.strip()
+        return None
+
+    def _close_block(self, complete: bool) -> CodeBlock:
+        content = "\n".join(self._block_lines)
+        if content:
+            content += "\n"
+        info_parts = self._info.replace(":", " ").split()
+        language = info_parts[0] if info_parts and not find_filename(info_parts[0]) else ""
+
+        hint = None
+        if self._info:
+            hint = find_filename(self._info.replace("title=", " "))
+        if not hint and len(self._hint_line) <= 120:
+            hint = find_filename(self._hint_line)
+        if not hint:
+            hint = comment_filename(content)
+
+        block = CodeBlock(
+            content=content,
+            language=language,
+            info=self._info,
+            section=self._section,
+            filename_hint=hint,
+            complete=complete
+        )
+        self._in_fence = False
+        self._fence = ""
+        self._info = ""
+        self._block_lines = []
+        self._hint_line = ""
+        return block
+
+
+# Characters of bullet markers and `tree` drawings that precede an entry
+_TREE_CHARS = " \t│|├└─┣┗┃-+*>\\"
+
+
+def parse_code_blocks(markdown: str) -> CodeBlockStreamParser:
+    """Parse a complete implementation document; the parser holds blocks and sections."""
+    parser = CodeBlockStreamParser()
+    parser.blocks = parser.feed(markdown) + parser.finish()
+    return parser
+
+
+def parse_project_structure(text: str) -> List[str]:
+    """
+    Extract file paths from a `## Project Structure` section.
+
+    Understands bullet lists (`- util/helpers.py - helpers`), nested bullets
+    under directory entries, and `tree`-style diagrams.
+    """
+    paths: List[str] = []
+    # Stack of (indent, directory) for the directories enclosing the current line
+    parents: List[tuple] = []
+
+    for raw_line in text.splitlines():
+        if _FENCE_RE.match(raw_line):
+            parents = []
+            continue
+        if not raw_line.strip():
+            continue
+        stripped = raw_line.lstrip(_TREE_CHARS)
+        indent = len(raw_line) - len(stripped)
+        entry = re.sub(r"^\d+[.)]\s+", "", stripped.strip()).replace("`", "").replace("**", "")
+        # Drop trailing descriptions: "app.py - entry point", "app.py # entry point", "app.py: ..."
+        entry = re.split(r"\s+(?:-|–|—|#|\()\s*|:\s", entry, maxsplit=1)[0].strip()
+        if not entry:
+            continue
+
+        while parents and parents[-1][0] >= indent:
+            parents.pop()
+
+        if entry.endswith("/"):
+            parents.append((indent, entry.rstrip("/")))
+            continue
+
+        filename = find_filename(entry)
+        if not filename or filename != entry.lstrip("./"):
+            continue
+        if "/" not in filename and parents:
+            filename = "/".join([p[1] for p in parents] + [filename])
+        if filename not in paths:
+            paths.append(filename)
+    return paths
+
+
+def is_safe_path(filename: str) -> bool:
+    """True for relative paths that stay inside the output directory."""
+    normalized = filename.replace("\\", "/")
+    return bool(normalized) and not normalized.startswith("/") \
+        and ".." not in normalized.split("/") and ":" not in normalized
+
+
+def resolve_filename(block: CodeBlock, structure: List[str]) -> Optional[str]:
+    """
+    Map a code block to the file it belongs to.
+
+    The block's own filename hint wins; a bare filename is expanded to its
+    full path when the project structure lists exactly one match.
+
+    Returns:
+        Relative file path, or None if the block cannot be resolved
+    """
+    hint = block.filename_hint
+    if not hint or not is_safe_path(hint):
+        return None
+    if "/" not in hint:
+        matches = [path for path in structure if path.rsplit("/", 1)[-1] == hint]
+        if len(matches) == 1:
+            return matches[0]
+    return hint
+
+
+def is_file_block(block: CodeBlock, structure: List[str]) -> bool:
+    """
+    True for a code block that holds a project file.
+
+    Every source block in the `## Code` section is one. Outside it (e.g. a
+    `## Tests` section) a block only counts when it resolves to a path the
+    project structure lists, so usage examples are not mistaken for files.
+    """
+    if block.is_shell or not block.content.strip():
+        return False
+    if block.section.lower() == "code":
+        return True
+    filename = resolve_filename(block, structure)
+    return filename is not None and filename in structure
+
+
+def extract_files(implementation: str) -> Dict[str, Any]:
+    """
+    Deterministically map the implementation's code blocks to files.
+
+    Returns:
+        Dictionary with `files` (path -> content), `unresolved` (code blocks
+        that could not be mapped to a file) and `structure` (paths listed
+        under `## Project Structure`)
+    """
+    parser = parse_code_blocks(implementation)
+    structure = parse_project_structure(parser.section_text("Project Structure"))
+    blocks = [block for block in parser.blocks if is_file_block(block, structure)]
+
+    files: Dict[str, str] = {}
+    unresolved: List[CodeBlock] = []
+    for block in blocks:
+        filename = resolve_filename(block, structure)
+        if filename is None and len(blocks) == 1:
+            # A single unnamed block is the program itself if only one source file is planned
+            candidates = [path for path in structure if path.endswith(".py")]
+            if len(candidates) == 1:
+                filename = candidates[0]
+        if filename is None:
+            unresolved.append(block)
+        else:
+            files[filename] = block.content
+
+    return {"files": files, "unresolved": unresolved, "structure": structure}
+
+
+def plan_excerpt(implementation: str, path: str) -> str:
+    """
+    The slice of the implementation plan relevant to one file.
+
+    That is the `## Project Structure` section and the code block(s) that map
+    to the file, or every code block when none can be matched (a single
+    unnamed block is usually the whole program).
+    """
+    parser = parse_code_blocks(implementation)
+    structure_text = parser.section_text("Project Structure").strip()
+    structure = parse_project_structure(structure_text)
+    blocks = [block for block in parser.blocks if is_file_block(block, structure)]
+    basename = path.rsplit("/", 1)[-1]
+    matching = [
+        block for block in blocks
+        if resolve_filename(block, structure) in (path, basename)
+    ]
+
+    parts = []
+    if structure_text:
+        parts.append(f"Project Structure:\n{structure_text}")
+    for block in matching or blocks:
+        parts.append(f"Planned code:\n```{block.language}\n{block.content}```")
+    excerpt = "\n\n".join(parts) or "(not available)"
+    if len(excerpt) > MAX_EXCERPT_CHARS:
+        excerpt = excerpt[:MAX_EXCERPT_CHARS] + "\n... (truncated)"
+    return excerpt
@@ -0,0 +1,193 @@
+"""
+Idea Index
+
+A local, on-disk vector index over past ideas and the requirements
+specifications generated for them, so that near-duplicate ideas ("create a
+currency converter", "build a currency conversion CLI") can reuse a stored
+spec instead of paying for phase 1 again.
+
+Ideas are embedded with any LangChain `Embeddings` (by default a local
+Ollama embedding model; tests and benchmarks can pass a stub) and stored as
+unit vectors in a NumPy matrix, so a top-k cosine search is one
+matrix-vector product. Entries record the Requirements Engineer's model
+configuration and are only matched against builds using the same one.
+
+Entries are kept in SQLite, so worker processes sharing an index append to
+it concurrently without losing each other's entries. Entries are never
+updated, so each process keeps the matrix in memory and only loads the rows
+added since it last looked.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import os
+import sqlite3
+import threading
+import time
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+    import numpy as np
+
+
+DEFAULT_EMBEDDING_MODEL = "nomic-embed-text"
+
+# Cosine similarity above which a stored spec is reused as is
+DEFAULT_REUSE_THRESHOLD = 0.92
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("The idea index requires NumPy: pip install numpy")
+    return numpy
+
+
+class IdeaIndex:
+    """NumPy-backed cosine-similarity index of ideas and their requirements."""
+
+    DB_FILENAME = "index.sqlite3"
+
+    def __init__(self, index_dir: str, embedder: "Embeddings"):
+        """
+        Open (or create) the index.
+
+        Args:
+            index_dir: Directory holding the index database
+            embedder: Embeddings used for ideas; changing it invalidates the
+                stored vectors, so use one index directory per embedding model
+        """
+        self.np = _numpy()
+        self.index_dir = index_dir
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self.entries: List[Dict[str, Any]] = []
+        self.vectors: "np.ndarray" = self.np.zeros((0, 0), dtype=self.np.float32)
+        self._last_id = 0
+
+        os.makedirs(index_dir, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self._path(self.DB_FILENAME), timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idea TEXT NOT NULL,
+                requirements TEXT NOT NULL,
+                project_dir TEXT,
+                namespace TEXT NOT NULL,
+                created REAL NOT NULL,
+                vector BLOB NOT NULL
+            )"""
+        )
+        with self._lock:
+            self._refresh()
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.index_dir, filename)
+
+    def _insert(self, entry: Dict[str, Any], vector: "np.ndarray") -> None:
+        self._conn.execute(
+            "INSERT INTO entries (idea, requirements, project_dir, namespace, created, vector) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                entry["idea"], entry["requirements"], entry.get("project_dir"),
+                entry.get("namespace", ""), entry.get("created", time.time()),
+                self.np.asarray(vector, dtype=self.np.float32).tobytes()
+            )
+        )
+
+    def _refresh(self) -> None:
+        """Load the entries added (by any process) since the last refresh (lock held)."""
+        rows = self._conn.execute(
+            "SELECT id, idea, requirements, project_dir, namespace, created, vector "
+            "FROM entries WHERE id > ? ORDER BY id",
+            (self._last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        vectors = [self.np.frombuffer(row[6], dtype=self.np.float32) for row in rows]
+        if self.entries:
+            vectors.insert(0, self.vectors)
+        self.vectors = self.np.vstack(vectors)
+        self.entries = self.entries + [
+            {"idea": row[1], "requirements": row[2], "project_dir": row[3], "namespace": row[4], "created": row[5]}
+            for row in rows
+        ]
+        self._last_id = rows[-1][0]
+
+    def _normalize(self, vector: List[float]) -> "np.ndarray":
+        array = self.np.asarray(vector, dtype=self.np.float32)
+        norm = self.np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def embed(self, idea: str) -> "np.ndarray":
+        """Unit-length embedding of an idea."""
+        return self._normalize(self.embedder.embed_query(idea))
+
+    async def aembed(self, idea: str) -> "np.ndarray":
+        """Async version of embed()."""
+        return self._normalize(await self.embedder.aembed_query(idea))
+
+    def search(self, vector: "np.ndarray", k: int = 5, namespace: str = "") -> List[Dict[str, Any]]:
+        """
+        Top-k most similar past ideas.
+
+        Args:
+            vector: Query embedding from embed()
+            k: Number of matches to return
+            namespace: Only match entries stored with this namespace
+
+        Returns:
+            Entries (idea, requirements, project_dir, created) with a `score`,
+            most similar first
+        """
+        with self._lock:
+            self._refresh()
+            vectors, entries = self.vectors, self.entries
+        if not entries or vectors.shape[1] != vector.shape[0]:
+            return []
+
+        scores = vectors @ vector
+        if namespace:
+            mask = self.np.array([entry.get("namespace", "") == namespace for entry in entries])
+            scores = self.np.where(mask, scores, -self.np.inf)
+        k = min(k, len(entries))
+        top = self.np.argpartition(-scores, k - 1)[:k]
+        top = top[self.np.argsort(-scores[top])]
+        return [
+            {**entries[i], "score": round(float(scores[i]), 4)}
+            for i in top if self.np.isfinite(scores[i])
+        ]
+
+    def add(
+        self,
+        idea: str,
+        vector: "np.ndarray",
+        requirements: str,
+        project_dir: Optional[str] = None,
+        namespace: str = ""
+    ) -> None:
+        """Store an idea's embedding and requirements."""
+        entry = {
+            "idea": idea,
+            "requirements": requirements,
+            "project_dir": project_dir,
+            "namespace": namespace,
+            "created": time.time()
+        }
+        with self._lock:
+            self._refresh()
+            if self.entries and self.vectors.shape[1] != vector.shape[0]:
+                raise ValueError(
+                    f"{self.index_dir}: embedding size {vector.shape[0]} does not match the index "
+                    f"({self.vectors.shape[1]}); use a separate index per embedding model"
+                )
+            self._insert(entry, vector)
+            self._refresh()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
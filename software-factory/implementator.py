@@ -7,23 +7,97 @@ This agent is responsible for:
 - Ensuring the code is structurally correct
 """
 
-from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
 from langchain_core.tools import tool
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Optional
+from code_blocks import CodeBlock, extract_files, parse_code_blocks, plan_excerpt
+from write_buffer import WriteBuffer, safe_join, write_atomic
+import asyncio
 import os
 
+# langchain_classic is slow to import; it is loaded when the agent is first used
+if TYPE_CHECKING:
+    from langchain_classic.agents import AgentExecutor
+
+# The output directory is tracked per context rather than per instance so that
+# concurrent builds sharing one Implementator each write into their own project.
+_working_dir: ContextVar[Optional[str]] = ContextVar("implementator_working_dir", default=None)
+
+FILE_SYSTEM_PROMPT = """You are a Code Implementator writing one file of a project.
+
+Rules:
+- Write only the requested file, complete and ready to run
+- Strictly follow the implementation plan; do NOT hallucinate new requirements
+- Import the other files of the project by the paths in the project structure
+- Reply with the file's content in a single fenced code block and nothing else"""
+
+REPAIR_SYSTEM_PROMPT = """You are a Code Implementator fixing a generated file that failed validation.
+
+Rules:
+- Fix the reported errors; keep everything else as close to the original as possible
+- Follow the implementation plan; do NOT add new features
+- Only import the standard library, the generated files, or packages from the generated requirements.txt
+- Reply with the complete corrected file in a single fenced code block and nothing else"""
+
+
 class Implementator:
     """Implementator Agent that generates the actual code files."""
     
     def __init__(self, llm: BaseChatModel):
         self.llm = llm
-        self.current_working_dir = None
-        self.agent = self._create_agent()
+        self._agent: Optional["AgentExecutor"] = None
+        self._repair_chain: Optional[Runnable] = None
+        self._file_chain: Optional[Runnable] = None
+        # Code directory -> staged writes of the build generating it
+        self._buffers: Dict[str, WriteBuffer] = {}
+    
+    @property
+    def agent(self) -> "AgentExecutor":
+        """The tool-calling agent, built on first use: the fast path often never needs it."""
+        if self._agent is None:
+            self._agent = self._create_agent()
+        return self._agent
+    
+    @property
+    def file_chain(self) -> Runnable:
+        """Single-call chain that returns the content of one file, built on first use."""
+        if self._file_chain is None:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", FILE_SYSTEM_PROMPT),
+                ("human", "{input}"),
+            ])
+            self._file_chain = prompt | self.llm | StrOutputParser()
+        return self._file_chain
     
-    def _create_agent(self) -> AgentExecutor:
+    @property
+    def repair_chain(self) -> Runnable:
+        """Single-call chain that returns a corrected file, built on first use."""
+        if self._repair_chain is None:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", REPAIR_SYSTEM_PROMPT),
+                ("human", "{input}"),
+            ])
+            self._repair_chain = prompt | self.llm | StrOutputParser()
+        return self._repair_chain
+    
+    @property
+    def current_working_dir(self) -> Optional[str]:
+        """Directory the `write_file` tool writes into for the current build."""
+        return _working_dir.get()
+    
+    @current_working_dir.setter
+    def current_working_dir(self, value: Optional[str]) -> None:
+        _working_dir.set(value)
+    
+    def _create_agent(self) -> "AgentExecutor":
         """Create the Implementator agent."""
+        from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
         
         system_prompt = """You are a Code Implementator.
 
@@ -54,38 +128,31 @@ When writing files:
                 filename: Name of the file (e.g., 'main.py')
                 content: The code content to write to the file
             """
-            try:
-                # Ensure we have a working directory
-                if not self.current_working_dir:
-                    return "Error: Output directory not set"
-                    
-                # Create full path
-                file_path = os.path.join(self.current_working_dir, filename)
-                
-                # Create parent directories if they don't exist
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                
-                # Write file
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(content)
-                    
-                return f"Successfully wrote {filename}"
-                
-            except Exception as e:
-                return f"Error writing file: {str(e)}"
+            return self._write_file(filename, content)
 
         tools = [write_file]
         
         agent = create_tool_calling_agent(self.llm, tools, prompt)
         return AgentExecutor(agent=agent, tools=tools, verbose=True)
 
-    def generate_code(self, implementation_plan: str, output_dir: str) -> Dict[str, Any]:
+    def generate_code(
+        self,
+        implementation_plan: str,
+        output_dir: str,
+        fast_path: bool = False,
+        concurrency: int = 1
+    ) -> Dict[str, Any]:
         """
         Generate code files based on the implementation plan.
         
         Args:
             implementation_plan: The full text describing the implementation
             output_dir: The directory where code should be generated
+            fast_path: Write code blocks that can be mapped to a file directly,
+                using the agent only for the blocks that cannot
+            concurrency: With more than 1, the files listed in the plan's project
+                structure that still need writing are generated by independent
+                single-file calls, this many at a time, instead of one agent loop
             
         Returns:
             Dictionary containing the results
@@ -94,14 +161,407 @@ When writing files:
         self.current_working_dir = os.path.join(output_dir, "code")
         os.makedirs(self.current_working_dir, exist_ok=True)
         
-        input_text = f"""Please implement the solution based on this plan. Create all necessary files in the current directory.
+        extracted = extract_files(implementation_plan)
+        with self.buffered_writes(output_dir) as buffer:
+            if fast_path and extracted["files"]:
+                result = self._write_extracted(extracted)
+                pending = self._pending_files(extracted, result)
+                if extracted["unresolved"] and concurrency > 1 and pending:
+                    self._fan_out(result, self.generate_files(implementation_plan, pending, concurrency))
+                elif extracted["unresolved"]:
+                    fallback = self.agent.invoke({"input": self._build_unresolved_input(extracted)})
+                    result["output"] += "\n" + fallback["output"]
+            elif concurrency > 1 and len(self._pending_files(extracted)) > 1:
+                result = {"output": "", "code_dir": self.current_working_dir}
+                files = self.generate_files(implementation_plan, self._pending_files(extracted), concurrency)
+                self._fan_out(result, files)
+                self.write_files(self._package_markers(extracted, files), output_dir)
+            else:
+                agent_result = self.agent.invoke({"input": self._build_input(implementation_plan)})
+                result = {
+                    "output": agent_result["output"],
+                    "code_dir": self.current_working_dir
+                }
+        result["writes"] = dict(buffer.stats)
+        return result
 
-Implementation Plan:
-{implementation_plan}
+    async def agenerate_code(
+        self,
+        implementation_plan: str,
+        output_dir: str,
+        fast_path: bool = False,
+        concurrency: int = 1
+    ) -> Dict[str, Any]:
+        """
+        Async version of generate_code() for concurrent builds.
+        
+        Args:
+            implementation_plan: The full text describing the implementation
+            output_dir: The directory where code should be generated
+            fast_path: Write code blocks that can be mapped to a file directly,
+                using the agent only for the blocks that cannot
+            concurrency: Maximum number of single-file calls in flight when the
+                plan's files are generated independently (1 uses the agent loop)
+            
+        Returns:
+            Dictionary containing the results
+        """
+        self.current_working_dir = os.path.join(output_dir, "code")
+        os.makedirs(self.current_working_dir, exist_ok=True)
+        
+        extracted = extract_files(implementation_plan)
+        with self.buffered_writes(output_dir) as buffer:
+            if fast_path and extracted["files"]:
+                result = self._write_extracted(extracted)
+                pending = self._pending_files(extracted, result)
+                if extracted["unresolved"] and concurrency > 1 and pending:
+                    self._fan_out(result, await self.agenerate_files(implementation_plan, pending, concurrency))
+                elif extracted["unresolved"]:
+                    fallback = await self.agent.ainvoke({"input": self._build_unresolved_input(extracted)})
+                    result["output"] += "\n" + fallback["output"]
+            elif concurrency > 1 and len(self._pending_files(extracted)) > 1:
+                result = {"output": "", "code_dir": self.current_working_dir}
+                files = await self.agenerate_files(implementation_plan, self._pending_files(extracted), concurrency)
+                self._fan_out(result, files)
+                self.write_files(self._package_markers(extracted, files), output_dir)
+            else:
+                agent_result = await self.agent.ainvoke({"input": self._build_input(implementation_plan)})
+                result = {
+                    "output": agent_result["output"],
+                    "code_dir": self.current_working_dir
+                }
+        result["writes"] = dict(buffer.stats)
+        return result
+
+    def generate_files(self, implementation_plan: str, paths: List[str], concurrency: int = 4) -> Dict[str, str]:
+        """
+        Generate files independently: one single-call chain per file, `concurrency` at a time.
+        
+        Each call gets the project structure and the slice of the plan for its
+        file, so latency approaches that of the largest file rather than the
+        sum of all of them.
+        
+        Args:
+            implementation_plan: The full text describing the implementation
+            paths: Files to generate, relative to the code directory
+            concurrency: Maximum number of calls in flight
+            
+        Returns:
+            Mapping of path to generated content (not yet written)
+        """
+        inputs = [self._build_file_input(implementation_plan, path) for path in paths]
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            # Each call runs in a copy of this context so its LLM calls count towards the current phase
+            futures = [
+                executor.submit(copy_context().run, self.file_chain.invoke, {"input": input_text})
+                for input_text in inputs
+            ]
+            outputs = [future.result() for future in futures]
+        return {path: self._extract_content(output) for path, output in zip(paths, outputs)}
+
+    async def agenerate_files(self, implementation_plan: str, paths: List[str], concurrency: int = 4) -> Dict[str, str]:
+        """Async version of generate_files()."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def generate(path: str) -> str:
+            async with semaphore:
+                return await self.file_chain.ainvoke({"input": self._build_file_input(implementation_plan, path)})
+        
+        outputs = await asyncio.gather(*(generate(path) for path in paths))
+        return {path: self._extract_content(output) for path, output in zip(paths, outputs)}
+
+    def _pending_files(self, extracted: Dict[str, Any], written: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Files in the project structure that have no content yet (package markers are written empty)."""
+        done = set(written["fast_path"]["files_written"]) if written else set()
+        return [
+            path for path in extracted["structure"]
+            if path not in done and path.rsplit("/", 1)[-1] != "__init__.py"
+        ]
+
+    def _package_markers(self, extracted: Dict[str, Any], files: Dict[str, str]) -> Dict[str, str]:
+        """Empty `__init__.py` files listed in the project structure and not generated."""
+        return {
+            path: "" for path in extracted["structure"]
+            if path.rsplit("/", 1)[-1] == "__init__.py" and path not in files
+        }
+
+    def _fan_out(self, result: Dict[str, Any], files: Dict[str, str]) -> None:
+        """Write independently generated files and record them in the result."""
+        written = self.write_files(files, os.path.dirname(self.current_working_dir))
+        result["output"] = "\n".join(part for part in (result["output"], written["output"]) if part)
+        result["fan_out"] = {
+            "files": sorted(files),
+            "bytes_written": sum(len(content) for content in files.values())
+        }
+
+    def _build_file_input(self, implementation_plan: str, path: str) -> str:
+        """Render the input for generating one file; fixed instructions come first."""
+        return f"""Write the file `{path}` of the project described below. Reply with its complete content.
+
+{plan_excerpt(implementation_plan, path)}
+
+File to write: {path}
 """
+
+    def _extract_content(self, output: str) -> str:
+        """File content from a single-file answer: its first non-shell code block, or the whole answer."""
+        blocks = [block for block in parse_code_blocks(output).blocks if not block.is_shell]
+        return blocks[0].content if blocks else output.strip() + "\n"
+
+    def write_files(self, files: Dict[str, str], output_dir: str) -> Dict[str, Any]:
+        """
+        Write files directly, without the agent.
         
-        result = self.agent.invoke({"input": input_text})
+        Args:
+            files: Mapping of relative path to file content
+            output_dir: The directory where code should be generated
+            
+        Returns:
+            Dictionary containing the results
+        """
+        self.current_working_dir = os.path.join(output_dir, "code")
+        os.makedirs(self.current_working_dir, exist_ok=True)
+        
+        with self.buffered_writes(output_dir):
+            messages = [self._write_file(filename, content) for filename, content in files.items()]
+        return {
+            "output": "\n".join(messages),
+            "code_dir": self.current_working_dir
+        }
+
+    async def agenerate_block(self, block: CodeBlock, project_structure: str, output_dir: str) -> Dict[str, Any]:
+        """
+        Write a single code block from the implementation plan to its file.
+        
+        Used to start code generation while the Backend Engineer is still
+        producing the rest of the plan.
+        
+        Args:
+            block: Completed code block from the implementation plan
+            project_structure: The plan's `## Project Structure` section, to name the file
+            output_dir: The directory where code should be generated
+            
+        Returns:
+            Dictionary containing the results
+        """
+        self.current_working_dir = os.path.join(output_dir, "code")
+        os.makedirs(self.current_working_dir, exist_ok=True)
+        
+        filename = block.filename_hint or "infer it from the project structure"
+        input_text = f"""Write the following code block from the implementation plan to its file using `write_file`. Write only this file.
+
+Project Structure:
+{project_structure}
+
+Filename: {filename}
+
+Code:
+```{block.language}
+{block.content}```
+"""
+        
+        result = await self.agent.ainvoke({"input": input_text})
         return {
             "output": result["output"],
             "code_dir": self.current_working_dir
         }
+
+    def repair_file(
+        self,
+        path: str,
+        errors: List[str],
+        plan_excerpt: str,
+        generated_files: List[str],
+        output_dir: str
+    ) -> Dict[str, Any]:
+        """
+        Rewrite one generated file that failed validation.
+        
+        A single LLM call gets the file, its errors and the relevant slice of
+        the implementation plan; no other file is touched.
+        
+        Args:
+            path: File path relative to the code directory
+            errors: Validation errors for the file
+            plan_excerpt: The part of the implementation plan the file came from
+            generated_files: Every generated file, so imports can be pointed at them
+            output_dir: The directory where code was generated
+            
+        Returns:
+            Dictionary containing the results
+        """
+        input_text = self._build_repair_input(path, errors, plan_excerpt, generated_files, output_dir)
+        return self._write_repair(path, self.repair_chain.invoke({"input": input_text}), output_dir)
+
+    async def arepair_file(
+        self,
+        path: str,
+        errors: List[str],
+        plan_excerpt: str,
+        generated_files: List[str],
+        output_dir: str
+    ) -> Dict[str, Any]:
+        """Async version of repair_file() so failing files are repaired concurrently."""
+        input_text = self._build_repair_input(path, errors, plan_excerpt, generated_files, output_dir)
+        return self._write_repair(path, await self.repair_chain.ainvoke({"input": input_text}), output_dir)
+
+    def _write_repair(self, path: str, output: str, output_dir: str) -> Dict[str, Any]:
+        """Write the file from a repair answer: its first non-shell code block, or the whole answer."""
+        content = self._extract_content(output)
+        # A single file: replaced atomically in place rather than through a tree commit
+        self.current_working_dir = os.path.join(output_dir, "code")
+        return {
+            "output": self._write_file(path, content),
+            "code_dir": self.current_working_dir,
+            "path": path,
+            "bytes_written": len(content)
+        }
+
+    def _build_repair_input(
+        self,
+        path: str,
+        errors: List[str],
+        plan_excerpt: str,
+        generated_files: List[str],
+        output_dir: str
+    ) -> str:
+        """Render the repair input; fixed instructions come first to keep the prompt prefix reusable."""
+        try:
+            with open(os.path.join(output_dir, "code", path), "r", encoding="utf-8") as f:
+                source = f.read()
+        except (OSError, UnicodeDecodeError):
+            source = ""
+        if source and not source.endswith("\n"):
+            source += "\n"
+        error_list = "\n".join(f"- {error}" for error in errors)
+        file_list = "\n".join(f"- {name}" for name in generated_files)
+        return f"""Fix the file below so that it compiles and all of its imports resolve. Reply with the complete corrected file.
+
+Generated files:
+{file_list}
+
+File: {path}
+
+Validation errors:
+{error_list}
+
+{plan_excerpt}
+
+Current content:
+```python
+{source}```
+"""
+
+    def begin_writes(self, output_dir: str) -> WriteBuffer:
+        """Start staging the writes into a project's code directory (or join the open buffer)."""
+        code_dir = os.path.normpath(os.path.join(output_dir, "code"))
+        if code_dir not in self._buffers:
+            self._buffers[code_dir] = WriteBuffer(code_dir)
+        return self._buffers[code_dir]
+
+    def commit_writes(self, output_dir: str) -> Dict[str, Any]:
+        """Write a project's staged files to disk in one step; returns the buffer's counters."""
+        buffer = self._buffers.pop(os.path.normpath(os.path.join(output_dir, "code")), None)
+        return buffer.commit() if buffer else {}
+
+    def discard_writes(self, output_dir: str) -> None:
+        """Drop a project's staged files, leaving its code directory untouched."""
+        buffer = self._buffers.pop(os.path.normpath(os.path.join(output_dir, "code")), None)
+        if buffer:
+            buffer.discard()
+
+    @contextmanager
+    def buffered_writes(self, output_dir: str) -> Iterator[WriteBuffer]:
+        """
+        Stage every write into the project's code directory until the block exits.
+        
+        The files are committed together if the block succeeds and dropped if it
+        raises. Inside a buffer that is already open, writes join it and are
+        committed by its owner.
+        """
+        code_dir = os.path.normpath(os.path.join(output_dir, "code"))
+        if code_dir in self._buffers:
+            yield self._buffers[code_dir]
+            return
+        
+        buffer = self.begin_writes(output_dir)
+        try:
+            yield buffer
+        except BaseException:
+            self.discard_writes(output_dir)
+            raise
+        self.commit_writes(output_dir)
+
+    def _write_file(self, filename: str, content: str) -> str:
+        """
+        Write a file into the current working directory, returning a status message.
+        
+        Inside buffered_writes() the file is staged; otherwise it is replaced
+        atomically, and left alone if its content is unchanged.
+        """
+        try:
+            # Ensure we have a working directory
+            if not self.current_working_dir:
+                return "Error: Output directory not set"
+            
+            buffer = self._buffers.get(os.path.normpath(self.current_working_dir))
+            if buffer is not None:
+                buffer.stage(filename, content)
+            else:
+                write_atomic(safe_join(self.current_working_dir, filename), content)
+                
+            return f"Successfully wrote {filename}"
+            
+        except Exception as e:
+            return f"Error writing file: {str(e)}"
+
+    def _write_extracted(self, extracted: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Write the files resolved by extract_files() and report the LLM calls saved.
+        
+        Package markers listed in the project structure without a code block
+        are created empty. The agent would have spent one LLM round-trip per
+        `write_file` call plus a final answer; the final answer is only saved
+        when no block has to fall back to the agent.
+        """
+        files = dict(extracted["files"])
+        for path in extracted["structure"]:
+            if path.rsplit("/", 1)[-1] == "__init__.py" and path not in files:
+                files[path] = ""
+        
+        result = self.write_files(files, os.path.dirname(self.current_working_dir))
+        unresolved = len(extracted["unresolved"])
+        result["fast_path"] = {
+            "files_written": sorted(files),
+            "bytes_written": sum(len(content) for content in files.values()),
+            "unresolved_blocks": unresolved,
+            "llm_calls_saved": len(files) + (0 if unresolved else 1)
+        }
+        return result
+
+    def _build_unresolved_input(self, extracted: Dict[str, Any]) -> str:
+        """Render the agent input for code blocks the fast path could not map to a file."""
+        blocks = "\n\n".join(
+            f"```{block.language}\n{block.content}```" for block in extracted["unresolved"]
+        )
+        structure = "\n".join(f"- {path}" for path in extracted["structure"]) or "(not specified)"
+        written = "\n".join(f"- {path}" for path in extracted["files"])
+        return f"""Write each of the code blocks below to the file it belongs to using `write_file`. Do not rewrite the files that have already been written.
+
+Already written:
+{written}
+
+Project Structure:
+{structure}
+
+Code blocks:
+{blocks}
+"""
+
+    def _build_input(self, implementation_plan: str) -> str:
+        """Render the agent input for an implementation plan."""
+        return f"""Please implement the solution based on this plan. Create all necessary files in the current directory.
+
+Implementation Plan:
+{implementation_plan}
+"""
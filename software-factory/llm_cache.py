@@ -0,0 +1,231 @@
+"""
+LLM Response Cache
+
+Content-addressed, on-disk cache for chat model responses.
+
+Responses are stored in SQLite, keyed on a hash of the model configuration
+(model name, temperature, base URL), the serialized prompt (system prompt
+and rendered input) and the invocation parameters (bound tools, stop
+sequences). Entries are evicted least-recently-used first once the cache
+grows past its size limit, and unconditionally once they are older than
+the age limit.
+"""
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class LLMResponseCache(BaseCache):
+    """SQLite-backed LLM response cache with size- and age-based LRU eviction."""
+
+    DB_FILENAME = "llm_cache.sqlite3"
+
+    # Eviction runs on open and then once every this many writes
+    EVICT_EVERY = 32
+
+    def __init__(
+        self,
+        cache_dir: str,
+        namespace: str = "",
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age_seconds: float = 30 * 24 * 3600
+    ):
+        """
+        Open (or create) the cache.
+
+        Args:
+            cache_dir: Directory holding the cache database
+            namespace: Model configuration the cached responses belong to.
+                Chat models do not include their model name or server in the
+                `llm_string` LangChain hands to caches, so it is mixed into
+                every key here instead.
+            max_bytes: Total size of cached responses before LRU eviction
+            max_age_seconds: Age after which entries are always evicted
+        """
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, self.DB_FILENAME),
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self.evict()
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        """Content address for a prompt under this cache's model configuration."""
+        digest = hashlib.sha256()
+        for part in (self.namespace, llm_string, _normalize_prompt(prompt)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Return the cached generations for a prompt, or None on a miss."""
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return _loads_generations(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations produced for a prompt."""
+        key = self._key(prompt, llm_string)
+        value = _dumps_generations(return_val)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now)
+            )
+            self._writes += 1
+            should_evict = self._writes % self.EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then least-recently-used ones until under max_bytes.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self.max_age_seconds,)
+            ).rowcount
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                freed = 0
+                victims = []
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+                ):
+                    if freed >= excess:
+                        break
+                    victims.append((key,))
+                    freed += size
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                removed += len(victims)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size
+        }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+# Message fields that describe a previous response rather than what is sent to
+# the model. LangChain stamps usage metadata onto cache hits, so leaving these in
+# would make every agent turn after a hit miss the cache.
+_RESPONSE_ONLY_FIELDS = ("usage_metadata", "response_metadata", "id")
+
+
+def _normalize_prompt(prompt: str) -> str:
+    """Strip response-only metadata from a serialized chat prompt."""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    if not isinstance(messages, list):
+        return prompt
+    for message in messages:
+        fields = message.get("kwargs") if isinstance(message, dict) else None
+        if isinstance(fields, dict):
+            for field in _RESPONSE_ONLY_FIELDS:
+                fields.pop(field, None)
+    return json.dumps(messages, sort_keys=True)
+
+
+def _dumps_generations(generations: RETURN_VAL_TYPE) -> str:
+    """Serialize generations to JSON, keeping chat messages (and tool calls) intact."""
+    entries = []
+    for generation in generations:
+        entry: Dict[str, Any] = {
+            "text": generation.text,
+            "generation_info": generation.generation_info
+        }
+        if isinstance(generation, ChatGeneration):
+            entry["message"] = message_to_dict(generation.message)
+        entries.append(entry)
+    return json.dumps(entries)
+
+
+def _loads_generations(value: str) -> RETURN_VAL_TYPE:
+    """Inverse of _dumps_generations(); generation_info is marked `from_cache`."""
+    generations = []
+    for entry in json.loads(value):
+        # Keeps the original call's Ollama timings out of the build metrics
+        entry["generation_info"] = {**(entry["generation_info"] or {}), "from_cache": True}
+        if "message" in entry:
+            message = messages_from_dict([entry["message"]])[0]
+            generations.append(
+                ChatGeneration(message=message, generation_info=entry["generation_info"])
+            )
+        else:
+            generations.append(
+                Generation(text=entry["text"], generation_info=entry["generation_info"])
+            )
+    return generations
@@ -6,11 +6,66 @@ Usage:
     
 Or run interactively:
     python main.py
+
+Or build many ideas concurrently from a JSONL file:
+    python main.py --batch ideas.jsonl --concurrency 4
+
+Or repair the files of a previous build that fail validation:
+    python main.py --repair output/create_a_currency_converter
+
+Or list and look up past builds:
+    python main.py --list
+    python main.py --find "currency"
+    python main.py --show create_a_currency_converter_1a2b3c4d
+
+Or keep the agents warm in a build service:
+    python main.py --serve --port 8765
+
+Or queue ideas for any number of worker processes:
+    python main.py --enqueue ideas.jsonl
+    python main.py --worker
+
+Or run each agent on its own model:
+    python main.py --profile profile.yaml "Your software idea here"
+    python main.py --backend-model qwen2.5-coder:14b --implementator-model llama3.2:3b "..."
 """
 
+import os
 import sys
+import json
 import argparse
-from orchestrator import SoftwareFactoryOrchestrator
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from profiles import AGENT_NAMES, load_profile
+
+# The orchestrator pulls in LangChain, which takes about a second to import;
+# it is only loaded once the arguments are valid and there is work to do
+if TYPE_CHECKING:
+    from orchestrator import SoftwareFactoryOrchestrator
+    from scheduler import LLMScheduler
+    from tracing import Tracer
+
+
+def load_ideas(path: str) -> List[str]:
+    """
+    Load ideas from a JSONL file.
+    
+    Each non-empty line is either a JSON string or an object with an
+    "idea" field.
+    """
+    ideas = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict):
+                entry = entry.get("idea")
+            if not isinstance(entry, str) or not entry.strip():
+                raise ValueError(f"{path}:{line_number}: expected an idea string or {{\"idea\": ...}}")
+            ideas.append(entry.strip())
+    return ideas
 
 
 def main():
@@ -25,27 +80,358 @@ def main():
     )
     parser.add_argument(
         "--model",
-        default="llama3.1",
-        help="Ollama model to use (default: llama3.1)"
+        help="Ollama model to use for every agent (default: llama3.1)"
     )
     parser.add_argument(
         "--temperature",
         type=float,
-        default=0.7,
         help="Temperature for LLM (default: 0.7)"
     )
+    parser.add_argument(
+        "--num-ctx",
+        type=int,
+        help="Context window size in tokens for every agent"
+    )
+    parser.add_argument(
+        "--num-predict",
+        type=int,
+        help="Maximum number of tokens to generate per call for every agent"
+    )
+    parser.add_argument(
+        "--keep-alive",
+        help="How long Ollama keeps the models loaded after a call (default: 30m)"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="YAML_FILE",
+        help="Model profile with per-agent model, temperature, num_ctx, num_predict and keep_alive; "
+             "command-line flags take precedence"
+    )
+    parser.add_argument(
+        "--requirements-model",
+        help="Ollama model for the Requirements Engineer"
+    )
+    parser.add_argument(
+        "--backend-model",
+        help="Ollama model for the Backend Engineer"
+    )
+    parser.add_argument(
+        "--implementator-model",
+        help="Ollama model for the Implementator"
+    )
     parser.add_argument(
         "--base-url",
         default="http://localhost:11434",
-        help="Ollama base URL (default: http://localhost:11434)"
+        help="Ollama base URL, or a comma-separated list of URLs to load-balance across "
+             "(default: http://localhost:11434)"
+    )
+    parser.add_argument(
+        "--endpoints-config",
+        metavar="JSON_FILE",
+        help="JSON file listing Ollama endpoints to load-balance across, "
+             "e.g. [{\"url\": \"http://gpu1:11434\", \"max_concurrency\": 2}]"
     )
     parser.add_argument(
         "--output-dir",
         default="output",
         help="Directory to save output files (default: output)"
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache LLM responses on disk, so a repeated prompt replays its stored answer "
+             "(meant for --temperature 0). Cached models are called without streaming: "
+             "--stream output appears once a call completes and early stopping trims the full answer"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=".llm_cache",
+        help="Directory for the --cache response cache (default: .llm_cache)"
+    )
+    parser.add_argument(
+        "--idea-index",
+        metavar="DIR",
+        help="Index past ideas and their requirements in DIR, and reuse the requirements "
+             "of a near-duplicate idea instead of generating them"
+    )
+    parser.add_argument(
+        "--embedding-model",
+        default="nomic-embed-text",
+        help="Ollama embedding model for --idea-index (default: nomic-embed-text)"
+    )
+    parser.add_argument(
+        "--reuse-threshold",
+        type=float,
+        default=0.92,
+        help="Cosine similarity at or above which a past idea's requirements are reused (default: 0.92)"
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="Always write files through the Implementator agent, even when code blocks can be mapped to files directly"
+    )
+    parser.add_argument(
+        "--file-concurrency",
+        type=int,
+        default=4,
+        help="Generate the planned files with up to N independent Implementator calls at a time (default: 4, 1 uses a single agent loop)"
+    )
+    parser.add_argument(
+        "--no-compact-handoffs",
+        action="store_true",
+        help="Send each phase the previous phase's full output instead of only the sections it uses"
+    )
+    parser.add_argument(
+        "--no-early-stop",
+        action="store_true",
+        help="Let the Requirements and Backend Engineers finish every section instead of stopping "
+             "once the next phase has what it needs (keeps the setup and usage instructions)"
+    )
+    parser.add_argument(
+        "--agent-mode",
+        action="store_true",
+        help="Run the Requirements and Backend Engineers as tool-calling agents instead of single-call chains"
+    )
+    parser.add_argument(
+        "--no-validate",
+        action="store_true",
+        help="Skip compiling the generated files and checking their imports after code generation"
+    )
+    parser.add_argument(
+        "--run-tests",
+        action="store_true",
+        help="Also run generated test files with CPU, memory and time limits, against a copy of "
+             "the code directory (not a sandbox: tests can access the filesystem as you)"
+    )
+    parser.add_argument(
+        "--repair-iterations",
+        type=int,
+        default=2,
+        help="Maximum rounds of re-generating only the files that failed validation (default: 2, 0 disables)"
+    )
+    parser.add_argument(
+        "--repair",
+        metavar="PROJECT_DIR",
+        help="Validate a previous build's code and repair the failing files instead of building"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip phases whose checkpoint from a previous run matches the current inputs"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream phase output token by token to the console and output files"
+    )
+    parser.add_argument(
+        "--overlap",
+        action="store_true",
+        help="Start code generation per block while the Backend Engineer is still writing (implies --stream)"
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=1,
+        metavar="K",
+        help="Generate K implementations concurrently and keep the first in the required format (default: 1, not with --stream)"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="IDEAS_JSONL",
+        help="Build every idea in a JSONL file instead of a single idea"
+    )
+    parser.add_argument(
+        "--prometheus-file",
+        metavar="PATH",
+        help="In batch mode, also write aggregated metrics in Prometheus text format to PATH"
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Record a timeline of every build (phases, LLM and tool calls, file writes) to PATH: "
+             "a Chrome trace for Perfetto, or OTLP/JSON lines for a .jsonl path"
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=["chrome", "otlp"],
+        help="Format of the --trace file (default: from its extension)"
+    )
+    parser.add_argument(
+        "--trace-sample",
+        type=float,
+        default=1.0,
+        metavar="RATE",
+        help="Fraction of builds traced, between 0 and 1 (default: 1)"
+    )
+    parser.add_argument(
+        "--list",
+        nargs="?",
+        type=int,
+        const=20,
+        metavar="N",
+        help="List the N most recent projects in the output directory (default: 20)"
+    )
+    parser.add_argument(
+        "--find",
+        metavar="TEXT",
+        help="List projects whose idea or ID contains TEXT"
+    )
+    parser.add_argument(
+        "--show",
+        metavar="PROJECT_ID",
+        help="Show a project's idea, models, timings, status and files"
+    )
+    parser.add_argument(
+        "--export",
+        nargs=2,
+        metavar=("PROJECT_ID", "DIR"),
+        help="Recreate a project's stored files under DIR"
+    )
+    parser.add_argument(
+        "--max-inflight-requests",
+        type=int,
+        metavar="N",
+        help="Schedule LLM calls: at most N in flight, interactive builds ahead of batch work "
+             "and tenants served fairly (default: no scheduling)"
+    )
+    parser.add_argument(
+        "--max-inflight-tokens",
+        type=int,
+        metavar="N",
+        help="With --max-inflight-requests, also cap the estimated prompt and output tokens in flight"
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=256,
+        help="LLM calls waiting per priority class beyond which new ones are rejected (default: 256)"
+    )
+    parser.add_argument(
+        "--max-queue-seconds",
+        type=float,
+        help="Reject an LLM call that waited this long for admission (default: wait indefinitely)"
+    )
+    parser.add_argument(
+        "--priority",
+        choices=["interactive", "batch"],
+        help="Scheduler priority class of the builds (default: interactive for a single idea, "
+             "batch for --batch and workers)"
+    )
+    parser.add_argument(
+        "--tenant",
+        default="default",
+        help="Tenant the builds' LLM calls are fairly queued under (default: default)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of builds in flight in batch and service mode (default: 4)"
+    )
+    queue_options = parser.add_argument_group("work queue options (--enqueue, --worker)")
+    queue_options.add_argument(
+        "--queue",
+        metavar="URL",
+        help="Work queue shared by workers: a SQLite file path or backend URL "
+             "(default: <output-dir>/queue.sqlite3)"
+    )
+    queue_options.add_argument(
+        "--enqueue",
+        metavar="IDEAS_JSONL",
+        help="Add every idea in a JSONL file to the work queue for workers to build"
+    )
+    queue_options.add_argument(
+        "--queue-stats",
+        action="store_true",
+        help="Show the number of jobs per status in the work queue, and the dead-lettered ones"
+    )
+    queue_options.add_argument(
+        "--retry-dead",
+        action="store_true",
+        help="Queue every dead-lettered job again"
+    )
+    queue_options.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Attempts per queued job before it is dead-lettered (default: 3)"
+    )
+    queue_options.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=300.0,
+        help="How long a worker's lease on a job lasts without a heartbeat (default: 300)"
+    )
+    queue_options.add_argument(
+        "--exit-when-empty",
+        action="store_true",
+        help="Stop the worker once the queue has no job available instead of polling"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the build service: keep the agents warm and accept builds over HTTP"
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Build ideas from the work queue until stopped"
+    )
+    service_options = parser.add_argument_group("build service options (--serve)")
+    service_options.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Interface the build service listens on (default: 127.0.0.1)"
+    )
+    service_options.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="TCP port of the build service (default: 8765)"
+    )
+    service_options.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Serve on a Unix socket at PATH instead of TCP"
+    )
     
     args = parser.parse_args()
+    if args.overlap:
+        args.stream = True
+    if args.candidates > 1 and args.stream:
+        print("❌ Error: --candidates cannot be combined with --stream or --overlap")
+        sys.exit(1)
+    if not 0.0 <= args.trace_sample <= 1.0:
+        print("❌ Error: --trace-sample must be between 0 and 1")
+        sys.exit(1)
+    if (args.serve or args.worker) and args.idea:
+        print("❌ Error: --serve and --worker take their ideas from requests and the work queue, not the command line")
+        sys.exit(1)
+    
+    if args.list is not None or args.find or args.show or args.export:
+        run_query(args)
+        return
+    
+    if args.repair:
+        run_repair(args)
+        return
+    
+    if args.batch:
+        run_batch(args)
+        return
+    
+    if args.enqueue or args.queue_stats or args.retry_dead:
+        run_queue_admin(args)
+        return
+    
+    if args.serve:
+        run_service(args)
+        return
+    
+    if args.worker:
+        run_worker(args)
+        return
     
     # Get user idea
     if args.idea:
@@ -63,18 +449,25 @@ def main():
     
     try:
         # Initialize orchestrator
-        orchestrator = SoftwareFactoryOrchestrator(
-            model_name=args.model,
-            temperature=args.temperature,
-            base_url=args.base_url
-        )
+        orchestrator = create_orchestrator(args)
         
         # Build the solution
-        result = orchestrator.build(user_idea, args.output_dir)
+        if args.stream:
+            import asyncio
+            result = asyncio.run(orchestrator.abuild(
+                user_idea, args.output_dir, resume=args.resume, stream=True, overlap=args.overlap,
+                priority=args.priority or "interactive", tenant=args.tenant
+            ))
+        else:
+            result = orchestrator.build(
+                user_idea, args.output_dir, resume=args.resume,
+                priority=args.priority or "interactive", tenant=args.tenant
+            )
         
         # Save output
         orchestrator.save_output(result, args.output_dir)
         
+        print_cache_stats(orchestrator)
         print("\n✅ Software Factory process complete!")
         
     except KeyboardInterrupt:
@@ -85,6 +478,332 @@ def main():
         sys.exit(1)
 
 
+def create_orchestrator(args: argparse.Namespace) -> "SoftwareFactoryOrchestrator":
+    """Build the orchestrator from the command-line arguments."""
+    from orchestrator import SoftwareFactoryOrchestrator
+    
+    defaults, agent_configs = resolve_model_settings(args)
+    return SoftwareFactoryOrchestrator(
+        model_name=defaults.pop("model"),
+        temperature=defaults.pop("temperature"),
+        base_url=resolve_endpoints(args),
+        cache_dir=args.cache_dir if args.cache else None,
+        fast_path=not args.no_fast_path,
+        file_concurrency=max(1, args.file_concurrency),
+        candidates=max(1, args.candidates),
+        compact_handoffs=not args.no_compact_handoffs,
+        stop_early=not args.no_early_stop,
+        agent_mode=args.agent_mode,
+        validate=not args.no_validate,
+        run_tests=args.run_tests,
+        repair_iterations=args.repair_iterations,
+        idea_index_dir=args.idea_index,
+        embedding_model=args.embedding_model,
+        reuse_threshold=args.reuse_threshold,
+        scheduler=create_scheduler(args),
+        tracer=create_tracer(args),
+        agent_configs={
+            agent: {**defaults, **agent_configs.get(agent, {})} for agent in AGENT_NAMES
+        }
+    )
+
+
+def create_scheduler(args: argparse.Namespace) -> Optional["LLMScheduler"]:
+    """LLM call scheduler from the command-line limits, or None if --max-inflight-requests is not set."""
+    if not args.max_inflight_requests:
+        return None
+    from scheduler import LLMScheduler
+    return LLMScheduler(
+        max_requests=args.max_inflight_requests,
+        max_tokens=args.max_inflight_tokens,
+        max_queue=args.max_queue,
+        max_wait_seconds=args.max_queue_seconds
+    )
+
+
+def create_tracer(args: argparse.Namespace) -> Optional["Tracer"]:
+    """Build tracer from the command-line options, or None if --trace is not set."""
+    if not args.trace:
+        return None
+    from tracing import Tracer
+    return Tracer(args.trace, format=args.trace_format, sample_rate=args.trace_sample)
+
+
+def resolve_model_settings(
+    args: argparse.Namespace
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Combine built-in defaults, the --profile file and command-line flags.
+    
+    Returns:
+        Tuple of (parameters for every agent, agent name -> overrides)
+    """
+    defaults: Dict[str, Any] = {"model": "llama3.1", "temperature": 0.7}
+    agent_configs: Dict[str, Dict[str, Any]] = {}
+    if args.profile:
+        profile = load_profile(args.profile)
+        defaults.update(profile["defaults"])
+        agent_configs = profile["agents"]
+    
+    flags = {
+        "model": args.model,
+        "temperature": args.temperature,
+        "num_ctx": args.num_ctx,
+        "num_predict": args.num_predict,
+        "keep_alive": args.keep_alive
+    }
+    for key, value in flags.items():
+        if value is not None:
+            defaults[key] = value
+            # A global flag on the command line beats the profile's per-agent setting
+            for config in agent_configs.values():
+                config.pop(key, None)
+    
+    for agent, model in (
+        ("requirements_engineer", args.requirements_model),
+        ("backend_engineer", args.backend_model),
+        ("implementator", args.implementator_model)
+    ):
+        if model:
+            agent_configs.setdefault(agent, {})["model"] = model
+    return defaults, agent_configs
+
+
+def resolve_endpoints(args: argparse.Namespace) -> Union[str, List[Any]]:
+    """Single base URL, or the list of endpoints from --endpoints-config / a comma-separated --base-url."""
+    if args.endpoints_config:
+        with open(args.endpoints_config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        endpoints = config["endpoints"] if isinstance(config, dict) else config
+        if not endpoints:
+            raise ValueError(f"{args.endpoints_config}: no endpoints configured")
+        return endpoints
+    
+    urls = [url.strip() for url in args.base_url.split(",") if url.strip()]
+    return urls if len(urls) > 1 else args.base_url
+
+
+def print_cache_stats(orchestrator: "SoftwareFactoryOrchestrator") -> None:
+    """Print LLM response cache hit/miss counters, scheduler and tracing statistics, if enabled."""
+    stats = orchestrator.cache_stats()
+    if stats is not None:
+        print(f"\n🗄️  LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['entries']} entries, {stats['bytes'] / 1024:.1f} KiB)")
+    
+    scheduler = orchestrator.scheduler_stats()
+    if scheduler is not None:
+        for priority, counters in scheduler["classes"].items():
+            if not counters["admitted"] and not counters["shed"]:
+                continue
+            print(f"🚦 LLM scheduler [{priority}]: {counters['admitted']} admitted, {counters['shed']} rejected, "
+                  f"peak queue {counters['peak_depth']}, wait p50 {counters['wait_p50'] or 0:.2f}s "
+                  f"p99 {counters['wait_p99'] or 0:.2f}s")
+    
+    trace = orchestrator.trace_stats()
+    if trace is not None and trace["sampled"]:
+        print(f"🧵 Traced {trace['sampled']} build(s), {trace['spans']} spans, to {trace['path']} "
+              f"({trace['dropped']} not sampled)")
+
+
+def print_projects(projects: List[Dict[str, Any]]) -> None:
+    """Print one line per indexed project."""
+    if not projects:
+        print("No projects found.")
+        return
+    print(f"{'project id':<44} {'status':<10} {'updated':<16} {'seconds':>8} {'files ok/failed':>15}  idea")
+    for project in projects:
+        updated = datetime.fromtimestamp(project["updated_at"]).strftime("%Y-%m-%d %H:%M")
+        seconds = f"{project['seconds']:.1f}" if project["seconds"] is not None else "-"
+        files = f"{project['files_passed']}/{project['files_failed']}" if project["files_passed"] is not None else "-"
+        idea = project["user_idea"] if len(project["user_idea"]) <= 60 else project["user_idea"][:57] + "..."
+        print(f"{project['id']:<44} {project['status']:<10} {updated:<16} {seconds:>8} {files:>15}  {idea}")
+
+
+def run_query(args: argparse.Namespace) -> None:
+    """Answer --list/--find/--show/--export from the output directory's project store."""
+    from project_store import ProjectStore
+    
+    try:
+        store = ProjectStore(args.output_dir, read_only=True)
+    except FileNotFoundError:
+        print(f"No projects indexed in {args.output_dir}")
+        # Nothing to show or export is an error; an empty listing is not
+        sys.exit(1 if args.show or args.export else 0)
+    try:
+        if args.list is not None:
+            print_projects(store.list(limit=args.list))
+        elif args.find:
+            print_projects(store.find(args.find))
+        elif args.show:
+            project = store.get(args.show)
+            if project is None:
+                print(f"❌ Unknown project: {args.show}")
+                sys.exit(1)
+            files = project.pop("files")
+            for key, value in project.items():
+                print(f"{key:<18} {value}")
+            print(f"files ({len(files)}):")
+            for entry in files:
+                print(f"   {entry['sha256'][:12]}  {entry['size']:>8}  {entry['path']}")
+        else:
+            project_id, target_dir = args.export
+            paths = store.export(project_id, target_dir)
+            print(f"✅ Exported {len(paths)} file(s) to {target_dir}")
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    finally:
+        store.close()
+
+
+def run_repair(args: argparse.Namespace) -> None:
+    """Validate the --repair project and re-generate only its failing files."""
+    if args.repair_iterations < 1:
+        print("❌ Error: --repair needs --repair-iterations of at least 1")
+        sys.exit(1)
+    
+    try:
+        orchestrator = create_orchestrator(args)
+        result = orchestrator.repair(args.repair)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Repair interrupted by user.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+    
+    print_cache_stats(orchestrator)
+    if result["validation"]["summary"]["failed"]:
+        print(f"\n❌ {result['validation']['summary']['failed']} file(s) still failing validation")
+        sys.exit(1)
+    print("\n✅ Every generated file passes validation")
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    """Build every idea from the --batch file and report throughput."""
+    try:
+        ideas = load_ideas(args.batch)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading batch file: {e}")
+        sys.exit(1)
+    
+    if not ideas:
+        print("No ideas found in batch file. Exiting.")
+        sys.exit(1)
+    
+    try:
+        orchestrator = create_orchestrator(args)
+        
+        import asyncio
+        summary = asyncio.run(orchestrator.build_many(
+            ideas,
+            base_output_dir=args.output_dir,
+            concurrency=args.concurrency,
+            resume=args.resume,
+            stream=args.stream,
+            overlap=args.overlap,
+            prometheus_path=args.prometheus_file,
+            priority=args.priority or "batch",
+            tenant=args.tenant
+        ))
+        
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Batch interrupted by user.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+    
+    print("\n" + "=" * 80)
+    print(f"📦 Batch complete: {summary['succeeded']}/{summary['total']} succeeded, "
+          f"{summary['failed']} failed")
+    print(f"   Elapsed: {summary['seconds']:.1f}s "
+          f"({summary['ideas_per_minute']:.2f} ideas/minute)")
+    print(f"   Results: {summary['results_path']}")
+    if summary.get("prometheus_path"):
+        print(f"   Metrics: {summary['prometheus_path']}")
+    print_cache_stats(orchestrator)
+    
+    if summary["failed"]:
+        sys.exit(1)
+
+
+def run_service(args: argparse.Namespace) -> None:
+    """Serve builds over HTTP from one orchestrator whose agents stay warm."""
+    orchestrator = None
+    try:
+        orchestrator = create_orchestrator(args)
+        print(f"🔥 Agents ready in {orchestrator.warm_up():.2f}s")
+        
+        import asyncio
+        from service import BuildService
+        service = BuildService(orchestrator, base_output_dir=args.output_dir, concurrency=args.concurrency)
+        asyncio.run(service.serve(host=args.host, port=args.port, socket_path=args.socket))
+        
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Service stopped.")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+    if orchestrator:
+        print_cache_stats(orchestrator)
+
+
+def queue_url(args: argparse.Namespace) -> str:
+    return args.queue or os.path.join(args.output_dir, "queue.sqlite3")
+
+
+def run_queue_admin(args: argparse.Namespace) -> None:
+    """Enqueue ideas, re-queue dead letters, or show the work queue's state."""
+    from work_queue import open_queue
+    
+    try:
+        queue = open_queue(queue_url(args))
+        if args.enqueue:
+            ideas = load_ideas(args.enqueue)
+            ids = queue.enqueue(ideas, max_attempts=args.max_attempts)
+            print(f"📥 Queued {len(ids)} idea(s) in {queue_url(args)}")
+        if args.retry_dead:
+            print(f"🔁 Re-queued {queue.retry_dead()} dead-lettered job(s)")
+        stats = queue.stats()
+        print("   " + ", ".join(f"{status}: {count}" for status, count in stats.items()))
+        if args.queue_stats and stats.get("dead"):
+            print("\nDead-lettered jobs:")
+            for job in queue.dead_letters():
+                print(f"   {job['id']:>6}  {job['idea'][:50]:<50}  {job['error']}")
+        queue.close()
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    """Build ideas from the work queue until stopped (or until it is empty with --exit-when-empty)."""
+    from work_queue import QueueWorker, open_queue
+    
+    try:
+        orchestrator = create_orchestrator(args)
+        worker = QueueWorker(
+            orchestrator,
+            open_queue(queue_url(args)),
+            base_output_dir=args.output_dir,
+            lease_seconds=args.lease_seconds,
+            tenant=args.tenant
+        )
+        print(f"👷 Worker {worker.worker_id} polling {queue_url(args)}")
+        counts = worker.run(exit_when_empty=args.exit_when_empty)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Worker stopped; its current job was returned to the queue.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+    
+    print(f"\n👷 Worker done: {counts['succeeded']} succeeded, {counts['failed']} failed, "
+          f"{counts['lost']} lost to an expired lease")
+    print_cache_stats(orchestrator)
+
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,369 @@
+"""
+Build Metrics
+
+Per-phase instrumentation built on LangChain callbacks. While a phase runs,
+its handler is attached to every LangChain run in the build's context (via
+a configure hook on a ContextVar, so concurrent builds are kept apart) and
+records LLM calls, tool calls, prompt/completion tokens, time-to-first-token,
+retries and errors, plus the model-load and prompt-eval time Ollama reports,
+a rough estimate of the prompt-eval time its prefix cache saved, the time
+calls waited for admission by the scheduler, and the handoff tokens saved by
+compaction. A call whose stream is closed early (a generation stopped once
+its sections were complete, or a cancelled speculative candidate) is not an
+error; its completion tokens are counted from the streamed chunks.
+
+The report is saved as `metrics.json` next to `requirements.md`; batch runs
+can also dump aggregated counters in the Prometheus text format.
+"""
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+from contextlib import contextmanager
+from contextvars import ContextVar
+from tracing import span
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+import asyncio
+import threading
+import time
+
+
+_active_handler: ContextVar[Optional["PhaseMetricsHandler"]] = ContextVar(
+    "software_factory_phase_metrics", default=None
+)
+register_configure_hook(_active_handler, inheritable=True)
+
+# Counters summed into the build totals
+COUNTERS = (
+    "llm_calls", "tool_calls", "prompt_tokens", "completion_tokens", "retries", "llm_errors", "tool_errors",
+    "load_seconds", "prompt_eval_seconds", "prompt_eval_seconds_saved", "queue_seconds", "handoff_tokens_saved"
+)
+
+# Rough characters per token, to size prompts when Ollama only counts the
+# tokens it had to evaluate
+CHARS_PER_TOKEN = 4
+
+# Calls with shorter prompts are too noisy to learn a prompt-eval rate from
+MIN_RATE_TOKENS = 64
+
+
+
+def record_retry() -> None:
+    """Count a retried call (e.g. an Ollama endpoint refusing the connection) against the current phase."""
+    handler = _active_handler.get()
+    if handler:
+        handler.record_retry()
+
+
+def record_queue_wait(seconds: float) -> None:
+    """Count time an LLM call waited for admission by the scheduler against the current phase."""
+    handler = _active_handler.get()
+    if handler:
+        handler.record_queue_wait(seconds)
+
+
+def record_handoff_saving(tokens: int) -> None:
+    """Count the tokens compaction removed from the current phase's input."""
+    handler = _active_handler.get()
+    if handler:
+        handler.record_handoff_saving(tokens)
+
+
+class PromptEvalRates:
+    """
+    Uncached prompt-eval rate of each model on each endpoint: the slowest
+    seconds per token seen, i.e. the rate of a prompt with nothing cached.
+
+    Owned by whoever runs the builds (the orchestrator), so estimates do not
+    depend on other orchestrators' models and servers in the same process.
+    """
+
+    def __init__(self):
+        self._rates: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, endpoint: str, seconds: float, tokens: int) -> float:
+        """Learn from a call's prompt-eval time and return the model's uncached rate on the endpoint."""
+        key = (model, endpoint)
+        with self._lock:
+            if tokens >= MIN_RATE_TOKENS and seconds:
+                self._rates[key] = max(self._rates.get(key, 0.0), seconds / tokens)
+            return self._rates.get(key, 0.0)
+
+
+class PhaseMetricsHandler(BaseCallbackHandler):
+    """Collects call, token and latency counters for one phase."""
+
+    # Counting is cheap; run inline instead of in an executor for async runs
+    run_inline = True
+
+    def __init__(self, eval_rates: Optional[PromptEvalRates] = None):
+        self.eval_rates = eval_rates or PromptEvalRates()
+        self.counters = {name: 0 for name in COUNTERS}
+        self.time_to_first_token: List[float] = []
+        self._started: Dict[UUID, float] = {}
+        self._prompt_chars: Dict[UUID, int] = {}
+        self._streamed: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start_call(run_id, sum(len(str(message.content)) for batch in messages for message in batch))
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start_call(run_id, sum(len(prompt) for prompt in prompts))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if not token:
+            return
+        with self._lock:
+            self._streamed[run_id] = self._streamed.get(run_id, 0) + 1
+            started = self._started.pop(run_id, None)
+            if started is not None:
+                self.time_to_first_token.append(round(time.perf_counter() - started, 3))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_tokens, completion_tokens = token_usage(response)
+        with self._lock:
+            self._started.pop(run_id, None)
+            self._streamed.pop(run_id, None)
+            prompt_chars = self._prompt_chars.pop(run_id, 0)
+        load, prompt_eval, saved = _prompt_eval_timing(response, prompt_chars, self.eval_rates)
+        with self._lock:
+            self.counters["prompt_tokens"] += prompt_tokens
+            self.counters["completion_tokens"] += completion_tokens
+            self.counters["load_seconds"] += load
+            self.counters["prompt_eval_seconds"] += prompt_eval
+            self.counters["prompt_eval_seconds_saved"] += saved
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._started.pop(run_id, None)
+            self._prompt_chars.pop(run_id, None)
+            streamed = self._streamed.pop(run_id, 0)
+            if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+                # Stream closed on purpose; Ollama streams one token per chunk
+                self.counters["completion_tokens"] += streamed
+            else:
+                self.counters["llm_errors"] += 1
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self.counters["tool_calls"] += 1
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self.counters["tool_errors"] += 1
+
+    def on_retry(self, retry_state: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.record_retry()
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.counters["retries"] += 1
+
+    def record_queue_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.counters["queue_seconds"] += seconds
+
+    def record_handoff_saving(self, tokens: int) -> None:
+        with self._lock:
+            self.counters["handoff_tokens_saved"] += tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                name: round(value, 3) if isinstance(value, float) else value
+                for name, value in self.counters.items()
+            }
+            return {**counters, "time_to_first_token": list(self.time_to_first_token)}
+
+    def _start_call(self, run_id: UUID, prompt_chars: int) -> None:
+        with self._lock:
+            self.counters["llm_calls"] += 1
+            self._started[run_id] = time.perf_counter()
+            self._prompt_chars[run_id] = prompt_chars
+
+
+def token_usage(response: LLMResult) -> Tuple[int, int]:
+    """Prompt and completion tokens of an LLM result (usage metadata, or Ollama's eval counts)."""
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage and ("input_tokens" in usage or "output_tokens" in usage):
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                continue
+            info = generation.generation_info or {}
+            prompt_tokens += info.get("prompt_eval_count") or 0
+            completion_tokens += info.get("eval_count") or 0
+    return prompt_tokens, completion_tokens
+
+
+def _prompt_eval_timing(
+    response: LLMResult,
+    prompt_chars: int,
+    eval_rates: PromptEvalRates
+) -> Tuple[float, float, float]:
+    """
+    Model-load and prompt-eval seconds Ollama reported for a call, and the prompt-eval seconds saved.
+
+    A loaded model keeps the KV state of the prompts it has evaluated, and
+    Ollama only evaluates the part of a new prompt after the longest cached
+    prefix. The saving is estimated as the time the whole prompt takes at the
+    model's uncached rate on the endpoint that served the call (the slowest
+    seen) minus the time actually spent, so it is a rough figure until a few
+    calls have been seen. Cache hits and models that report no timings count
+    as zero.
+    """
+    load = prompt_eval = saved = 0.0
+    for generations in response.generations:
+        for generation in generations:
+            info = generation.generation_info or {}
+            if info.get("from_cache") or "prompt_eval_duration" not in info:
+                continue
+            seconds = info["prompt_eval_duration"] / 1e9
+            load += (info.get("load_duration") or 0) / 1e9
+            prompt_eval += seconds
+
+            # Ollama may count only the evaluated suffix; size the prompt from its text too
+            tokens = max(info.get("prompt_eval_count") or 0, prompt_chars // CHARS_PER_TOKEN)
+            # Pooled clients tag the endpoint; a single server has none
+            uncached_rate = eval_rates.observe(info.get("model", ""), info.get("endpoint", ""), seconds, tokens)
+            saved += max(0.0, tokens * uncached_rate - seconds)
+    return load, prompt_eval, saved
+
+
+class BuildMetrics:
+    """Metrics of one build, one handler per phase."""
+
+    def __init__(self, eval_rates: Optional[PromptEvalRates] = None):
+        """
+        Args:
+            eval_rates: Uncached prompt-eval rates learned so far, shared by the
+                builds of one orchestrator (default: learned within this build)
+        """
+        self.eval_rates = eval_rates or PromptEvalRates()
+        self.handlers: Dict[str, PhaseMetricsHandler] = {}
+
+    def handler(self, phase: str) -> PhaseMetricsHandler:
+        if phase not in self.handlers:
+            self.handlers[phase] = PhaseMetricsHandler(self.eval_rates)
+        return self.handlers[phase]
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[PhaseMetricsHandler]:
+        """Attribute every LangChain run started in this context to `phase` (and trace it as a span)."""
+        handler = self.handler(phase)
+        token = _active_handler.set(handler)
+        try:
+            with span(phase, "phase"):
+                yield handler
+        finally:
+            _active_handler.reset(token)
+
+    def report(self, phases: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the metrics report.
+
+        Args:
+            phases: Phase name -> `model`, `seconds` (wall time) and `resumed`
+
+        Returns:
+            Dictionary with per-phase metrics and build totals; resumed
+            phases are reported but not counted in the totals
+        """
+        report_phases = {}
+        totals: Dict[str, Any] = {"wall_seconds": 0.0, **{name: 0 for name in COUNTERS}}
+        for phase, summary in phases.items():
+            metrics = {
+                "model": summary["model"],
+                "wall_seconds": summary["seconds"],
+                "resumed": summary["resumed"],
+                **self.handler(phase).snapshot()
+            }
+            report_phases[phase] = metrics
+            if summary["resumed"]:
+                continue
+            totals["wall_seconds"] += summary["seconds"] or 0.0
+            for name in COUNTERS:
+                totals[name] += metrics[name]
+        for name, value in totals.items():
+            if isinstance(value, float):
+                totals[name] = round(value, 3)
+        return {"phases": report_phases, "totals": totals}
+
+
+def to_prometheus(reports: Iterable[Dict[str, Any]], statuses: Optional[Dict[str, int]] = None) -> str:
+    """
+    Aggregate build metrics reports into Prometheus text exposition format.
+
+    Args:
+        reports: Reports from BuildMetrics.report()
+        statuses: Build counts by status (e.g. succeeded/failed)
+
+    Returns:
+        Metrics text, suitable for the node exporter's textfile collector
+    """
+    phase_totals: Dict[str, Dict[str, float]] = {}
+    for report in reports:
+        for phase, metrics in report["phases"].items():
+            if metrics["resumed"]:
+                continue
+            totals = phase_totals.setdefault(phase, {
+                "wall_seconds": 0.0, "ttft_sum": 0.0, "ttft_count": 0, **{name: 0 for name in COUNTERS}
+            })
+            totals["wall_seconds"] += metrics["wall_seconds"] or 0.0
+            totals["ttft_sum"] += sum(metrics["time_to_first_token"])
+            totals["ttft_count"] += len(metrics["time_to_first_token"])
+            for name in COUNTERS:
+                totals[name] += metrics[name]
+
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List[tuple]) -> None:
+        lines.append(f"# HELP software_factory_{name} {help_text}")
+        lines.append(f"# TYPE software_factory_{name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+            lines.append(f"software_factory_{name}{{{label_text}}} {value:g}")
+
+    if statuses is not None:
+        metric("builds_total", "counter", "Builds finished, by status.",
+               [({"status": status}, count) for status, count in statuses.items()])
+
+    phases = sorted(phase_totals.items())
+    metric("phase_seconds_total", "counter", "Wall time spent in each phase.",
+           [({"phase": phase}, t["wall_seconds"]) for phase, t in phases])
+    metric("llm_calls_total", "counter", "LLM calls per phase.",
+           [({"phase": phase}, t["llm_calls"]) for phase, t in phases])
+    metric("tool_calls_total", "counter", "Agent tool calls per phase.",
+           [({"phase": phase}, t["tool_calls"]) for phase, t in phases])
+    metric("tokens_total", "counter", "Prompt and completion tokens per phase.",
+           [({"phase": phase, "type": "prompt"}, t["prompt_tokens"]) for phase, t in phases]
+           + [({"phase": phase, "type": "completion"}, t["completion_tokens"]) for phase, t in phases])
+    metric("retries_total", "counter", "Retried LLM calls per phase.",
+           [({"phase": phase}, t["retries"]) for phase, t in phases])
+    metric("errors_total", "counter", "Failed LLM and tool calls per phase.",
+           [({"phase": phase, "source": "llm"}, t["llm_errors"]) for phase, t in phases]
+           + [({"phase": phase, "source": "tool"}, t["tool_errors"]) for phase, t in phases])
+    metric("model_load_seconds_total", "counter", "Seconds Ollama spent loading models, per phase.",
+           [({"phase": phase}, t["load_seconds"]) for phase, t in phases])
+    metric("prompt_eval_seconds_total", "counter", "Seconds Ollama spent evaluating prompts, per phase.",
+           [({"phase": phase}, t["prompt_eval_seconds"]) for phase, t in phases])
+    metric("prompt_eval_seconds_saved_total", "counter",
+           "Estimated prompt-eval seconds saved by cached prompt prefixes, per phase.",
+           [({"phase": phase}, t["prompt_eval_seconds_saved"]) for phase, t in phases])
+    metric("llm_queue_seconds_total", "counter",
+           "Seconds LLM calls waited for admission by the scheduler, per phase.",
+           [({"phase": phase}, t["queue_seconds"]) for phase, t in phases])
+    metric("handoff_tokens_saved_total", "counter",
+           "Estimated input tokens removed by compacting the handoff from the previous phase, per phase.",
+           [({"phase": phase}, t["handoff_tokens_saved"]) for phase, t in phases])
+    lines.append("# HELP software_factory_time_to_first_token_seconds Time from an LLM call to its first streamed token.")
+    lines.append("# TYPE software_factory_time_to_first_token_seconds summary")
+    for phase, t in phases:
+        lines.append(f'software_factory_time_to_first_token_seconds_sum{{phase="{phase}"}} {t["ttft_sum"]:g}')
+        lines.append(f'software_factory_time_to_first_token_seconds_count{{phase="{phase}"}} {t["ttft_count"]:g}')
+    return "\n".join(lines) + "\n"
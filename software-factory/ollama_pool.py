@@ -0,0 +1,360 @@
+"""
+Ollama Endpoint Pool
+
+Spreads chat model calls across several Ollama servers.
+
+Each endpoint keeps one long-lived `ChatOllama` (and with it one pooled HTTP
+client) per model configuration, so connections are reused across calls, and
+several models can share one pool. Calls are routed to the healthy endpoint
+with the fewest outstanding requests, never exceeding an endpoint's
+concurrency cap. Endpoints that refuse connections are marked
+unhealthy, the call is retried elsewhere, and unhealthy endpoints are probed
+again via `/api/version` after `health_check_interval` seconds.
+"""
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_ollama import ChatOllama
+from pydantic import ConfigDict
+from metrics import record_retry
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Union
+import asyncio
+import httpx
+import itertools
+import json
+import threading
+import time
+import urllib.request
+
+
+# Raised when an endpoint refuses the connection: nothing was sent, so the call
+# can safely be retried elsewhere. The ollama client maps these to
+# ConnectionError for plain requests but not for streamed ones.
+CONNECT_ERRORS = (ConnectionError, httpx.ConnectError)
+
+
+class Endpoint:
+    """One Ollama server in the pool."""
+
+    def __init__(self, url: str, max_concurrency: int = 4):
+        self.url = url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.healthy = True
+        self.last_checked = 0.0
+        self.requests = 0
+        self.failures = 0
+        # Tie-breaker so equally loaded endpoints are used round-robin
+        self.last_assigned = 0
+        self._clients: Dict[str, ChatOllama] = {}
+
+    def client(self, chat_kwargs: Dict[str, Any]) -> ChatOllama:
+        """The endpoint's client for a model configuration, created on first use."""
+        key = json.dumps(chat_kwargs, sort_keys=True)
+        if key not in self._clients:
+            self._clients[key] = ChatOllama(base_url=self.url, **chat_kwargs)
+        return self._clients[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "failures": self.failures
+        }
+
+
+class NoHealthyEndpointError(RuntimeError):
+    """Raised when every endpoint in the pool is down."""
+
+
+class EndpointPool:
+    """Least-outstanding-requests routing over a set of Ollama endpoints."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[Union[str, Dict[str, Any]]],
+        health_check_interval: float = 30.0,
+        health_check_timeout: float = 2.0
+    ):
+        """
+        Args:
+            endpoints: Base URLs, or dicts with `url` and optional `max_concurrency`
+            health_check_interval: Seconds before an unhealthy endpoint is probed again
+            health_check_timeout: Timeout for a health probe
+        """
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.endpoints: List[Endpoint] = []
+        for entry in endpoints:
+            if isinstance(entry, str):
+                entry = {"url": entry}
+            self.endpoints.append(Endpoint(
+                entry["url"],
+                max_concurrency=int(entry.get("max_concurrency", 4))
+            ))
+
+        self._condition = threading.Condition()
+        self._async_waiters: List[asyncio.Future] = []
+        self._counter = itertools.count(1)
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def check_health(self, endpoint: Endpoint) -> bool:
+        """Probe an endpoint's `/api/version` and record the result."""
+        try:
+            with urllib.request.urlopen(
+                f"{endpoint.url}/api/version", timeout=self.health_check_timeout
+            ) as response:
+                json.loads(response.read() or b"{}")
+                healthy = response.status == 200
+        except (OSError, ValueError):
+            healthy = False
+
+        with self._condition:
+            endpoint.healthy = healthy
+            endpoint.last_checked = time.monotonic()
+            self._notify()
+        return healthy
+
+    def _recheck_unhealthy(self, force: bool = False) -> None:
+        """Probe unhealthy endpoints whose health check interval has elapsed."""
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if not endpoint.healthy and (force or now - endpoint.last_checked >= self.health_check_interval):
+                self.check_health(endpoint)
+
+    def _try_acquire(self) -> Optional[Endpoint]:
+        """Reserve the least-loaded healthy endpoint with spare capacity (lock held)."""
+        candidates = [
+            endpoint for endpoint in self.endpoints
+            if endpoint.healthy and endpoint.outstanding < endpoint.max_concurrency
+        ]
+        if not candidates:
+            return None
+        endpoint = min(candidates, key=lambda e: (e.outstanding, e.last_assigned))
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        endpoint.last_assigned = next(self._counter)
+        return endpoint
+
+    def _ensure_any_healthy(self) -> None:
+        if any(endpoint.healthy for endpoint in self.endpoints):
+            return
+        self._recheck_unhealthy(force=True)
+        if not any(endpoint.healthy for endpoint in self.endpoints):
+            raise NoHealthyEndpointError(f"No healthy Ollama endpoints: {', '.join(self.urls)}")
+
+    def acquire(self) -> Endpoint:
+        """Block until an endpoint has capacity, then reserve it."""
+        self._recheck_unhealthy()
+        while True:
+            self._ensure_any_healthy()
+            with self._condition:
+                endpoint = self._try_acquire()
+                if endpoint:
+                    return endpoint
+                self._condition.wait(timeout=self.health_check_interval)
+
+    async def aacquire(self) -> Endpoint:
+        """Async version of acquire()."""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Health probes block, so they run off the event loop (only needed with endpoints down)
+            if not all(endpoint.healthy for endpoint in self.endpoints):
+                await loop.run_in_executor(None, self._recheck_unhealthy)
+                await loop.run_in_executor(None, self._ensure_any_healthy)
+            with self._condition:
+                endpoint = self._try_acquire()
+                if endpoint:
+                    return endpoint
+                waiter = loop.create_future()
+                self._async_waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout=self.health_check_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, endpoint: Endpoint, failed: bool = False) -> None:
+        """Return an endpoint's slot; a connection failure marks it unhealthy."""
+        with self._condition:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.failures += 1
+                endpoint.healthy = False
+                endpoint.last_checked = time.monotonic()
+            self._notify()
+
+    def _notify(self) -> None:
+        """Wake sync and async waiters (lock held)."""
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+
+    def call(self, chat_kwargs: Dict[str, Any], func: Callable[[ChatOllama], Any]) -> Any:
+        """Run `func` against an endpoint's client, retrying elsewhere if the endpoint refuses connections."""
+        for _ in range(len(self.endpoints)):
+            endpoint = self.acquire()
+            try:
+                result = func(endpoint.client(chat_kwargs))
+            except CONNECT_ERRORS:
+                self.release(endpoint, failed=True)
+                record_retry()
+                continue
+            except BaseException:
+                self.release(endpoint)
+                raise
+            self.release(endpoint)
+            return result
+        raise NoHealthyEndpointError(f"No healthy Ollama endpoints: {', '.join(self.urls)}")
+
+    async def acall(self, chat_kwargs: Dict[str, Any], func: Callable[[ChatOllama], Any]) -> Any:
+        """Async version of call(); `func` returns an awaitable."""
+        for _ in range(len(self.endpoints)):
+            endpoint = await self.aacquire()
+            try:
+                result = await func(endpoint.client(chat_kwargs))
+            except CONNECT_ERRORS:
+                self.release(endpoint, failed=True)
+                record_retry()
+                continue
+            except BaseException:
+                self.release(endpoint)
+                raise
+            self.release(endpoint)
+            return result
+        raise NoHealthyEndpointError(f"No healthy Ollama endpoints: {', '.join(self.urls)}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._condition:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class PooledChatOllama(BaseChatModel):
+    """Chat model that routes every call through an EndpointPool."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    pool: EndpointPool
+    # ChatOllama parameters (model, temperature, num_ctx, ...) for every call
+    chat_kwargs: Dict[str, Any]
+
+    @property
+    def _llm_type(self) -> str:
+        return "pooled-chat-ollama"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {**self.chat_kwargs, "endpoints": self.pool.urls}
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Any = None, **kwargs: Any):
+        """Bind tools in the OpenAI tool format Ollama expects (tool_choice is not supported)."""
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return super().bind(tools=formatted_tools, **kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        return self.pool.call(
+            self.chat_kwargs,
+            lambda client: _tag_endpoint(
+                client._generate(messages, stop=stop, run_manager=run_manager, **kwargs), client.base_url
+            )
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        async def generate(client: ChatOllama) -> ChatResult:
+            result = await client._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return _tag_endpoint(result, client.base_url)
+
+        return await self.pool.acall(self.chat_kwargs, generate)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        # A refused connection is retried elsewhere; once tokens have been
+        # yielded the call can no longer move to another endpoint
+        for attempt in range(len(self.pool.endpoints)):
+            endpoint = self.pool.acquire()
+            yielded = failed = False
+            try:
+                for chunk in endpoint.client(self.chat_kwargs)._stream(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ):
+                    yielded = True
+                    if chunk.generation_info:
+                        chunk.generation_info["endpoint"] = endpoint.url
+                    yield chunk
+                return
+            except CONNECT_ERRORS:
+                failed = True
+                if yielded or attempt == len(self.pool.endpoints) - 1:
+                    raise
+                record_retry()
+            finally:
+                self.pool.release(endpoint, failed=failed)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for attempt in range(len(self.pool.endpoints)):
+            endpoint = await self.pool.aacquire()
+            yielded = failed = False
+            try:
+                async for chunk in endpoint.client(self.chat_kwargs)._astream(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ):
+                    yielded = True
+                    if chunk.generation_info:
+                        chunk.generation_info["endpoint"] = endpoint.url
+                    yield chunk
+                return
+            except CONNECT_ERRORS:
+                failed = True
+                if yielded or attempt == len(self.pool.endpoints) - 1:
+                    raise
+                record_retry()
+            finally:
+                self.pool.release(endpoint, failed=failed)
+
+
+def _tag_endpoint(result: ChatResult, url: str) -> ChatResult:
+    """Record which endpoint served a call, so its timings are compared against that server's."""
+    for generation in result.generations:
+        generation.generation_info = {**(generation.generation_info or {}), "endpoint": url}
+    return result
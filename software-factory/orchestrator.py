@@ -5,13 +5,35 @@ Coordinates the Requirements Engineer and Backend Software Engineer agents
 to transform high-level user ideas into working backend code.
 """
 
-from langchain_ollama import ChatOllama
-from requirements_engineer import RequirementsEngineer
-from backend_engineer import BackendEngineer
-from implementator import Implementator
-from typing import Dict, Any, Optional
+from checkpoint import CheckpointStore
+from streaming import TokenSink
+from profiles import pin_shared_models, resolve_agent_configs
+from metrics import BuildMetrics, PromptEvalRates, record_handoff_saving, to_prometheus
+from idea_index import DEFAULT_EMBEDDING_MODEL, DEFAULT_REUSE_THRESHOLD
+from project_store import ProjectStore, make_project_id
+from priorities import DEFAULT_TENANT, request_class
+from tracing import span
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterable, List, Optional, Sequence, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import asyncio
+import json
 import os
 import re
+import time
+
+# The agents, langchain_ollama and langchain_classic are slow to import; they
+# are loaded when the first agent is built rather than on import
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models import BaseChatModel
+    from idea_index import IdeaIndex
+    from requirements_engineer import RequirementsEngineer
+    from backend_engineer import BackendEngineer
+    from implementator import Implementator
+    from llm_cache import LLMResponseCache
+    from scheduler import LLMScheduler
+    from tracing import Tracer
 
 
 class SoftwareFactoryOrchestrator:
@@ -21,13 +43,39 @@ class SoftwareFactoryOrchestrator:
     Workflow:
     1. Requirements Engineer analyzes user idea
     2. Backend Software Engineer implements solution
+    3. Implementator writes the code files
+    4. Every generated file is validated in parallel across a process pool
+    5. Files that failed validation are sent back to the Implementator, each
+       on its own, for a bounded number of repair iterations
+    
+    Each phase's output is checkpointed under the project directory as soon as
+    it completes, so an interrupted build can be resumed. Agents and their
+    LLM clients are built on first use.
     """
     
     def __init__(
         self,
         model_name: str = "llama3.1",
         temperature: float = 0.7,
-        base_url: str = "http://localhost:11434"
+        base_url: Union[str, Sequence[Union[str, Dict[str, Any]]]] = "http://localhost:11434",
+        cache_dir: Optional[str] = None,
+        fast_path: bool = True,
+        file_concurrency: int = 4,
+        candidates: int = 1,
+        compact_handoffs: bool = True,
+        stop_early: bool = True,
+        agent_configs: Optional[Dict[str, Dict[str, Any]]] = None,
+        llm: Optional["BaseChatModel"] = None,
+        agent_mode: bool = False,
+        validate: bool = True,
+        run_tests: bool = False,
+        repair_iterations: int = 2,
+        idea_index_dir: Optional[str] = None,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        embedder: Optional["Embeddings"] = None,
+        reuse_threshold: float = DEFAULT_REUSE_THRESHOLD,
+        scheduler: Optional["LLMScheduler"] = None,
+        tracer: Optional["Tracer"] = None
     ):
         """
         Initialize the orchestrator with agents.
@@ -35,18 +83,269 @@ class SoftwareFactoryOrchestrator:
         Args:
             model_name: Ollama model to use
             temperature: Temperature for LLM
-            base_url: Ollama base URL
+            base_url: Ollama base URL, or a list of endpoints (URLs or dicts with
+                `url` and `max_concurrency`) to load-balance across
+            cache_dir: Directory for the on-disk LLM response cache (None disables caching)
+            fast_path: Write code blocks that can be mapped to a file directly instead
+                of through the Implementator agent
+            file_concurrency: Generate the files of the plan's project structure with
+                this many independent Implementator calls at a time (1 uses a single
+                agent loop for the whole plan)
+            candidates: Generate this many implementations concurrently in phase 2 and
+                keep the first one in the required format, cancelling the others
+                (streamed builds generate a single implementation)
+            compact_handoffs: Send the Backend Engineer only the requirement bullets and
+                the Implementator only the plan's project structure and code
+            stop_early: Stop the Requirements and Backend Engineers' generation once the
+                sections the next phase needs are complete (chain mode only)
+            agent_configs: Per-agent overrides of model, temperature, num_ctx, num_predict
+                and keep_alive, keyed by "requirements_engineer", "backend_engineer"
+                and "implementator"; agents sharing a model share its num_ctx
+            llm: Chat model used by every agent instead of connecting to Ollama
+                (e.g. a scripted model for offline benchmarks); `base_url`,
+                `cache_dir` and the model parameters are then ignored
+            agent_mode: Run the Requirements and Backend Engineers as tool-calling
+                agents instead of single-call chains
+            validate: Compile the generated files and resolve their imports after code generation
+            run_tests: Also run generated test files with CPU and time limits (not
+                isolated from the filesystem)
+            repair_iterations: Maximum rounds of re-generating only the files that
+                failed validation (0 disables repair)
+            idea_index_dir: Directory of the index of past ideas and their requirements;
+                a new idea similar enough to a past one reuses its requirements
+                (None disables the index)
+            embedding_model: Ollama embedding model for the idea index
+            embedder: Embeddings for the idea index instead of `embedding_model`
+            reuse_threshold: Cosine similarity at or above which past requirements are reused
+            scheduler: Admission control for every LLM call (priority classes, per-tenant
+                fairness, in-flight request and token caps); None sends calls straight through
+            tracer: Records sampled builds as traces of their phases, LLM and tool
+                calls and file writes (None disables tracing)
         """
-        llm = ChatOllama(
-            model=model_name,
-            temperature=temperature,
-            base_url=base_url
-        )
+        self.fast_path = fast_path
+        self.file_concurrency = file_concurrency
+        self.candidates = candidates
+        self.compact_handoffs = compact_handoffs
+        self.stop_early = stop_early
+        self.base_url = base_url
+        self.agent_configs = pin_shared_models(resolve_agent_configs(
+            {"model": model_name, "temperature": temperature}, agent_configs
+        ))
+        self.cache_dir = cache_dir
+        self.mode = "agent" if agent_mode else "chain"
+        self.validate = validate
+        self.run_tests = run_tests
+        self.repair_iterations = repair_iterations
+        self.idea_index_dir = idea_index_dir
+        self.embedding_model = embedding_model
+        self.reuse_threshold = reuse_threshold
+        self._embedder = embedder
+        self._idea_index: Optional["IdeaIndex"] = None
+        self._stores: Dict[str, ProjectStore] = {}
+        self.scheduler = scheduler
+        self.tracer = tracer
+        self.pool = None
+        self._validation_pool: Optional[ProcessPoolExecutor] = None
+        self.llm_caches: List["LLMResponseCache"] = []
+        # Prompt-eval rates behind the prefix-cache savings estimate, per model and endpoint
+        self.eval_rates = PromptEvalRates()
+        self._injected_llm = llm
+        self._llms: Dict[str, "BaseChatModel"] = {}
+        self._agents: Dict[str, Any] = {}
+    
+    @property
+    def requirements_engineer(self) -> "RequirementsEngineer":
+        """Requirements Engineer agent, built on first use."""
+        if "requirements_engineer" not in self._agents:
+            from requirements_engineer import RequirementsEngineer
+            self._agents["requirements_engineer"] = RequirementsEngineer(
+                self._llm_for("requirements_engineer"), mode=self.mode, stop_early=self.stop_early
+            )
+        return self._agents["requirements_engineer"]
+    
+    @property
+    def backend_engineer(self) -> "BackendEngineer":
+        """Backend Engineer agent, built on first use."""
+        if "backend_engineer" not in self._agents:
+            from backend_engineer import BackendEngineer
+            self._agents["backend_engineer"] = BackendEngineer(
+                self._llm_for("backend_engineer"), mode=self.mode, stop_early=self.stop_early
+            )
+        return self._agents["backend_engineer"]
+    
+    @property
+    def implementator(self) -> "Implementator":
+        """Implementator agent, built on first use."""
+        if "implementator" not in self._agents:
+            from implementator import Implementator
+            self._agents["implementator"] = Implementator(self._llm_for("implementator"))
+        return self._agents["implementator"]
+    
+    def _llm_for(self, agent: str) -> "BaseChatModel":
+        """An agent's LLM; agents with identical configurations share one LLM (and its cache)."""
+        if self._injected_llm is not None:
+            if self.scheduler is None:
+                return self._injected_llm
+            if "injected" not in self._llms:
+                from scheduler import ScheduledChatModel
+                self._llms["injected"] = ScheduledChatModel(llm=self._injected_llm, scheduler=self.scheduler)
+            return self._llms["injected"]
+        key = json.dumps(self.agent_configs[agent], sort_keys=True)
+        if key not in self._llms:
+            self._llms[key] = self._create_llm(agent, self.cache_dir)
+        return self._llms[key]
+    
+    def _model_config(self, agent: str) -> Dict[str, Any]:
+        """Settings that determine an agent's output (keep_alive only affects server memory)."""
+        config = {k: v for k, v in self.agent_configs[agent].items() if k != "keep_alive"}
+        config["base_url"] = self.base_url
+        return config
+    
+    def _create_llm(self, agent: str, cache_dir: Optional[str]) -> "BaseChatModel":
+        """Create an agent's chat model: its client, behind the scheduler if there is one, with its cache in front."""
+        config = self.agent_configs[agent]
+        cache = None
+        if cache_dir:
+            from llm_cache import LLMResponseCache
+            namespace = json.dumps(self._model_config(agent), sort_keys=True)
+            cache = LLMResponseCache(cache_dir, namespace=namespace)
+            self.llm_caches.append(cache)
+        
+        options = {
+            # False (rather than None) so a globally configured cache is not picked up either
+            "cache": cache if cache else False,
+            # AgentExecutor drives the model through stream(), which bypasses the
+            # cache; route it through invoke() instead (ChatOllama still streams
+            # tokens from the server internally)
+            "disable_streaming": bool(cache)
+        }
+        if self.scheduler is not None:
+            from scheduler import DEFAULT_MAX_OUTPUT_TOKENS, ScheduledChatModel
+            # The cache sits in front of the scheduler, so cache hits are never queued
+            num_predict = config.get("num_predict") or 0
+            return ScheduledChatModel(
+                llm=self._connect(config, {"cache": False}),
+                scheduler=self.scheduler,
+                max_output_tokens=num_predict if num_predict > 0 else DEFAULT_MAX_OUTPUT_TOKENS,
+                **options
+            )
+        return self._connect(config, options)
+    
+    def _connect(self, config: Dict[str, Any], options: Dict[str, Any]) -> "BaseChatModel":
+        """ChatOllama for one server, or a pooled client for a list of endpoints."""
+        if isinstance(self.base_url, str):
+            from langchain_ollama import ChatOllama
+            return ChatOllama(base_url=self.base_url, **config, **options)
         
-        self.requirements_engineer = RequirementsEngineer(llm)
-        self.backend_engineer = BackendEngineer(llm)
-        self.implementator = Implementator(llm)
+        from ollama_pool import EndpointPool, PooledChatOllama
+        # Endpoints are shared by every model so per-server concurrency caps hold
+        if self.pool is None:
+            self.pool = EndpointPool(self.base_url)
+        return PooledChatOllama(pool=self.pool, chat_kwargs=config, **options)
+    
+    @property
+    def idea_index(self) -> Optional["IdeaIndex"]:
+        """Index of past ideas and their requirements, opened on first use (None if disabled)."""
+        if self.idea_index_dir and self._idea_index is None:
+            from idea_index import IdeaIndex
+            embedder = self._embedder
+            if embedder is None:
+                from langchain_ollama import OllamaEmbeddings
+                base_url = self.base_url
+                if not isinstance(base_url, str):
+                    # Embedding an idea is cheap; the first endpoint serves every lookup
+                    base_url = base_url[0]["url"] if isinstance(base_url[0], dict) else base_url[0]
+                embedder = OllamaEmbeddings(model=self.embedding_model, base_url=base_url)
+            self._idea_index = IdeaIndex(self.idea_index_dir, embedder)
+        return self._idea_index
+    
+    def project_store(self, base_output_dir: str) -> ProjectStore:
+        """Index of the projects under an output directory, opened once per directory."""
+        key = os.path.abspath(base_output_dir)
+        if key not in self._stores:
+            self._stores[key] = ProjectStore(base_output_dir)
+        return self._stores[key]
+    
+    @property
+    def validation_pool(self) -> ProcessPoolExecutor:
+        """Worker processes for validation, shared by every build."""
+        if self._validation_pool is None:
+            self._validation_pool = ProcessPoolExecutor()
+        return self._validation_pool
+    
+    def warm_up(self) -> float:
+        """
+        Build every agent, the LLM clients and the idea index now instead of on first use.
+        
+        For long-running processes, so the first build does not pay for the
+        imports and construction.
+        
+        Returns:
+            Seconds spent
+        """
+        started = time.perf_counter()
+        self.requirements_engineer
+        self.backend_engineer
+        # The Implementator's tool-calling agent is otherwise only built when the fast path falls back to it
+        self.implementator.agent
+        self.idea_index
+        return round(time.perf_counter() - started, 3)
+    
+    def trace_stats(self) -> Optional[Dict[str, Any]]:
+        """Builds traced and skipped by sampling, or None without a tracer."""
+        return self.tracer.stats() if self.tracer else None
     
+    def scheduler_stats(self) -> Optional[Dict[str, Any]]:
+        """Scheduler queue depths, admissions, sheds and wait times, or None without a scheduler."""
+        return self.scheduler.stats() if self.scheduler else None
+    
+    def pool_stats(self) -> Optional[List[Dict[str, Any]]]:
+        """Per-endpoint request counters, or None when talking to a single server."""
+        return self.pool.stats() if self.pool else None
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Hit/miss statistics of the LLM response cache, or None if caching is disabled."""
+        if not self.llm_caches:
+            return None
+        # Every model's cache lives in the same database
+        stats = self.llm_caches[0].stats()
+        stats["hits"] = sum(cache.hits for cache in self.llm_caches)
+        stats["misses"] = sum(cache.misses for cache in self.llm_caches)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+    
+    def project_id(self, user_idea: str) -> str:
+        """ID (and directory name) of the project built for an idea."""
+        return make_project_id(self._get_project_name(user_idea), user_idea)
+    
+    def record_failure(self, user_idea: str, base_output_dir: str, error: str, seconds: Optional[float] = None) -> None:
+        """Index a build that failed before its output was saved."""
+        project_id = self.project_id(user_idea)
+        self.project_store(base_output_dir).record_failure(
+            project_id, user_idea, self._get_project_name(user_idea),
+            os.path.join(base_output_dir, project_id), error, seconds=seconds
+        )
+
+    async def arecord_failure(
+        self,
+        user_idea: str,
+        base_output_dir: str,
+        error: str,
+        seconds: Optional[float] = None
+    ) -> None:
+        """
+        record_failure() on a worker thread, for builds running on an event loop.
+
+        Failing to index the failure (e.g. the store is locked by another
+        process) is reported and otherwise ignored, so it cannot take down the
+        caller's other builds.
+        """
+        try:
+            await asyncio.to_thread(self.record_failure, user_idea, base_output_dir, error, seconds)
+        except Exception as e:
+            print(f"⚠️  Could not index the failed build of {user_idea!r}: {e}")
+
     def _get_project_name(self, user_idea: str) -> str:
         """Generate a valid directory name from the user idea."""
         # Simple extraction: take first few words, or use a default if too complex
@@ -57,74 +356,839 @@ class SoftwareFactoryOrchestrator:
         clean_name = re.sub(r'_+', '_', clean_name).strip('_')
         return clean_name or "generated_project"
 
-    def build(self, user_idea: str, base_output_dir: str = "output") -> Dict[str, Any]:
+    def build(
+        self,
+        user_idea: str,
+        base_output_dir: str = "output",
+        resume: bool = False,
+        priority: str = "interactive",
+        tenant: str = DEFAULT_TENANT
+    ) -> Dict[str, Any]:
         """
         Transform a user idea into working backend code.
         
         Args:
             user_idea: High-level description of the software idea
             base_output_dir: Base directory where project folder will be created
+            resume: Skip phases whose checkpoint matches the current inputs
+            priority: Scheduler priority class of the build's LLM calls ("interactive" or "batch")
+            tenant: Tenant the build's LLM calls are fairly queued under
             
         Returns:
             Dictionary containing requirements, implementation, and code generation results
         """
-        project_name = self._get_project_name(user_idea)
-        project_dir = os.path.join(base_output_dir, project_name)
+        with request_class(priority, tenant), self._trace(user_idea, priority, tenant):
+            return self._build(user_idea, base_output_dir, resume)
+    
+    def _build(self, user_idea: str, base_output_dir: str, resume: bool) -> Dict[str, Any]:
+        project_name, project_dir = self._start_build(user_idea, base_output_dir)
+        checkpoints = CheckpointStore(project_dir)
+        metrics = BuildMetrics(self.eval_rates)
         
-        print("=" * 80)
-        print(f"🧠 SOFTWARE FACTORY - Project: {project_name}")
-        print("=" * 80)
         print("\n📋 Phase 1: Requirements Engineering")
         print("-" * 80)
         
         # Step 1: Requirements Engineer analyzes the idea
-        requirements_result = self.requirements_engineer.analyze(user_idea)
+        fingerprint = checkpoints.fingerprint(user_idea, self._model_config("requirements_engineer"))
+        requirements_result = self._load_checkpoint(checkpoints, "requirements", fingerprint, resume)
+        if requirements_result is None:
+            started = time.perf_counter()
+            with metrics.phase("requirements"):
+                vector = self._embed_idea(user_idea)
+                requirements_result = self._reuse_requirements(project_name, vector)
+                if requirements_result is None:
+                    requirements_result = self.requirements_engineer.analyze(user_idea)
+                    self._index_requirements(user_idea, vector, requirements_result, project_dir)
+            requirements_result["seconds"] = round(time.perf_counter() - started, 3)
+            checkpoints.save("requirements", fingerprint, requirements_result)
         requirements_spec = requirements_result["requirements"]
-        
-        print("\n✅ Requirements Specification Complete")
-        print("=" * 80)
-        print(requirements_spec)
-        print("=" * 80)
+        self._print_budget_report(project_name, requirements_result)
+        self._print_section("Requirements Specification Complete", requirements_spec)
         
         print("\n💻 Phase 2: Backend Implementation")
         print("-" * 80)
         
         # Step 2: Backend Engineer implements the solution
-        implementation_result = self.backend_engineer.implement(requirements_spec)
+        handoff, handoff_stats = self._handoff("implementation", requirements_spec)
+        fingerprint = checkpoints.fingerprint(handoff, self._model_config("backend_engineer"))
+        implementation_result = self._load_checkpoint(checkpoints, "implementation", fingerprint, resume)
+        if implementation_result is None:
+            started = time.perf_counter()
+            with metrics.phase("implementation"):
+                self._record_handoff(handoff_stats)
+                implementation_result = self.backend_engineer.implement(handoff, candidates=self.candidates)
+            self._print_speculation_report(project_name, implementation_result)
+            implementation_result["seconds"] = round(time.perf_counter() - started, 3)
+            if handoff_stats:
+                implementation_result["handoff"] = handoff_stats
+            checkpoints.save("implementation", fingerprint, implementation_result)
         implementation = implementation_result["implementation"]
-        
-        print("\n✅ Implementation Complete")
-        print("=" * 80)
-        print(implementation)
-        print("=" * 80)
+        self._print_budget_report(project_name, implementation_result)
+        self._print_section("Implementation Complete", implementation)
         
         print("\n⚙️  Phase 3: Code Generation")
         print("-" * 80)
         
         # Step 3: Implementator generates the files
-        print(f"Generating code in {project_dir}/code/ ...")
-        code_gen_result = self.implementator.generate_code(implementation, project_dir)
+        handoff, handoff_stats = self._handoff("code_generation", implementation)
+        fingerprint = checkpoints.fingerprint(handoff, self._model_config("implementator"))
+        code_gen_result = self._load_checkpoint(checkpoints, "code_generation", fingerprint, resume)
+        if code_gen_result is None:
+            print(f"Generating code in {project_dir}/code/ ...")
+            started = time.perf_counter()
+            with metrics.phase("code_generation"):
+                self._record_handoff(handoff_stats)
+                code_gen_result = self.implementator.generate_code(
+                    handoff, project_dir, fast_path=self.fast_path,
+                    concurrency=self.file_concurrency
+                )
+            code_gen_result["seconds"] = round(time.perf_counter() - started, 3)
+            if handoff_stats:
+                code_gen_result["handoff"] = handoff_stats
+            self._estimate_fast_path_savings(code_gen_result, implementation_result)
+            checkpoints.save("code_generation", fingerprint, code_gen_result)
+        self._print_budget_report(project_name, code_gen_result)
+        self._print_fast_path_report(project_name, code_gen_result)
         
         print(f"\n✅ Code Generation Complete: {code_gen_result['code_dir']}")
         print("=" * 80)
         
+        validation = repair_result = None
+        if self.validate:
+            print("\n🔍 Phase 4: Validation")
+            print("-" * 80)
+            from validation import validate_project
+            with span("validation", "phase"):
+                validation = validate_project(
+                    code_gen_result["code_dir"], self.validation_pool, run_tests=self.run_tests
+                )
+            self._print_validation_report(project_name, validation)
+            if self.repair_iterations and validation["summary"]["failed"]:
+                validation, repair_result = self._repair(
+                    project_name, project_dir, implementation, validation, metrics
+                )
+        
+        result = self._assemble_result(
+            user_idea, project_name, project_dir,
+            requirements_result, implementation_result, code_gen_result, metrics,
+            validation, repair_result
+        )
+        self._print_phase_summary(project_name, result["metrics"])
+        return result
+    
+    async def abuild(
+        self,
+        user_idea: str,
+        base_output_dir: str = "output",
+        resume: bool = False,
+        stream: bool = False,
+        echo: bool = True,
+        overlap: bool = False,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        priority: str = "interactive",
+        tenant: str = DEFAULT_TENANT
+    ) -> Dict[str, Any]:
+        """
+        Async version of build() using the agents' `ainvoke` paths.
+        
+        With `stream=True` the requirements and implementation are streamed
+        token by token into requirements.md/implementation.md (and to stdout
+        if `echo` is set) while they are generated, and per-phase
+        time-to-first-token and tokens/sec are reported.
+        
+        With `overlap=True` (requires `stream`) code generation starts while
+        the Backend Engineer is still writing: each `## Code` block goes to the
+        Implementator as soon as its closing fence arrives.
+        
+        Args:
+            user_idea: High-level description of the software idea
+            base_output_dir: Base directory where project folder will be created
+            resume: Skip phases whose checkpoint matches the current inputs
+            stream: Stream phase output to the console and markdown files
+            echo: Print streamed tokens to stdout
+            overlap: Overlap phases 2 and 3 by generating code per block as it streams
+            progress: Called with a `{"event": "phase", "phase": ..., "project_id": ...,
+                "elapsed": ...}` dictionary as each phase starts
+            priority: Scheduler priority class of the build's LLM calls ("interactive" or "batch")
+            tenant: Tenant the build's LLM calls are fairly queued under
+            
+        Returns:
+            Dictionary containing requirements, implementation, and code generation results
+        """
+        if overlap and not stream:
+            raise ValueError("overlap requires stream=True")
+        with request_class(priority, tenant), self._trace(user_idea, priority, tenant):
+            return await self._abuild(user_idea, base_output_dir, resume, stream, echo, overlap, progress)
+    
+    def _trace(self, user_idea: str, priority: str, tenant: str) -> Any:
+        """Context that traces a build when a tracer is set and samples it."""
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.trace(
+            "build", project_id=self.project_id(user_idea), priority=priority, tenant=tenant
+        )
+    
+    async def _abuild(
+        self,
+        user_idea: str,
+        base_output_dir: str,
+        resume: bool,
+        stream: bool,
+        echo: bool,
+        overlap: bool,
+        progress: Optional[Callable[[Dict[str, Any]], None]]
+    ) -> Dict[str, Any]:
+        project_name, project_dir = self._start_build(user_idea, base_output_dir)
+        build_started = time.perf_counter()
+        
+        def report_phase(phase: str) -> None:
+            if progress:
+                progress({
+                    "event": "phase",
+                    "phase": phase,
+                    "project_id": os.path.basename(project_dir),
+                    "elapsed": round(time.perf_counter() - build_started, 3)
+                })
+        checkpoints = CheckpointStore(project_dir)
+        metrics = BuildMetrics(self.eval_rates)
+        requirements_path = os.path.join(project_dir, "requirements.md")
+        implementation_path = os.path.join(project_dir, "implementation.md")
+        if stream:
+            os.makedirs(project_dir, exist_ok=True)
+        
+        print(f"\n📋 [{project_name}] Phase 1: Requirements Engineering")
+        report_phase("requirements")
+        fingerprint = checkpoints.fingerprint(user_idea, self._model_config("requirements_engineer"))
+        requirements_result = self._load_checkpoint(checkpoints, "requirements", fingerprint, resume)
+        if requirements_result is None:
+            started = time.perf_counter()
+            with metrics.phase("requirements"):
+                vector = await self._aembed_idea(user_idea)
+                requirements_result = self._reuse_requirements(project_name, vector)
+                if requirements_result is not None:
+                    if stream:
+                        self._write_requirements(requirements_path, user_idea, requirements_result["requirements"])
+                elif stream:
+                    header = self._requirements_header(user_idea)
+                    with TokenSink(requirements_path, header, echo=echo) as sink:
+                        requirements_result = await self.requirements_engineer.astream_analyze(user_idea, sink)
+                    self._print_stream_stats(project_name, requirements_result["stream_stats"])
+                else:
+                    requirements_result = await self.requirements_engineer.aanalyze(user_idea)
+                if "reused_from" not in requirements_result:
+                    self._index_requirements(user_idea, vector, requirements_result, project_dir)
+            requirements_result["seconds"] = round(time.perf_counter() - started, 3)
+            checkpoints.save("requirements", fingerprint, requirements_result)
+        elif stream:
+            self._write_requirements(requirements_path, user_idea, requirements_result["requirements"])
+        requirements_spec = requirements_result["requirements"]
+        self._print_budget_report(project_name, requirements_result)
+        
+        print(f"\n💻 [{project_name}] Phase 2: Backend Implementation")
+        report_phase("implementation")
+        handoff, handoff_stats = self._handoff("implementation", requirements_spec)
+        fingerprint = checkpoints.fingerprint(handoff, self._model_config("backend_engineer"))
+        implementation_result = self._load_checkpoint(checkpoints, "implementation", fingerprint, resume)
+        dispatcher = None
+        # Until the code is committed, the dispatcher holds a write buffer open on the
+        # project: drop it on any failure so later builds do not pick up its staged files
+        try:
+            if implementation_result is None:
+                started = time.perf_counter()
+                with metrics.phase("implementation"):
+                    self._record_handoff(handoff_stats)
+                    if stream:
+                        header = self._implementation_header(requirements_spec)
+                        if overlap:
+                            from pipeline import CodeBlockDispatcher
+                            dispatcher = CodeBlockDispatcher(
+                                self.implementator, project_dir, concurrency=self.file_concurrency,
+                                fast_path=self.fast_path, metrics=metrics
+                            )
+                        on_text = dispatcher.feed if dispatcher else None
+                        on_reset = dispatcher.reset if dispatcher else None
+                        with TokenSink(
+                            implementation_path, header, echo=echo, on_text=on_text, on_reset=on_reset
+                        ) as sink:
+                            implementation_result = await self.backend_engineer.astream_implement(handoff, sink)
+                        self._print_stream_stats(project_name, implementation_result["stream_stats"])
+                    else:
+                        implementation_result = await self.backend_engineer.aimplement(handoff, candidates=self.candidates)
+                        self._print_speculation_report(project_name, implementation_result)
+                implementation_result["seconds"] = round(time.perf_counter() - started, 3)
+                if handoff_stats:
+                    implementation_result["handoff"] = handoff_stats
+                checkpoints.save("implementation", fingerprint, implementation_result)
+            elif stream:
+                self._write_implementation(implementation_path, requirements_spec, implementation_result["implementation"])
+            implementation = implementation_result["implementation"]
+            self._print_budget_report(project_name, implementation_result)
+        
+            print(f"\n⚙️  [{project_name}] Phase 3: Code Generation")
+            report_phase("code_generation")
+            handoff, handoff_stats = self._handoff("code_generation", implementation)
+            fingerprint = checkpoints.fingerprint(handoff, self._model_config("implementator"))
+            code_gen_result = self._load_checkpoint(checkpoints, "code_generation", fingerprint, resume)
+            if code_gen_result is None:
+                started = time.perf_counter()
+                with metrics.phase("code_generation"):
+                    self._record_handoff(handoff_stats)
+                    if dispatcher and dispatcher.dispatched:
+                        print(f"Waiting for {dispatcher.dispatched} code block(s) already in progress ...")
+                        code_gen_result = await dispatcher.finish()
+                    else:
+                        if dispatcher:
+                            # Nothing was dispatched; close its write buffer
+                            dispatcher.cancel()
+                        code_gen_result = await self.implementator.agenerate_code(
+                            handoff, project_dir, fast_path=self.fast_path,
+                            concurrency=self.file_concurrency
+                        )
+                code_gen_result["seconds"] = round(time.perf_counter() - started, 3)
+                if handoff_stats:
+                    code_gen_result["handoff"] = handoff_stats
+                self._estimate_fast_path_savings(code_gen_result, implementation_result)
+                checkpoints.save("code_generation", fingerprint, code_gen_result)
+            elif dispatcher:
+                dispatcher.cancel()
+        except BaseException:
+            if dispatcher:
+                dispatcher.cancel()
+            raise
+        self._print_budget_report(project_name, code_gen_result)
+        self._print_fast_path_report(project_name, code_gen_result)
+        
+        print(f"\n✅ [{project_name}] Code Generation Complete: {code_gen_result['code_dir']}")
+        
+        validation = repair_result = None
+        if self.validate:
+            print(f"\n🔍 [{project_name}] Phase 4: Validation")
+            report_phase("validation")
+            from validation import avalidate_project
+            with span("validation", "phase"):
+                validation = await avalidate_project(
+                    code_gen_result["code_dir"], self.validation_pool, run_tests=self.run_tests
+                )
+            self._print_validation_report(project_name, validation)
+            if self.repair_iterations and validation["summary"]["failed"]:
+                report_phase("repair")
+                validation, repair_result = await self._arepair(
+                    project_name, project_dir, implementation, validation, metrics
+                )
+        
+        result = self._assemble_result(
+            user_idea, project_name, project_dir,
+            requirements_result, implementation_result, code_gen_result, metrics,
+            validation, repair_result
+        )
+        self._print_phase_summary(project_name, result["metrics"])
+        if stream:
+            # The markdown files were written while streaming; save_output() skips them
+            result["streamed"] = True
+            result["stream_stats"] = {
+                phase: phase_result["stream_stats"]
+                for phase, phase_result in (
+                    ("requirements", requirements_result),
+                    ("implementation", implementation_result)
+                )
+                if "stream_stats" in phase_result
+            }
+        return result
+    
+    async def build_many(
+        self,
+        user_ideas: Iterable[str],
+        base_output_dir: str = "output",
+        concurrency: int = 4,
+        results_path: Optional[str] = None,
+        resume: bool = False,
+        stream: bool = False,
+        overlap: bool = False,
+        prometheus_path: Optional[str] = None,
+        priority: str = "batch",
+        tenant: str = DEFAULT_TENANT
+    ) -> Dict[str, Any]:
+        """
+        Build many ideas concurrently with a bounded number of builds in flight.
+        
+        Each result is saved as soon as its build finishes, and a JSON line
+        describing it is appended to `results_path`.
+        
+        Args:
+            user_ideas: Ideas to build
+            base_output_dir: Base directory where project folders will be created
+            concurrency: Maximum number of builds in flight at once
+            results_path: JSONL file for per-idea results
+                (default: <base_output_dir>/batch_results.jsonl)
+            resume: Skip phases whose checkpoint matches the current inputs
+            stream: Stream phase output into the markdown files as it is generated
+                (tokens are not echoed, since builds run concurrently)
+            overlap: Start code generation per block while phase 2 streams (requires `stream`)
+            prometheus_path: Write the batch's aggregated metrics here in Prometheus text format
+            priority: Scheduler priority class of the builds' LLM calls
+            tenant: Tenant the builds' LLM calls are fairly queued under
+            
+        Returns:
+            Summary with success/failure counts, elapsed time and throughput
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        
+        os.makedirs(base_output_dir, exist_ok=True)
+        results_path = results_path or os.path.join(base_output_dir, "batch_results.jsonl")
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        for user_idea in user_ideas:
+            queue.put_nowait(user_idea)
+        total = queue.qsize()
+        summary = {"total": total, "succeeded": 0, "failed": 0, "results_path": results_path}
+        reports: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+        
+        with open(results_path, "a", encoding="utf-8") as results_file:
+            
+            async def worker() -> None:
+                while True:
+                    try:
+                        user_idea = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    
+                    build_started = time.perf_counter()
+                    record: Dict[str, Any] = {"user_idea": user_idea}
+                    try:
+                        result = await self.abuild(
+                            user_idea, base_output_dir, resume=resume, stream=stream, echo=False,
+                            overlap=overlap, priority=priority, tenant=tenant
+                        )
+                        # Saving and indexing write to disk; keep them off the loop the other builds share
+                        record["project_dir"] = await asyncio.to_thread(self.save_output, result, base_output_dir)
+                        record["status"] = "succeeded"
+                        record["metrics"] = result["metrics"]["totals"]
+                        if result.get("validation"):
+                            record["validation"] = result["validation"]["summary"]
+                        if result.get("repair"):
+                            record["repaired"] = result["repair"]["fixed"]
+                        reports.append(result["metrics"])
+                    except Exception as e:
+                        record["status"] = "failed"
+                        record["error"] = str(e)
+                        await self.arecord_failure(
+                            user_idea, base_output_dir, str(e), seconds=round(time.perf_counter() - build_started, 3)
+                        )
+                    record["seconds"] = round(time.perf_counter() - build_started, 3)
+                    
+                    summary[record["status"]] += 1
+                    results_file.write(json.dumps(record) + "\n")
+                    results_file.flush()
+            
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+        
+        elapsed = time.perf_counter() - started
+        summary["seconds"] = round(elapsed, 3)
+        summary["ideas_per_minute"] = round(total / elapsed * 60, 2) if elapsed > 0 else 0.0
+        
+        if prometheus_path:
+            statuses = {"succeeded": summary["succeeded"], "failed": summary["failed"]}
+            with open(prometheus_path, "w", encoding="utf-8") as f:
+                f.write(to_prometheus(reports, statuses))
+            summary["prometheus_path"] = prometheus_path
+        return summary
+    
+    def repair(self, project_dir: str) -> Dict[str, Any]:
+        """
+        Validate an existing project and repair its failing files, without rebuilding it.
+        
+        Args:
+            project_dir: Project directory from a previous build (with code/ and implementation.md)
+            
+        Returns:
+            Dictionary with the final `validation`, the `repair` summary and `metrics`
+        """
+        from validation import validate_project
+        project_name = os.path.basename(os.path.normpath(project_dir))
+        try:
+            with open(os.path.join(project_dir, "implementation.md"), "r", encoding="utf-8") as f:
+                implementation = f.read()
+        except FileNotFoundError:
+            implementation = ""
+        
+        metrics = BuildMetrics(self.eval_rates)
+        print(f"\n🔍 [{project_name}] Validation")
+        validation = validate_project(
+            os.path.join(project_dir, "code"), self.validation_pool, run_tests=self.run_tests
+        )
+        self._print_validation_report(project_name, validation)
+        validation, repair_result = self._repair(project_name, project_dir, implementation, validation, metrics)
+        
+        phases = {
+            "repair": {
+                "model": self.agent_configs["implementator"]["model"],
+                "seconds": repair_result["seconds"],
+                "resumed": False
+            }
+        }
         result = {
+            "project_dir": project_dir,
+            "validation": validation,
+            "repair": repair_result,
+            "metrics": metrics.report(phases)
+        }
+        self._print_phase_summary(project_name, result["metrics"])
+        with open(os.path.join(project_dir, "validation.json"), "w", encoding="utf-8") as f:
+            json.dump(validation, f, indent=2)
+        return result
+    
+    def _repair(
+        self,
+        project_name: str,
+        project_dir: str,
+        implementation: str,
+        validation: Dict[str, Any],
+        metrics: BuildMetrics
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Re-generate only the files that failed validation, re-validating after each round.
+        
+        Returns:
+            Tuple of (final validation, repair summary)
+        """
+        from code_blocks import plan_excerpt
+        from validation import failed_files, validate_project
+        started = time.perf_counter()
+        attempts: Dict[str, int] = {}
+        iterations = 0
+        with metrics.phase("repair"):
+            while iterations < self.repair_iterations:
+                failed = failed_files(validation)
+                if not failed:
+                    break
+                iterations += 1
+                print(f"\n🔧 [{project_name}] Repair {iterations}/{self.repair_iterations}: {len(failed)} file(s)")
+                generated = [report["path"] for report in validation["files"]]
+                for report in failed:
+                    attempts[report["path"]] = attempts.get(report["path"], 0) + 1
+                    self.implementator.repair_file(
+                        report["path"], report["errors"], plan_excerpt(implementation, report["path"]),
+                        generated, project_dir
+                    )
+                validation = validate_project(validation["code_dir"], self.validation_pool, run_tests=self.run_tests)
+                self._print_validation_report(project_name, validation)
+        return validation, self._repair_summary(project_name, validation, attempts, iterations, started)
+    
+    async def _arepair(
+        self,
+        project_name: str,
+        project_dir: str,
+        implementation: str,
+        validation: Dict[str, Any],
+        metrics: BuildMetrics
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Async version of _repair(); the failing files of a round are repaired concurrently."""
+        from code_blocks import plan_excerpt
+        from validation import avalidate_project, failed_files
+        started = time.perf_counter()
+        attempts: Dict[str, int] = {}
+        iterations = 0
+        with metrics.phase("repair"):
+            while iterations < self.repair_iterations:
+                failed = failed_files(validation)
+                if not failed:
+                    break
+                iterations += 1
+                print(f"\n🔧 [{project_name}] Repair {iterations}/{self.repair_iterations}: {len(failed)} file(s)")
+                generated = [report["path"] for report in validation["files"]]
+                for report in failed:
+                    attempts[report["path"]] = attempts.get(report["path"], 0) + 1
+                await asyncio.gather(*(
+                    self.implementator.arepair_file(
+                        report["path"], report["errors"], plan_excerpt(implementation, report["path"]),
+                        generated, project_dir
+                    )
+                    for report in failed
+                ))
+                validation = await avalidate_project(
+                    validation["code_dir"], self.validation_pool, run_tests=self.run_tests
+                )
+                self._print_validation_report(project_name, validation)
+        return validation, self._repair_summary(project_name, validation, attempts, iterations, started)
+    
+    def _repair_summary(
+        self,
+        project_name: str,
+        validation: Dict[str, Any],
+        attempts: Dict[str, int],
+        iterations: int,
+        started: float
+    ) -> Dict[str, Any]:
+        """Summarize a repair loop and print which files it fixed."""
+        from validation import failed_files
+        still_failing = {report["path"] for report in failed_files(validation)}
+        summary = {
+            "iterations": iterations,
+            "attempts": attempts,
+            "fixed": sorted(path for path in attempts if path not in still_failing),
+            "unfixed": sorted(still_failing),
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+        print(f"🔧 [{project_name}] Repaired {len(summary['fixed'])} file(s) in {iterations} round(s), "
+              f"{len(summary['unfixed'])} still failing")
+        return summary
+    
+    def _start_build(self, user_idea: str, base_output_dir: str) -> Tuple[str, str]:
+        """
+        Resolve the project directory for an idea and print the build banner.
+        
+        The directory is named after the project ID, so ideas that share their
+        first words no longer overwrite each other.
+        """
+        project_name = self._get_project_name(user_idea)
+        project_dir = os.path.join(base_output_dir, make_project_id(project_name, user_idea))
+        
+        print("=" * 80)
+        print(f"🧠 SOFTWARE FACTORY - Project: {project_name}")
+        print("=" * 80)
+        return project_name, project_dir
+    
+    def _idea_namespace(self) -> str:
+        """Requirements Engineer settings a stored spec must have been generated with to be reused."""
+        config = {k: v for k, v in self.agent_configs["requirements_engineer"].items() if k != "keep_alive"}
+        return json.dumps(config, sort_keys=True)
+    
+    def _embed_idea(self, user_idea: str) -> Any:
+        """Embedding of an idea for the idea index, or None if the index is disabled or unavailable."""
+        if not self.idea_index_dir:
+            return None
+        try:
+            return self.idea_index.embed(user_idea)
+        except Exception as e:
+            print(f"⚠️  Idea index unavailable, generating requirements from scratch: {e}")
+            return None
+    
+    async def _aembed_idea(self, user_idea: str) -> Any:
+        """Async version of _embed_idea()."""
+        if not self.idea_index_dir:
+            return None
+        try:
+            return await self.idea_index.aembed(user_idea)
+        except Exception as e:
+            print(f"⚠️  Idea index unavailable, generating requirements from scratch: {e}")
+            return None
+    
+    def _reuse_requirements(self, project_name: str, vector: Any) -> Optional[Dict[str, Any]]:
+        """Phase 1 result built from the most similar past idea, if it is similar enough."""
+        if vector is None:
+            return None
+        matches = self.idea_index.search(vector, k=1, namespace=self._idea_namespace())
+        if not matches or matches[0]["score"] < self.reuse_threshold:
+            return None
+        match = matches[0]
+        print(f"♻️  [{project_name}] Reusing the requirements of a similar idea "
+              f"(similarity {match['score']:.2f}): {match['idea']}")
+        return {
+            "requirements": match["requirements"],
+            "reused_from": {key: match[key] for key in ("idea", "score", "project_dir")}
+        }
+    
+    def _index_requirements(
+        self,
+        user_idea: str,
+        vector: Any,
+        requirements_result: Dict[str, Any],
+        project_dir: str
+    ) -> None:
+        """Add freshly generated requirements to the idea index."""
+        if vector is None:
+            return
+        self.idea_index.add(
+            user_idea, vector, requirements_result["requirements"],
+            project_dir=project_dir, namespace=self._idea_namespace()
+        )
+    
+    def _load_checkpoint(
+        self,
+        checkpoints: CheckpointStore,
+        phase: str,
+        fingerprint: str,
+        resume: bool
+    ) -> Optional[Dict[str, Any]]:
+        """Return a phase's checkpointed output when resuming, or None to run the phase."""
+        if not resume:
+            return None
+        
+        output = checkpoints.load(phase, fingerprint)
+        if output is None:
+            return None
+        if phase == "code_generation" and not os.path.isdir(output.get("code_dir", "")):
+            return None
+        
+        print(f"↩️  Resuming {phase.replace('_', ' ')} from checkpoint")
+        output["resumed"] = True
+        return output
+    
+    def _handoff(self, phase: str, text: str) -> Tuple[str, Optional[Dict[str, int]]]:
+        """
+        The input a phase gets from the previous one, and its estimated token counts.
+        
+        Phase 2 gets the requirement bullets, phase 3 the plan's project
+        structure and code; both unchanged (and no counts) with compaction off.
+        """
+        if not self.compact_handoffs:
+            return text, None
+        from token_budget import compact_plan, compact_requirements, handoff_stats
+        compacted = compact_requirements(text) if phase == "implementation" else compact_plan(text)
+        return compacted, handoff_stats(text, compacted)
+    
+    def _record_handoff(self, stats: Optional[Dict[str, int]]) -> None:
+        """Count the tokens compaction saved against the current phase."""
+        if stats:
+            record_handoff_saving(stats["saved_tokens"])
+    
+    def _estimate_fast_path_savings(
+        self,
+        code_gen_result: Dict[str, Any],
+        implementation_result: Dict[str, Any]
+    ) -> None:
+        """
+        Estimate the seconds the fast path saved.
+        
+        Each `write_file` call makes the Implementator re-generate the file's
+        contents token by token, so the time saved is approximated by the share
+        of phase 2's generation time spent on the code that was written directly.
+        """
+        fast_path = code_gen_result.get("fast_path")
+        if not fast_path:
+            return
+        implementation_chars = len(implementation_result["implementation"]) or 1
+        phase_seconds = implementation_result.get("seconds", 0.0)
+        fast_path["seconds_saved_estimate"] = round(
+            phase_seconds * min(1.0, fast_path["bytes_written"] / implementation_chars), 2
+        )
+    
+    def _print_fast_path_report(self, project_name: str, code_gen_result: Dict[str, Any]) -> None:
+        """Print how many files the fast path wrote and what it saved, and how many were fanned out."""
+        fan_out = code_gen_result.get("fan_out")
+        if fan_out:
+            print(f"🪭 [{project_name}] Generated {len(fan_out['files'])} file(s) with independent "
+                  f"Implementator calls, up to {self.file_concurrency} at a time")
+        fast_path = code_gen_result.get("fast_path")
+        if not fast_path:
+            return
+        print(f"⚡ [{project_name}] Fast path wrote {len(fast_path['files_written'])} file(s) directly, "
+              f"{fast_path['unresolved_blocks']} block(s) sent to the Implementator agent; "
+              f"saved ~{fast_path['llm_calls_saved']} LLM call(s), "
+              f"~{fast_path.get('seconds_saved_estimate', 0.0):.1f}s")
+    
+    def _print_budget_report(self, project_name: str, phase_result: Dict[str, Any]) -> None:
+        """Print where a phase's generation was stopped and how much its handoff was compacted."""
+        if phase_result.get("stopped_at"):
+            print(f"✂️  [{project_name}] Stopped generating at \"{phase_result['stopped_at']}\": "
+                  f"the sections the next phase needs were complete")
+        handoff = phase_result.get("handoff")
+        if handoff and handoff["saved_tokens"] > 0:
+            print(f"✂️  [{project_name}] Compacted the handoff from ~{handoff['tokens']} "
+                  f"to ~{handoff['sent_tokens']} tokens")
+    
+    def _print_speculation_report(self, project_name: str, implementation_result: Dict[str, Any]) -> None:
+        """Print which speculative candidate was kept and how many were cancelled."""
+        speculation = implementation_result.get("speculation")
+        if not speculation:
+            return
+        verdict = "passed the format check" if speculation["score"]["passed"] else "best of none passing"
+        print(f"🎲 [{project_name}] Kept candidate {speculation['selected'] + 1}/{speculation['candidates']} "
+              f"({verdict}); {speculation['cancelled']} cancelled, {speculation['failed']} failed")
+    
+    def _print_stream_stats(self, project_name: str, stats: Dict[str, Any]) -> None:
+        """Print time-to-first-token and throughput of a streamed phase."""
+        ttft = stats["time_to_first_token"]
+        rate = stats["tokens_per_second"]
+        first_token = f"first token after {ttft:.2f}s" if ttft is not None else "no tokens streamed"
+        throughput = f"{rate:.1f} tokens/s" if rate is not None else "n/a tokens/s"
+        print(f"⏱️  [{project_name}] {stats['seconds']:.2f}s total, {first_token}, {throughput}")
+    
+    def _print_phase_summary(self, project_name: str, metrics: Dict[str, Any]) -> None:
+        """Print each phase's model, latency, calls, tokens and prompt-eval time (spent/estimated saved)."""
+        print(f"\n📊 [{project_name}] Phase metrics")
+        print(f"   {'phase':<16} {'model':<28} {'seconds':>9} {'LLM':>5} {'tools':>6} {'tokens in/out':>15} "
+              f"{'prompt eval/~saved':>19}")
+        rows = list(metrics["phases"].items()) + [("total", {**metrics["totals"], "model": "", "resumed": False})]
+        for phase, row in rows:
+            seconds = f"{row['wall_seconds']:8.2f}s" if row["wall_seconds"] is not None else "      n/a"
+            tokens = f"{row['prompt_tokens']}/{row['completion_tokens']}"
+            prompt_eval = f"{row['prompt_eval_seconds']:.2f}s/~{row['prompt_eval_seconds_saved']:.2f}s"
+            note = "  (resumed)" if row["resumed"] else ""
+            print(f"   {phase:<16} {row['model']:<28} {seconds} {row['llm_calls']:>5} "
+                  f"{row['tool_calls']:>6} {tokens:>15} {prompt_eval:>19}{note}")
+    
+    def _print_validation_report(self, project_name: str, validation: Dict[str, Any]) -> None:
+        """Print each generated file's validation status, errors and warnings."""
+        icons = {"passed": "✅", "failed": "❌", "skipped": "·"}
+        for report in validation["files"]:
+            print(f"   {icons[report['status']]} {report['path']}")
+            for error in report["errors"]:
+                print(f"      error: {error}")
+            for warning in report["warnings"]:
+                print(f"      warning: {warning}")
+        summary = validation["summary"]
+        print(f"🔍 [{project_name}] Validated {summary['files']} file(s) in {validation['seconds']:.2f}s: "
+              f"{summary['passed']} passed, {summary['failed']} failed, {summary['skipped']} skipped")
+    
+    def _print_section(self, title: str, text: str) -> None:
+        """Print a completed phase output between separators."""
+        print(f"\n✅ {title}")
+        print("=" * 80)
+        print(text)
+        print("=" * 80)
+    
+    def _assemble_result(
+        self,
+        user_idea: str,
+        project_name: str,
+        project_dir: str,
+        requirements_result: Dict[str, Any],
+        implementation_result: Dict[str, Any],
+        code_gen_result: Dict[str, Any],
+        metrics: BuildMetrics,
+        validation: Optional[Dict[str, Any]] = None,
+        repair_result: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Combine the phase outputs into the result dictionary returned by build()."""
+        phase_results = [
+            ("requirements", "requirements_engineer", requirements_result),
+            ("implementation", "backend_engineer", implementation_result),
+            ("code_generation", "implementator", code_gen_result)
+        ]
+        if repair_result is not None:
+            phase_results.append(("repair", "implementator", repair_result))
+        phases = {
+            phase: {
+                "model": self.agent_configs[agent]["model"],
+                "seconds": phase_result.get("seconds"),
+                "resumed": bool(phase_result.get("resumed"))
+            }
+            for phase, agent, phase_result in phase_results
+        }
+        return {
             "user_idea": user_idea,
             "project_name": project_name,
+            "project_id": os.path.basename(os.path.normpath(project_dir)),
             "project_dir": project_dir,
-            "requirements": requirements_spec,
-            "implementation": implementation,
+            "requirements": requirements_result["requirements"],
+            "implementation": implementation_result["implementation"],
             "code_generation": code_gen_result,
             "requirements_raw": requirements_result,
             "implementation_raw": implementation_result,
-            "code_generation_raw": code_gen_result
+            "code_generation_raw": code_gen_result,
+            "phases": phases,
+            "metrics": metrics.report(phases),
+            "validation": validation,
+            "repair": repair_result
         }
-        
-        return result
     
     def save_output(self, result: Dict[str, Any], base_output_dir: str = "output") -> str:
         """
-        Save the requirements and implementation to files in the project folder.
+        Save the requirements and implementation to files in the project folder,
+        and index the project and its files in the output directory's project store.
         
         Args:
             result: Result dictionary from build() method
@@ -138,28 +1202,62 @@ class SoftwareFactoryOrchestrator:
             project_dir = result["project_dir"]
         else:
             project_name = self._get_project_name(result["user_idea"])
-            project_dir = os.path.join(base_output_dir, project_name)
+            project_dir = os.path.join(base_output_dir, make_project_id(project_name, result["user_idea"]))
             
         os.makedirs(project_dir, exist_ok=True)
         
-        # Save requirements
-        requirements_path = os.path.join(project_dir, "requirements.md")
-        with open(requirements_path, "w", encoding="utf-8") as f:
-            f.write(f"# Requirements Specification\n\n")
-            f.write(f"## Original Idea\n\n{result['user_idea']}\n\n")
-            f.write(result["requirements"])
+        if not result.get("streamed"):
+            self._write_requirements(
+                os.path.join(project_dir, "requirements.md"),
+                result["user_idea"],
+                result["requirements"]
+            )
+            self._write_implementation(
+                os.path.join(project_dir, "implementation.md"),
+                result["requirements"],
+                result["implementation"]
+            )
         
-        # Save implementation
-        implementation_path = os.path.join(project_dir, "implementation.md")
-        with open(implementation_path, "w", encoding="utf-8") as f:
-            f.write(f"# Implementation\n\n")
-            f.write(f"## Requirements\n\n{result['requirements']}\n\n")
-            f.write(result["implementation"])
+        if "metrics" in result:
+            with open(os.path.join(project_dir, "metrics.json"), "w", encoding="utf-8") as f:
+                json.dump(result["metrics"], f, indent=2)
+        if result.get("validation"):
+            with open(os.path.join(project_dir, "validation.json"), "w", encoding="utf-8") as f:
+                json.dump(result["validation"], f, indent=2)
         
         print(f"\n💾 Output saved to {project_dir}/")
         print(f"   - requirements.md")
         print(f"   - implementation.md")
+        print(f"   - metrics.json")
+        if result.get("validation"):
+            print(f"   - validation.json")
         print(f"   - code/ (generated by Implementator)")
         
+        project_name = result.get("project_name") or self._get_project_name(result["user_idea"])
+        project_id = self.project_store(os.path.dirname(project_dir) or ".").record({
+            **result,
+            "project_name": project_name,
+            "project_id": os.path.basename(os.path.normpath(project_dir)),
+            "project_dir": project_dir
+        })
+        print(f"🗂️  Indexed as {project_id}")
+        
         return project_dir
-
+    
+    def _requirements_header(self, user_idea: str) -> str:
+        return f"# Requirements Specification\n\n## Original Idea\n\n{user_idea}\n\n"
+    
+    def _implementation_header(self, requirements: str) -> str:
+        return f"# Implementation\n\n## Requirements\n\n{requirements}\n\n"
+    
+    def _write_requirements(self, path: str, user_idea: str, requirements: str) -> None:
+        """Write requirements.md."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self._requirements_header(user_idea))
+            f.write(requirements)
+    
+    def _write_implementation(self, path: str, requirements: str, implementation: str) -> None:
+        """Write implementation.md."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self._implementation_header(requirements))
+            f.write(implementation)
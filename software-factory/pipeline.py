@@ -0,0 +1,147 @@
+"""
+Pipeline Overlap
+
+Overlaps phase 2 (Backend Engineer) and phase 3 (code generation): the
+Backend Engineer's token stream is parsed as it arrives, and each code block
+in the `## Code` section (or elsewhere, when it names a file the project
+structure lists) is handed to the Implementator as soon as its closing fence
+is seen, while the rest of the plan is still being generated.
+With the fast path enabled, blocks that can be mapped to a file are written
+directly and only the rest go to the Implementator. Every file is staged in
+the Implementator's write buffer and the code directory is committed once,
+when the last block is done.
+"""
+
+from code_blocks import CodeBlock, CodeBlockStreamParser, is_file_block, parse_project_structure, resolve_filename
+from implementator import Implementator
+from metrics import BuildMetrics
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+import asyncio
+import os
+
+
+class CodeBlockDispatcher:
+    """Starts an Implementator call for every code block completed in the stream."""
+
+    def __init__(
+        self,
+        implementator: Implementator,
+        project_dir: str,
+        concurrency: int = 4,
+        fast_path: bool = False,
+        metrics: Optional[BuildMetrics] = None
+    ):
+        """
+        Args:
+            implementator: Agent that writes each block to disk
+            project_dir: Project directory the code is generated in
+            concurrency: Maximum number of Implementator calls in flight
+            fast_path: Write blocks that can be mapped to a file directly
+            metrics: Build metrics; Implementator calls are counted as code generation
+        """
+        self.implementator = implementator
+        self.project_dir = project_dir
+        self.fast_path = fast_path
+        self.metrics = metrics
+        self.parser = CodeBlockStreamParser()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: List[asyncio.Task] = []
+        self._written: Dict[str, str] = {}
+        implementator.begin_writes(project_dir)
+
+    @property
+    def dispatched(self) -> int:
+        """Number of code blocks written or handed to the Implementator so far."""
+        return len(self._tasks) + len(self._written)
+
+    def feed(self, text: str) -> None:
+        """Parse a chunk of the Backend Engineer's output, dispatching completed blocks."""
+        for block in self.parser.feed(text):
+            self._dispatch(block)
+
+    async def finish(self) -> Dict[str, Any]:
+        """
+        Flush the parser and wait for every dispatched block to be written.
+
+        Returns:
+            Code generation result in the shape of Implementator.generate_code()
+        """
+        for block in self.parser.finish():
+            self._dispatch(block)
+
+        results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            self.implementator.discard_writes(self.project_dir)
+            raise errors[0]
+
+        result = {
+            "output": "\n".join(r["output"] for r in results),
+            "code_dir": os.path.join(self.project_dir, "code"),
+            "blocks": self.dispatched
+        }
+        if self._written:
+            structure = parse_project_structure(self.parser.section_text("Project Structure"))
+            markers = {
+                path: "" for path in structure
+                if path.rsplit("/", 1)[-1] == "__init__.py" and path not in self._written
+            }
+            if markers:
+                self.implementator.write_files(markers, self.project_dir)
+            files = {**self._written, **markers}
+            result["output"] = "\n".join(
+                [f"Successfully wrote {path}" for path in files] + [result["output"]]
+            ).strip()
+            result["fast_path"] = {
+                "files_written": sorted(files),
+                "bytes_written": sum(len(content) for content in files.values()),
+                "unresolved_blocks": len(self._tasks),
+                "llm_calls_saved": len(files) + (0 if self._tasks else 1)
+            }
+        result["writes"] = self.implementator.commit_writes(self.project_dir)
+        return result
+
+    def reset(self) -> None:
+        """
+        Forget the stream parsed so far, e.g. when the agent starts another
+        LLM call whose output replaces it: outstanding Implementator calls are
+        cancelled and the files staged from the old output are dropped.
+        """
+        if self._tasks or self._written:
+            self.cancel()
+            self.implementator.begin_writes(self.project_dir)
+        self.parser = CodeBlockStreamParser()
+        self._tasks = []
+        self._written = {}
+
+    def cancel(self) -> None:
+        """Cancel outstanding Implementator calls (e.g. when phase 2 fails)."""
+        for task in self._tasks:
+            task.cancel()
+        self.implementator.discard_writes(self.project_dir)
+
+    def _dispatch(self, block: CodeBlock) -> None:
+        # Shell snippets belong to the setup and usage instructions, and
+        # blocks outside `## Code` only count when they name a listed file
+        structure = parse_project_structure(self.parser.section_text("Project Structure"))
+        if not is_file_block(block, structure):
+            return
+        if self.fast_path and block.complete:
+            filename = resolve_filename(block, structure)
+            if filename:
+                self.implementator.write_files({filename: block.content}, self.project_dir)
+                self._written[filename] = block.content
+                return
+        self._tasks.append(asyncio.ensure_future(self._generate(block)))
+
+    async def _generate(self, block: CodeBlock) -> Dict[str, Any]:
+        # Tasks are started while phase 2 streams; attribute their calls to phase 3
+        phase = self.metrics.phase("code_generation") if self.metrics else nullcontext()
+        async with self._semaphore:
+            with phase:
+                return await self.implementator.agenerate_block(
+                    block,
+                    self.parser.section_text("Project Structure"),
+                    self.project_dir
+                )
@@ -0,0 +1,41 @@
+"""
+Request Classes
+
+The priority class and tenant of a build. They are set by whoever starts the
+build (CLI, build service, queue worker) and read by the LLM scheduler from
+the context of every call the build makes, like the per-phase metrics.
+
+Kept free of LangChain imports so the work queue and the build service can
+use them without loading the LLM stack.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Tuple
+
+
+# Priority classes, most urgent first
+PRIORITIES = ("interactive", "batch")
+
+DEFAULT_TENANT = "default"
+
+_request_class: ContextVar[Tuple[str, str]] = ContextVar(
+    "software_factory_request_class", default=("interactive", DEFAULT_TENANT)
+)
+
+
+@contextmanager
+def request_class(priority: str = "interactive", tenant: str = DEFAULT_TENANT) -> Iterator[None]:
+    """Schedule every LLM call made in this context with the given priority and tenant."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r} (expected one of {', '.join(PRIORITIES)})")
+    token = _request_class.set((priority, tenant or DEFAULT_TENANT))
+    try:
+        yield
+    finally:
+        _request_class.reset(token)
+
+
+def current_request_class() -> Tuple[str, str]:
+    """(priority, tenant) of the build running in this context."""
+    return _request_class.get()
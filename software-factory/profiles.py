@@ -0,0 +1,143 @@
+"""
+Model Profiles
+
+Per-agent model configuration, so each phase can run on a model sized for
+its job: e.g. a large model for the Backend Engineer and a small, fast one
+for the mechanical Implementator phase.
+
+A profile is a YAML (or JSON) file with defaults for every agent and
+optional per-agent overrides:
+
+    model: llama3.1
+    temperature: 0.7
+    agents:
+      backend_engineer:
+        model: qwen2.5-coder:14b
+        num_ctx: 16384
+      implementator:
+        model: llama3.2:3b
+        temperature: 0.1
+        keep_alive: 30m
+"""
+
+from typing import Any, Dict, Optional
+import json
+
+
+# Agents in pipeline order
+AGENT_NAMES = ("requirements_engineer", "backend_engineer", "implementator")
+
+# ChatOllama parameters that can be set per agent
+MODEL_PARAMETERS = ("model", "temperature", "num_ctx", "num_predict", "keep_alive")
+
+# Keeps models (and the prompt prefixes cached in them) loaded between phases
+# and between the ideas of a batch; Ollama's own default is 5 minutes
+DEFAULT_KEEP_ALIVE = "30m"
+
+
+def _check_parameters(config: Dict[str, Any], where: str) -> Dict[str, Any]:
+    if not isinstance(config, dict):
+        raise ValueError(f"{where}: expected a mapping of model parameters")
+    unknown = sorted(set(config) - set(MODEL_PARAMETERS))
+    if unknown:
+        raise ValueError(
+            f"{where}: unknown parameter(s) {', '.join(unknown)} "
+            f"(expected {', '.join(MODEL_PARAMETERS)})"
+        )
+    return {key: value for key, value in config.items() if value is not None}
+
+
+def load_profile(path: str) -> Dict[str, Any]:
+    """
+    Load a model profile.
+
+    Args:
+        path: YAML or JSON profile file
+
+    Returns:
+        Dictionary with `defaults` (parameters for every agent) and `agents`
+        (agent name -> parameter overrides)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    if path.endswith(".json"):
+        data = json.loads(text)
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML profiles require PyYAML: pip install pyyaml")
+        data = yaml.safe_load(text)
+
+    data = dict(data or {})
+    agents = data.pop("agents", None) or {}
+    if not isinstance(agents, dict):
+        raise ValueError(f"{path}: `agents` must map agent names to model parameters")
+    unknown = sorted(set(agents) - set(AGENT_NAMES))
+    if unknown:
+        raise ValueError(f"{path}: unknown agent(s) {', '.join(unknown)} (expected {', '.join(AGENT_NAMES)})")
+
+    return {
+        "defaults": _check_parameters(data, path),
+        "agents": {
+            name: _check_parameters(config or {}, f"{path}: agents.{name}")
+            for name, config in agents.items()
+        }
+    }
+
+
+def resolve_agent_configs(
+    defaults: Dict[str, Any],
+    overrides: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge per-agent overrides over the defaults.
+
+    Args:
+        defaults: Parameters shared by every agent (must include `model`)
+        overrides: Agent name -> parameters that replace the defaults for that agent
+
+    Returns:
+        Agent name -> complete parameter set, for every agent in AGENT_NAMES
+    """
+    overrides = overrides or {}
+    unknown = sorted(set(overrides) - set(AGENT_NAMES))
+    if unknown:
+        raise ValueError(f"Unknown agent(s) {', '.join(unknown)} (expected {', '.join(AGENT_NAMES)})")
+
+    defaults = _check_parameters(defaults, "defaults")
+    return {
+        name: {**defaults, **_check_parameters(overrides.get(name, {}), name)}
+        for name in AGENT_NAMES
+    }
+
+
+def pin_shared_models(configs: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Make agents that run the same model load it the same way.
+
+    Ollama reloads a model whenever a request asks for a different context
+    size, which also throws away its cached prompt prefixes. Agents sharing a
+    model therefore all get the largest num_ctx any of them sets, and every
+    agent without a keep_alive gets DEFAULT_KEEP_ALIVE.
+
+    Args:
+        configs: Agent name -> complete parameter set, from resolve_agent_configs()
+
+    Returns:
+        Agent name -> parameter set with num_ctx and keep_alive pinned
+    """
+    num_ctx: Dict[str, int] = {}
+    for config in configs.values():
+        if config.get("num_ctx") is not None:
+            num_ctx[config["model"]] = max(num_ctx.get(config["model"], 0), config["num_ctx"])
+
+    pinned = {}
+    for name, config in configs.items():
+        config = {**config}
+        config.setdefault("keep_alive", DEFAULT_KEEP_ALIVE)
+        if config["model"] in num_ctx:
+            config["num_ctx"] = num_ctx[config["model"]]
+        pinned[name] = config
+    return pinned
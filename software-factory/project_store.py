@@ -0,0 +1,278 @@
+"""
+Project Store
+
+Index over every project generated under an output directory, so that past
+results can be listed and looked up without walking the filesystem.
+
+Each build gets a collision-free project ID (the short name derived from the
+idea plus a hash of the full idea), and is recorded in a SQLite database
+with its idea, models, timings, status and the hash of every generated
+file. File contents are kept once per distinct content in a
+content-addressed blob store, so a project can be exported again even after
+its directory has been overwritten or removed.
+"""
+
+from source_tree import walk_files
+from write_buffer import safe_join
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+def make_project_id(project_name: str, user_idea: str) -> str:
+    """Directory-safe ID: the short project name plus a hash of the whole idea."""
+    digest = hashlib.sha256(" ".join(user_idea.split()).encode("utf-8")).hexdigest()
+    return f"{project_name}_{digest[:8]}"
+
+
+class ProjectStore:
+    """SQLite index and content-addressed blob store for the projects under one output directory."""
+
+    DB_FILENAME = "projects.sqlite3"
+    BLOB_DIRNAME = ".blobs"
+
+    # Files of a project directory that are indexed besides code/
+    DOCUMENTS = ("requirements.md", "implementation.md", "metrics.json", "validation.json")
+
+    def __init__(self, output_dir: str, read_only: bool = False):
+        """
+        Open (or create) the store of an output directory.
+
+        Args:
+            output_dir: Directory the projects are generated in
+            read_only: Only query the store: nothing is created, and a missing
+                database raises FileNotFoundError
+
+        Raises:
+            FileNotFoundError: If `read_only` is set and nothing has been indexed yet
+        """
+        self.output_dir = output_dir
+        self.blob_dir = os.path.join(output_dir, self.BLOB_DIRNAME)
+        self._lock = threading.Lock()
+
+        db_path = os.path.join(output_dir, self.DB_FILENAME)
+        if read_only:
+            if not os.path.isfile(db_path):
+                raise FileNotFoundError(f"no projects indexed in {output_dir}")
+            self._conn = sqlite3.connect(
+                f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, check_same_thread=False, isolation_level=None
+            )
+            self._conn.row_factory = sqlite3.Row
+            return
+
+        os.makedirs(output_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS projects (
+                id TEXT PRIMARY KEY,
+                user_idea TEXT NOT NULL,
+                project_name TEXT NOT NULL,
+                project_dir TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                models TEXT,
+                seconds REAL,
+                llm_calls INTEGER,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                files_passed INTEGER,
+                files_failed INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                project_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (project_id, path)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS projects_updated_at ON projects (updated_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _store_blob(self, data: bytes) -> str:
+        """Store content once; returns its SHA-256."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest
+
+    def _project_files(self, project_dir: str) -> List[str]:
+        """Relative paths of the documents and generated code of a project."""
+        paths = [name for name in self.DOCUMENTS if os.path.isfile(os.path.join(project_dir, name))]
+        paths.extend(f"code/{path}" for path in walk_files(os.path.join(project_dir, "code")))
+        return paths
+
+    def record(self, result: Dict[str, Any], status: str = "succeeded") -> str:
+        """
+        Index a saved build and store its files.
+
+        Args:
+            result: Result dictionary from build(), after save_output()
+            status: Build status
+
+        Returns:
+            The project ID
+        """
+        project_dir = result["project_dir"]
+        files = []
+        for path in self._project_files(project_dir):
+            with open(os.path.join(project_dir, path), "rb") as f:
+                data = f.read()
+            files.append((path, self._store_blob(data), len(data)))
+
+        totals = result.get("metrics", {}).get("totals", {})
+        validation = (result.get("validation") or {}).get("summary", {})
+        models = {phase: summary["model"] for phase, summary in result.get("phases", {}).items()}
+        self._upsert(
+            result["project_id"], result["user_idea"], result["project_name"], project_dir, status,
+            error=None,
+            models=json.dumps(models),
+            seconds=totals.get("wall_seconds"),
+            llm_calls=totals.get("llm_calls"),
+            prompt_tokens=totals.get("prompt_tokens"),
+            completion_tokens=totals.get("completion_tokens"),
+            files_passed=validation.get("passed"),
+            files_failed=validation.get("failed")
+        )
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM files WHERE project_id = ?", (result["project_id"],))
+            self._conn.executemany(
+                "INSERT INTO files (project_id, path, sha256, size) VALUES (?, ?, ?, ?)",
+                [(result["project_id"], path, digest, size) for path, digest, size in files]
+            )
+            self._conn.execute("COMMIT")
+        return result["project_id"]
+
+    def record_failure(
+        self,
+        project_id: str,
+        user_idea: str,
+        project_name: str,
+        project_dir: str,
+        error: str,
+        seconds: Optional[float] = None
+    ) -> None:
+        """Index a build that failed before its output was saved."""
+        self._upsert(project_id, user_idea, project_name, project_dir, "failed", error=error, seconds=seconds)
+
+    def _upsert(
+        self,
+        project_id: str,
+        user_idea: str,
+        project_name: str,
+        project_dir: str,
+        status: str,
+        **fields: Any
+    ) -> None:
+        now = time.time()
+        columns = ["id", "user_idea", "project_name", "project_dir", "status", *fields, "created_at", "updated_at"]
+        values = [project_id, user_idea, project_name, project_dir, status, *fields.values(), now, now]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in ("id", "created_at"))
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO projects ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (id) DO UPDATE SET {updates}",
+                values
+            )
+
+    def list(self, limit: int = 20, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recently updated projects first."""
+        query = "SELECT * FROM projects"
+        params: List[Any] = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY updated_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params)]
+
+    def find(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Projects whose idea or ID contains `text` (case-insensitive)."""
+        pattern = "%" + _escape_like(text) + "%"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                "SELECT * FROM projects WHERE user_idea LIKE ? ESCAPE '\\' OR id LIKE ? ESCAPE '\\' "
+                "ORDER BY updated_at DESC LIMIT ?",
+                (pattern, pattern, limit)
+            )]
+
+    def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """
+        A project and its files, by ID or unique ID prefix.
+
+        Raises:
+            ValueError: If the prefix matches more than one project
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM projects WHERE id = ? OR id LIKE ? ESCAPE '\\' ORDER BY id = ? DESC LIMIT 2",
+                (project_id, _escape_like(project_id) + "%", project_id)
+            ).fetchall()
+            if not rows:
+                return None
+            if len(rows) > 1 and rows[0]["id"] != project_id:
+                raise ValueError(f"project ID prefix {project_id!r} is ambiguous")
+            project = dict(rows[0])
+            project["files"] = [dict(row) for row in self._conn.execute(
+                "SELECT path, sha256, size FROM files WHERE project_id = ? ORDER BY path", (project["id"],)
+            )]
+        return project
+
+    def export(self, project_id: str, target_dir: str) -> List[str]:
+        """
+        Recreate a project's stored files under `target_dir`.
+
+        Returns:
+            The paths written, relative to `target_dir`
+
+        Raises:
+            ValueError: If the project is unknown, or a stored path would land
+                outside `target_dir` (e.g. in a tampered index)
+        """
+        project = self.get(project_id)
+        if project is None:
+            raise ValueError(f"unknown project {project_id!r}")
+        for entry in project["files"]:
+            target = safe_join(target_dir, entry["path"])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(self._blob_path(entry["sha256"]), "rb") as src, open(target, "wb") as dst:
+                dst.write(src.read())
+        return [entry["path"] for entry in project["files"]]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def _escape_like(text: str) -> str:
+    """Escape the LIKE wildcards and the escape character itself (used with ESCAPE '\\')."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -7,24 +7,24 @@ This agent is responsible for:
 - Producing a final, explicit requirements specification
 """
 
-from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable, RunnableParallel
 from langchain_core.tools import Tool
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Optional
+from streaming import TokenSink, astream_phase
+from token_budget import SectionCutoff, astream_until, requirements_cutoff, stream_until
 
+# langchain_classic is slow to import and only needed in agent mode
+if TYPE_CHECKING:
+    from langchain_classic.agents import AgentExecutor
 
-class RequirementsEngineer:
-    """Requirements Engineer Agent that analyzes user ideas and produces specifications."""
-    
-    def __init__(self, llm: BaseChatModel):
-        self.llm = llm
-        self.agent = self._create_agent()
-    
-    def _create_agent(self) -> AgentExecutor:
-        """Create the Requirements Engineer agent."""
-        
-        system_prompt = """You are a Requirements Engineer in a software development company.
+
+# "chain": one prompt -> LLM -> parser call; "agent": tool-calling AgentExecutor
+MODES = ("chain", "agent")
+
+SYSTEM_PROMPT = """You are a Requirements Engineer in a software development company.
 
 Your responsibilities:
 - Clarify the problem and scope
@@ -52,8 +52,58 @@ When you receive a user idea, analyze it and produce a requirements specificatio
 
 Be thorough but concise. Only ask questions if critical information is missing."""
 
+
+class RequirementsEngineer:
+    """Requirements Engineer Agent that analyzes user ideas and produces specifications."""
+    
+    def __init__(self, llm: BaseChatModel, mode: str = "chain", stop_early: bool = False):
+        """
+        Args:
+            llm: Chat model to use
+            mode: "chain" for a single prompt -> LLM -> parser call, or "agent"
+                for the tool-calling AgentExecutor
+            stop_early: Stop generating once every requirement subsection is
+                complete (chain mode only: an agent run cannot be cut short)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.llm = llm
+        self.mode = mode
+        self.stop_early = stop_early and mode == "chain"
+        self.agent = self._create_agent() if mode == "agent" else self._create_chain()
+        self._text_chain: Optional[Runnable] = None
+    
+    @property
+    def text_chain(self) -> Runnable:
+        """Single-call chain streaming plain text, for generations stopped early; built on first use."""
+        if self._text_chain is None:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", SYSTEM_PROMPT),
+                ("human", "{input}"),
+            ])
+            self._text_chain = prompt | self.llm | StrOutputParser()
+        return self._text_chain
+    
+    def _create_chain(self) -> Runnable:
+        """
+        Create the single-call chain: prompt -> LLM -> output parser.
+        
+        Returns the same {"output": ...} shape as the AgentExecutor, without
+        the extra round-trip the agent makes whenever the model decides to call
+        `analyze_requirements`.
+        """
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_PROMPT),
+            ("human", "{input}"),
+        ])
+        return RunnableParallel(output=prompt | self.llm | StrOutputParser())
+    
+    def _create_agent(self) -> "AgentExecutor":
+        """Create the Requirements Engineer agent."""
+        from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
+        
         prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", SYSTEM_PROMPT),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ])
@@ -80,9 +130,61 @@ Be thorough but concise. Only ask questions if critical information is missing."
         Returns:
             Dictionary containing the requirements specification
         """
+        if self.stop_early:
+            cutoff = requirements_cutoff()
+            return self._stopped_result(stream_until(self.text_chain, {"input": user_idea}, cutoff), cutoff)
         result = self.agent.invoke({"input": user_idea})
         return {
             "requirements": result["output"],
             "raw_response": result
         }
 
+    async def aanalyze(self, user_idea: str) -> Dict[str, Any]:
+        """
+        Async version of analyze() for concurrent builds.
+        
+        Args:
+            user_idea: High-level description of the software idea
+            
+        Returns:
+            Dictionary containing the requirements specification
+        """
+        if self.stop_early:
+            cutoff = requirements_cutoff()
+            return self._stopped_result(await astream_until(self.text_chain, {"input": user_idea}, cutoff), cutoff)
+        result = await self.agent.ainvoke({"input": user_idea})
+        return {
+            "requirements": result["output"],
+            "raw_response": result
+        }
+
+    async def astream_analyze(self, user_idea: str, sink: Optional[TokenSink] = None) -> Dict[str, Any]:
+        """
+        Analyze a user idea, streaming the specification to a sink as it is generated.
+        
+        Args:
+            user_idea: High-level description of the software idea
+            sink: Destination for the streamed tokens
+            
+        Returns:
+            Dictionary containing the requirements specification and streaming statistics
+        """
+        cutoff = requirements_cutoff() if self.stop_early else None
+        result, stats = await astream_phase(self.agent, {"input": user_idea}, sink, cutoff=cutoff)
+        response = {
+            "requirements": result["output"],
+            "stream_stats": stats
+        }
+        if cutoff and cutoff.stopped_at:
+            response["stopped_at"] = cutoff.stopped_at
+        return response
+
+    def _stopped_result(self, requirements: str, cutoff: SectionCutoff) -> Dict[str, Any]:
+        """Result of a generation streamed through a cutoff, noting the heading it stopped at."""
+        result = {
+            "requirements": requirements,
+            "raw_response": {"output": requirements}
+        }
+        if cutoff.stopped_at:
+            result["stopped_at"] = cutoff.stopped_at
+        return result
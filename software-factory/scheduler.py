@@ -0,0 +1,348 @@
+"""
+LLM Scheduler
+
+Admission control between the agents and the shared chat model, so a burst
+of batch builds cannot flood the model servers while interactive users wait
+behind them.
+
+Every LLM call estimates its size in tokens (prompt plus maximum output) and
+asks the scheduler for a slot. The scheduler caps the requests and tokens in
+flight. When a slot frees up it admits the oldest interactive call first and
+only then batch work, which may also never take the slots reserved for
+interactive calls. Within a priority class, tenants share capacity fairly:
+the tenant that has been served the fewest tokens goes next. A call is shed
+(AdmissionError) when its class's queue is full or it waited too long.
+
+The priority class and tenant of a call come from the context of the build
+that makes it (see `priorities.request_class()`).
+"""
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict
+from metrics import CHARS_PER_TOKEN, record_queue_wait
+from priorities import PRIORITIES, current_request_class
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Sequence
+import asyncio
+import itertools
+import threading
+import time
+
+
+# Output tokens assumed for a call whose model sets no num_predict
+DEFAULT_MAX_OUTPUT_TOKENS = 2048
+
+# Wait times kept per class for the percentiles in stats()
+WAIT_SAMPLES = 1000
+
+class AdmissionError(RuntimeError):
+    """Raised when the scheduler sheds a call instead of queueing it."""
+
+
+class _Waiter:
+    """A queued call; granted by whoever frees the capacity it needs."""
+
+    __slots__ = ("priority", "tenant", "tokens", "sequence", "enqueued", "granted", "event", "future")
+
+    def __init__(self, priority: str, tenant: str, tokens: int, sequence: int):
+        self.priority = priority
+        self.tenant = tenant
+        self.tokens = tokens
+        self.sequence = sequence
+        self.enqueued = time.perf_counter()
+        self.granted = False
+        self.event: Optional[threading.Event] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None and not self.future.done():
+            self.future.get_loop().call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMScheduler:
+    """Priority and per-tenant fair admission of LLM calls under request and token caps."""
+
+    def __init__(
+        self,
+        max_requests: int = 8,
+        max_tokens: Optional[int] = None,
+        interactive_reserve: int = 1,
+        max_queue: int = 256,
+        max_wait_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            max_requests: Maximum LLM calls in flight
+            max_tokens: Maximum estimated tokens (prompt plus maximum output) in
+                flight; a single call larger than this runs alone
+            interactive_reserve: Request slots batch calls may not use
+            max_queue: Calls waiting per priority class beyond which new ones are shed
+            max_wait_seconds: Shed a call that waited this long (None waits indefinitely)
+        """
+        if max_requests < 1:
+            raise ValueError("max_requests must be at least 1")
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.interactive_reserve = min(max(0, interactive_reserve), max_requests - 1)
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+
+        self.in_flight = 0
+        self.tokens_in_flight = 0
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        # Priority -> tenant -> waiting calls in arrival order
+        self._queues: Dict[str, Dict[str, Deque[_Waiter]]] = {priority: {} for priority in PRIORITIES}
+        # Priority -> tenant -> tokens admitted so far, for fair queuing
+        self._served: Dict[str, Dict[str, int]] = {priority: {} for priority in PRIORITIES}
+        self._counters = {
+            priority: {"admitted": 0, "shed": 0, "queued": 0, "peak_depth": 0, "wait_seconds": 0.0}
+            for priority in PRIORITIES
+        }
+        self._waits: Dict[str, Deque[float]] = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITIES}
+
+    def _depth(self, priority: str) -> int:
+        return sum(len(waiters) for waiters in self._queues[priority].values())
+
+    def _fits(self, priority: str, tokens: int) -> bool:
+        """Whether a call can start now (lock held)."""
+        limit = self.max_requests - (self.interactive_reserve if priority == "batch" else 0)
+        if self.in_flight >= limit:
+            return False
+        if self.max_tokens is None or self.in_flight == 0:
+            return True
+        return self.tokens_in_flight + tokens <= self.max_tokens
+
+    def _admit(self, priority: str, tenant: str, tokens: int, waited: float) -> None:
+        """Count a call as in flight (lock held)."""
+        self.in_flight += 1
+        self.tokens_in_flight += tokens
+        served = self._served[priority]
+        # A tenant returning from idle starts level with the least-served waiting one, not with its old credit
+        waiting = [served.get(name, 0) for name in self._queues[priority] if name != tenant]
+        floor = min(waiting) if waiting else 0
+        served[tenant] = max(served.get(tenant, 0), floor) + tokens
+        counters = self._counters[priority]
+        counters["admitted"] += 1
+        counters["wait_seconds"] += waited
+        self._waits[priority].append(waited)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """The call to admit next: strict priority, then least-served tenant (lock held)."""
+        for priority in PRIORITIES:
+            queues = self._queues[priority]
+            if not queues:
+                continue
+            served = self._served[priority]
+            tenant = min(queues, key=lambda name: (served.get(name, 0), queues[name][0].sequence))
+            return queues[tenant][0]
+        return None
+
+    def _dispatch(self) -> None:
+        """Admit waiting calls while they fit, in scheduling order (lock held)."""
+        while True:
+            waiter = self._next_waiter()
+            if waiter is None or not self._fits(waiter.priority, waiter.tokens):
+                # Head-of-line blocking is deliberate: skipping ahead would starve large calls
+                return
+            self._remove(waiter)
+            waiter.granted = True
+            self._admit(waiter.priority, waiter.tenant, waiter.tokens, time.perf_counter() - waiter.enqueued)
+            waiter.wake()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queues = self._queues[waiter.priority]
+        waiters = queues.get(waiter.tenant)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del queues[waiter.tenant]
+
+    def _enqueue(self, tokens: int, asynchronous: bool) -> Optional[_Waiter]:
+        """Admit a call at once (None), or queue it; raises AdmissionError if its class's queue is full."""
+        priority, tenant = current_request_class()
+        with self._lock:
+            nothing_ahead = all(not self._queues[p] for p in PRIORITIES[:PRIORITIES.index(priority) + 1])
+            if nothing_ahead and self._fits(priority, tokens):
+                self._admit(priority, tenant, tokens, 0.0)
+                return None
+            counters = self._counters[priority]
+            depth = self._depth(priority)
+            if depth >= self.max_queue:
+                counters["shed"] += 1
+                raise AdmissionError(f"LLM queue for {priority} calls is full ({depth} waiting)")
+            waiter = _Waiter(priority, tenant, tokens, next(self._sequence))
+            if asynchronous:
+                waiter.future = asyncio.get_running_loop().create_future()
+            else:
+                waiter.event = threading.Event()
+            self._queues[priority].setdefault(tenant, deque()).append(waiter)
+            counters["queued"] += 1
+            counters["peak_depth"] = max(counters["peak_depth"], depth + 1)
+            return waiter
+
+    def _give_up(self, waiter: _Waiter, shed: bool) -> bool:
+        """Drop a waiter that timed out (shed) or was cancelled; False if it was granted meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._remove(waiter)
+            if shed:
+                self._counters[waiter.priority]["shed"] += 1
+            # It may have been blocking smaller calls behind it
+            self._dispatch()
+            return True
+
+    def release(self, tokens: int) -> None:
+        """Return a finished call's slot and tokens."""
+        with self._lock:
+            self.in_flight -= 1
+            self.tokens_in_flight -= tokens
+            self._dispatch()
+
+    def acquire(self, tokens: int) -> None:
+        """Block until a call of `tokens` estimated tokens is admitted."""
+        started = time.perf_counter()
+        waiter = self._enqueue(tokens, asynchronous=False)
+        if waiter is None:
+            return
+        if not waiter.event.wait(self.max_wait_seconds) and self._give_up(waiter, shed=True):
+            raise AdmissionError(f"LLM call waited more than {self.max_wait_seconds}s for admission")
+        record_queue_wait(time.perf_counter() - started)
+
+    async def aacquire(self, tokens: int) -> None:
+        """Async version of acquire()."""
+        started = time.perf_counter()
+        waiter = self._enqueue(tokens, asynchronous=True)
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if self._give_up(waiter, shed=True):
+                raise AdmissionError(f"LLM call waited more than {self.max_wait_seconds}s for admission")
+        except asyncio.CancelledError:
+            if not self._give_up(waiter, shed=False):
+                self.release(tokens)
+            raise
+        record_queue_wait(time.perf_counter() - started)
+
+    @contextmanager
+    def slot(self, tokens: int) -> Iterator[None]:
+        self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release(tokens)
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int) -> AsyncIterator[None]:
+        await self.aacquire(tokens)
+        try:
+            yield
+        finally:
+            self.release(tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        """In-flight load and, per priority class, queue depth, admissions, sheds and wait times."""
+        with self._lock:
+            classes = {}
+            for priority in PRIORITIES:
+                counters = self._counters[priority]
+                waits = sorted(self._waits[priority])
+                classes[priority] = {
+                    "depth": self._depth(priority),
+                    "tenants_waiting": len(self._queues[priority]),
+                    **counters,
+                    "wait_seconds": round(counters["wait_seconds"], 3),
+                    "wait_p50": round(waits[len(waits) // 2], 3) if waits else None,
+                    "wait_p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 3) if waits else None
+                }
+            return {
+                "in_flight": self.in_flight,
+                "tokens_in_flight": self.tokens_in_flight,
+                "max_requests": self.max_requests,
+                "max_tokens": self.max_tokens,
+                "classes": classes
+            }
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Chat model that admits every call through an LLMScheduler before passing it to the wrapped model."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    llm: BaseChatModel
+    scheduler: LLMScheduler
+    # Output budget counted for every call (the model's num_predict)
+    max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return dict(self.llm._identifying_params)
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Any = None, **kwargs: Any):
+        """Bind tools in the OpenAI tool format Ollama expects (tool_choice is not supported)."""
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return super().bind(tools=formatted_tools, **kwargs)
+
+    def _estimate(self, messages: List[BaseMessage]) -> int:
+        prompt_chars = sum(len(str(message.content)) for message in messages)
+        return prompt_chars // CHARS_PER_TOKEN + self.max_output_tokens
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        with self.scheduler.slot(self._estimate(messages)):
+            return self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        async with self.scheduler.aslot(self._estimate(messages)):
+            return await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        with self.scheduler.slot(self._estimate(messages)):
+            yield from self.llm._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async with self.scheduler.aslot(self._estimate(messages)):
+            async for chunk in self.llm._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
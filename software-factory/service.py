@@ -0,0 +1,370 @@
+"""
+Build Service
+
+A long-running HTTP service around one SoftwareFactoryOrchestrator. The
+interpreter, the LangChain imports, the agents and the model clients (with
+their open connections) are set up once when the service starts, so each
+build only pays for the model calls themselves.
+
+Endpoints, served over TCP or a Unix socket, all JSON:
+
+    POST /builds               {"idea": "...", "resume": false, "priority": "interactive",
+                               "tenant": "..."} -> 202 with the job
+    GET  /builds               the most recent jobs
+    GET  /builds/<id>          a job's status, with its artifact paths once it succeeded
+    GET  /builds/<id>/events   phase progress as newline-delimited JSON, until the job ends
+    GET  /health               uptime, job counts and LLM scheduler statistics
+
+Builds run concurrently up to a limit; builds of the same idea (and so the
+same project directory) run one after the other.
+"""
+
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from priorities import DEFAULT_TENANT, PRIORITIES
+from source_tree import walk_files
+import asyncio
+import itertools
+import json
+import os
+import time
+
+if TYPE_CHECKING:
+    from orchestrator import SoftwareFactoryOrchestrator
+
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 64 * 1024
+
+# Finished jobs kept for status queries; older ones are forgotten
+MAX_FINISHED_JOBS = 1000
+
+REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"
+}
+
+
+class BuildJob:
+    """A build submitted to the service, and the progress events it has emitted."""
+
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        user_idea: str,
+        project_id: str,
+        resume: bool = False,
+        priority: str = "interactive",
+        tenant: str = DEFAULT_TENANT
+    ):
+        self.id = f"job-{next(self._ids)}"
+        self.user_idea = user_idea
+        self.project_id = project_id
+        self.resume = resume
+        self.priority = priority
+        self.tenant = tenant
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.artifacts: Optional[Dict[str, Any]] = None
+        self.events: List[Dict[str, Any]] = []
+        self.submitted = time.time()
+        self.finished: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """Record a progress event and wake the clients following this job."""
+        self.events.append({"job": self.id, "time": round(time.time(), 3), **event})
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished = time.time()
+        event: Dict[str, Any] = {"event": status}
+        if error:
+            event["error"] = error
+        if self.artifacts:
+            event["artifacts"] = self.artifacts
+        self.emit(event)
+
+    async def follow(self) -> AsyncIterator[Dict[str, Any]]:
+        """Every event so far, then each new one as it is emitted, until the job ends."""
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                return
+            await changed.wait()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "user_idea": self.user_idea,
+            "project_id": self.project_id,
+            "priority": self.priority,
+            "tenant": self.tenant,
+            "status": self.status,
+            "error": self.error,
+            "artifacts": self.artifacts,
+            "phase": next((e["phase"] for e in reversed(self.events) if e["event"] == "phase"), None),
+            "submitted": round(self.submitted, 3),
+            "finished": round(self.finished, 3) if self.finished else None
+        }
+
+
+class BuildService:
+    """Accepts build jobs over HTTP and runs them on one warm orchestrator."""
+
+    def __init__(
+        self,
+        orchestrator: "SoftwareFactoryOrchestrator",
+        base_output_dir: str = "output",
+        concurrency: int = 4
+    ):
+        """
+        Args:
+            orchestrator: Orchestrator shared by every build
+            base_output_dir: Directory the projects are written to
+            concurrency: Maximum number of builds in flight at once
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.orchestrator = orchestrator
+        self.base_output_dir = base_output_dir
+        self.concurrency = concurrency
+        self.jobs: Dict[str, BuildJob] = {}
+        self.started = time.time()
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Project ID -> [lock, number of jobs holding or waiting for it]
+        self._project_locks: Dict[str, List[Any]] = {}
+        self._tasks: set = set()
+
+    def submit(
+        self,
+        user_idea: str,
+        resume: bool = False,
+        priority: str = "interactive",
+        tenant: str = DEFAULT_TENANT
+    ) -> BuildJob:
+        """
+        Queue a build; it starts as soon as a slot and its project directory are free.
+
+        Raises:
+            ValueError: If the priority class is unknown
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r} (expected one of {', '.join(PRIORITIES)})")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        job = BuildJob(
+            user_idea, self.orchestrator.project_id(user_idea), resume=resume, priority=priority, tenant=tenant
+        )
+        self.jobs[job.id] = job
+        job.emit({"event": "queued", "project_id": job.project_id})
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._forget_finished()
+        return job
+
+    async def _run(self, job: BuildJob) -> None:
+        entry = self._project_locks.setdefault(job.project_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            await self._build(job, entry[0])
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._project_locks[job.project_id]
+
+    async def _build(self, job: BuildJob, project_lock: asyncio.Lock) -> None:
+        async with self._slots, project_lock:
+            job.status = "running"
+            job.emit({"event": "started"})
+            build_started = time.perf_counter()
+            error: Optional[str] = "build was cancelled"
+            try:
+                result = await self.orchestrator.abuild(
+                    job.user_idea, self.base_output_dir, resume=job.resume, echo=False, progress=job.emit,
+                    priority=job.priority, tenant=job.tenant
+                )
+                # Saving, indexing and listing the files hit the disk; keep them off the event loop
+                project_dir = await asyncio.to_thread(self.orchestrator.save_output, result, self.base_output_dir)
+                job.artifacts = await asyncio.to_thread(self._artifacts, result, project_dir)
+                error = None
+            except Exception as e:
+                error = str(e)
+                await self.orchestrator.arecord_failure(
+                    job.user_idea, self.base_output_dir, error, seconds=round(time.perf_counter() - build_started, 3)
+                )
+            finally:
+                # Always end the job, or /builds/<id>/events clients would wait forever
+                job.finish("failed" if error else "succeeded", error=error)
+
+    def _artifacts(self, result: Dict[str, Any], project_dir: str) -> Dict[str, Any]:
+        """Paths of a saved build's files, and its headline numbers."""
+        code_dir = os.path.join(project_dir, "code")
+        artifacts = {
+            "project_dir": project_dir,
+            "code_dir": code_dir,
+            "files": walk_files(code_dir),
+            "documents": {
+                name: os.path.join(project_dir, name)
+                for name in ("requirements.md", "implementation.md", "metrics.json", "validation.json")
+                if os.path.exists(os.path.join(project_dir, name))
+            },
+            "seconds": result["metrics"]["totals"]["wall_seconds"]
+        }
+        if result.get("validation"):
+            artifacts["validation"] = result["validation"]["summary"]
+        return artifacts
+
+    def _forget_finished(self) -> None:
+        finished = [job for job in self.jobs.values() if job.done]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+    def health(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "status": "ok",
+            "uptime": round(time.time() - self.started, 3),
+            "concurrency": self.concurrency,
+            "jobs": counts,
+            "scheduler": self.orchestrator.scheduler_stats()
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one HTTP request; the connection is closed afterwards."""
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+            except ValueError as e:
+                status = 413 if "too large" in str(e) else 400
+                await self._respond(writer, status, {"error": str(e)})
+                return
+            await self._route(writer, method, path, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            await self._respond(writer, 500, {"error": str(e)})
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise ValueError("malformed request line")
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), urlsplit(target).path.rstrip("/") or "/", body
+
+    async def _route(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes) -> None:
+        parts = path.strip("/").split("/")
+        if path == "/health":
+            await self._respond(writer, 200, self.health())
+        elif parts == ["builds"] and method == "POST":
+            try:
+                request = json.loads(body or b"{}")
+                user_idea = request["idea"].strip()
+            except (ValueError, KeyError, TypeError, AttributeError):
+                await self._respond(writer, 400, {"error": 'expected a JSON body with an "idea" string'})
+                return
+            if not user_idea:
+                await self._respond(writer, 400, {"error": "idea is empty"})
+                return
+            try:
+                job = self.submit(
+                    user_idea,
+                    resume=bool(request.get("resume")),
+                    priority=request.get("priority") or "interactive",
+                    tenant=str(request.get("tenant") or DEFAULT_TENANT)
+                )
+            except ValueError as e:
+                await self._respond(writer, 400, {"error": str(e)})
+                return
+            await self._respond(writer, 202, {**job.to_dict(), "events": f"/builds/{job.id}/events"})
+        elif parts == ["builds"] and method == "GET":
+            jobs = sorted(self.jobs.values(), key=lambda job: job.submitted, reverse=True)
+            await self._respond(writer, 200, {"jobs": [job.to_dict() for job in jobs[:100]]})
+        elif len(parts) in (2, 3) and parts[0] == "builds":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                await self._respond(writer, 404, {"error": f"unknown job {parts[1]!r}"})
+            elif method != "GET":
+                await self._respond(writer, 405, {"error": f"{method} not allowed"})
+            elif len(parts) == 2:
+                await self._respond(writer, 200, job.to_dict())
+            elif parts[2] == "events":
+                await self._stream_events(writer, job)
+            else:
+                await self._respond(writer, 404, {"error": f"no such endpoint {path!r}"})
+        else:
+            await self._respond(writer, 404, {"error": f"no such endpoint {path!r}"})
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+        body = (json.dumps(payload) + "\n").encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, job: BuildJob) -> None:
+        """Send the job's events as chunked newline-delimited JSON until it ends."""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        async for event in job.follow():
+            line = (json.dumps(event) + "\n").encode("utf-8")
+            writer.write(f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None) -> None:
+        """
+        Listen until cancelled.
+
+        Args:
+            host: Interface to listen on
+            port: TCP port
+            socket_path: Listen on this Unix socket instead of TCP
+        """
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            address = socket_path
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+            address = f"http://{host}:{port}"
+        print(f"🏭 Software Factory service listening on {address} ({self.concurrency} concurrent build(s))")
+        async with server:
+            await server.serve_forever()
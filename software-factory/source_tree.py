@@ -0,0 +1,36 @@
+"""
+Source Tree
+
+Which parts of a generated `code/` directory are the build's own files.
+Virtualenvs, caches and checkpoints found there are never validated, stored
+or listed, and the write buffer moves them as a whole instead of relinking
+them file by file.
+
+Only depends on the standard library, so the I/O layer, the validation
+phase, the project store and the build service can all share it.
+"""
+
+from typing import List
+import os
+
+
+# Directories that hold no generated code (virtualenvs, caches, checkpoints)
+SKIP_DIRS = frozenset({
+    "__pycache__", ".git", ".venv", "venv", "env", "node_modules", ".checkpoints", ".pytest_cache"
+})
+
+# Compiled files that sit next to the sources
+SKIP_SUFFIXES = (".pyc", ".pyo")
+
+
+def walk_files(code_dir: str) -> List[str]:
+    """Relative paths (with `/` separators) of the generated files under a code directory, sorted."""
+    files = []
+    for root, dirs, filenames in os.walk(code_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for filename in sorted(filenames):
+            if filename.endswith(SKIP_SUFFIXES):
+                continue
+            path = os.path.relpath(os.path.join(root, filename), code_dir)
+            files.append(path.replace(os.sep, "/"))
+    return files
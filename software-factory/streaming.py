@@ -0,0 +1,157 @@
+"""
+Token Streaming
+
+Streams an agent's output tokens to the console and straight into the
+phase's markdown file as they are generated, instead of printing and saving
+the full output once the phase returns. Per-phase time-to-first-token and
+tokens/sec are measured along the way. A cutoff can stop the stream once
+the sections the next phase needs are complete.
+"""
+
+from langchain_core.runnables import Runnable
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+import sys
+import time
+
+if TYPE_CHECKING:
+    from token_budget import SectionCutoff
+
+
+class TokenSink:
+    """Writes a phase's tokens to a markdown file after a fixed header, and optionally to stdout."""
+
+    def __init__(
+        self,
+        path: str,
+        header: str,
+        echo: bool = True,
+        on_text: Optional[Callable[[str], None]] = None,
+        on_reset: Optional[Callable[[], None]] = None
+    ):
+        """
+        Open the output file and write its header.
+
+        Args:
+            path: File the phase output is streamed into
+            header: Text written before the streamed output
+            echo: Also write tokens to stdout
+            on_text: Called with every chunk of output, e.g. to parse it as it streams
+            on_reset: Called when the output streamed so far is discarded, so
+                whatever `on_text` did with it can be undone
+        """
+        self.path = path
+        self.echo = echo
+        self.on_text = on_text
+        self.on_reset = on_reset
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(header)
+        self._file.flush()
+        self._body_offset = self._file.tell()
+
+    def reset(self) -> None:
+        """
+        Discard everything streamed so far.
+
+        Called when the agent starts another LLM call within the same phase:
+        only the final call's output is the phase result.
+        """
+        self._truncate()
+        if self.on_reset:
+            self.on_reset()
+
+    def rewrite(self, text: str) -> None:
+        """
+        Replace everything streamed so far with a prefix of it (the output a
+        cutoff kept); `on_text` has already seen that text, so it is not reset.
+        """
+        self._truncate()
+        self._file.write(text)
+        self._file.flush()
+
+    def _truncate(self) -> None:
+        self._file.seek(self._body_offset)
+        self._file.truncate()
+
+    def write(self, text: str) -> None:
+        """Append a chunk of output."""
+        self._file.write(text)
+        self._file.flush()
+        if self.on_text:
+            self.on_text(text)
+        if self.echo:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def close(self) -> None:
+        if self.echo:
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+        self._file.close()
+
+    def __enter__(self) -> "TokenSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+async def astream_phase(
+    runnable: Runnable,
+    inputs: Dict[str, Any],
+    sink: Optional[TokenSink] = None,
+    cutoff: Optional["SectionCutoff"] = None
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Run an agent with `astream_events`, forwarding tokens to a sink as they arrive.
+
+    Args:
+        runnable: Agent (or chain) to run
+        inputs: Input dictionary for the runnable
+        sink: Destination for the streamed tokens
+        cutoff: Stops the stream once it says so; the output is then
+            `{"output": cutoff.text}` (single-call chains only)
+
+    Returns:
+        Tuple of the runnable's final output and the phase's streaming statistics
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    tokens = 0
+    output = None
+
+    events = runnable.astream_events(inputs, version="v2")
+    try:
+        async for event in events:
+            kind = event["event"]
+            if kind == "on_chat_model_start":
+                if sink:
+                    sink.reset()
+            elif kind == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                if not isinstance(content, str) or not content:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                # Ollama streams one token per chunk
+                tokens += 1
+                if sink:
+                    sink.write(content)
+                if cutoff and cutoff.feed(content):
+                    output = {"output": cutoff.text}
+                    if sink:
+                        sink.rewrite(cutoff.text)
+                    break
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                output = event["data"].get("output")
+    finally:
+        await events.aclose()
+
+    finished = time.perf_counter()
+    generation_seconds = finished - first_token_at if first_token_at else 0.0
+    stats = {
+        "seconds": round(finished - started, 3),
+        "time_to_first_token": round(first_token_at - started, 3) if first_token_at else None,
+        "tokens": tokens,
+        "tokens_per_second": round(tokens / generation_seconds, 2) if generation_seconds > 0 else None
+    }
+    return output, stats
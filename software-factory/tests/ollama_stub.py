@@ -0,0 +1,141 @@
+"""
+Ollama Stub Server
+
+A minimal stand-in for the Ollama HTTP API, for testing endpoint routing,
+health checks and failover without a model:
+
+- `GET /api/version` answers `{"version": ...}` (the pool's health probe)
+- `POST /api/chat` answers with a fixed reply, as NDJSON chunks when the
+  request streams and as one JSON object otherwise
+
+Every chat request is counted, and each one can be held for `delay` seconds
+so that concurrent calls overlap.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+import json
+import socket
+import threading
+import time
+
+
+class OllamaStub:
+    """An Ollama stub listening on a free localhost port, in a background thread."""
+
+    def __init__(self, reply: str = "stub reply", delay: float = 0.0):
+        """
+        Args:
+            reply: Content of every chat response
+            delay: Seconds each chat request is held before it is answered
+        """
+        self.reply = reply
+        self.delay = delay
+        self.chat_requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.models: List[str] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _chat(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.chat_requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.models.append(request.get("model", ""))
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        model = request.get("model", "")
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        return [
+            {
+                "model": model,
+                "created_at": created_at,
+                "message": {"role": "assistant", "content": self.reply},
+                "done": False
+            },
+            {
+                "model": model,
+                "created_at": created_at,
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": 1,
+                "load_duration": 0,
+                "prompt_eval_count": 1,
+                "prompt_eval_duration": 1,
+                "eval_count": 1,
+                "eval_duration": 1
+            }
+        ]
+
+
+def _handler(stub: OllamaStub) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            if self.path == "/api/version":
+                self._send(200, json.dumps({"version": "0.0.0-stub"}), "application/json")
+            else:
+                self._send(404, json.dumps({"error": "not found"}), "application/json")
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/api/chat":
+                self._send(404, json.dumps({"error": "not found"}), "application/json")
+                return
+            chunks = stub._chat(request)
+            if request.get("stream", True):
+                body = "".join(json.dumps(chunk) + "\n" for chunk in chunks)
+                self._send(200, body, "application/x-ndjson")
+            else:
+                final = dict(chunks[-1], message=chunks[0]["message"])
+                self._send(200, json.dumps(final), "application/json")
+
+        def _send(self, status: int, body: str, content_type: str) -> None:
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def refused_url() -> str:
+    """URL of a localhost port nothing listens on, so connections are refused."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
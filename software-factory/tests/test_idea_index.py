@@ -0,0 +1,150 @@
+"""
+Idea Index Tests
+
+Similarity search, namespaces and concurrent appends of the idea index, and
+requirements reuse by the orchestrator, with a stub embedder (no Ollama).
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from contextlib import redirect_stdout
+from langchain_core.embeddings import Embeddings
+from idea_index import DEFAULT_REUSE_THRESHOLD, IdeaIndex
+from orchestrator import SoftwareFactoryOrchestrator
+from scripted_llm import ScriptedChatModel
+from typing import Dict, List
+import io
+import math
+import tempfile
+import unittest
+
+
+def at_similarity(similarity: float) -> List[float]:
+    """A unit vector whose cosine similarity to [1, 0, 0] is `similarity`."""
+    return [similarity, math.sqrt(1.0 - similarity ** 2), 0.0]
+
+
+class StubEmbeddings(Embeddings):
+    """Embeds known texts to fixed vectors and anything else to an unrelated one."""
+
+    def __init__(self, vectors: Dict[str, List[float]]):
+        self.vectors = vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vectors.get(text, [0.0, 0.0, 1.0])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+IDEA = "Create a currency converter"
+NEAR_IDEA = "Build a currency conversion CLI"
+FAR_IDEA = "Write a currency exchange rate dashboard"
+
+EMBEDDER = StubEmbeddings({
+    IDEA: [1.0, 0.0, 0.0],
+    NEAR_IDEA: at_similarity(DEFAULT_REUSE_THRESHOLD + 0.03),
+    FAR_IDEA: at_similarity(DEFAULT_REUSE_THRESHOLD - 0.03)
+})
+
+
+class IdeaIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp.name, "ideas")
+        self.indexes: List[IdeaIndex] = []
+
+    def tearDown(self):
+        for index in self.indexes:
+            index.close()
+        self.tmp.cleanup()
+
+    def open_index(self) -> IdeaIndex:
+        index = IdeaIndex(self.index_dir, EMBEDDER)
+        self.indexes.append(index)
+        return index
+
+    def test_search_ranks_by_similarity(self):
+        index = self.open_index()
+        index.add(FAR_IDEA, index.embed(FAR_IDEA), "far spec")
+        index.add(NEAR_IDEA, index.embed(NEAR_IDEA), "near spec")
+
+        matches = index.search(index.embed(IDEA), k=2)
+
+        self.assertEqual([match["idea"] for match in matches], [NEAR_IDEA, FAR_IDEA])
+        self.assertGreaterEqual(matches[0]["score"], DEFAULT_REUSE_THRESHOLD)
+        self.assertLess(matches[1]["score"], DEFAULT_REUSE_THRESHOLD)
+
+    def test_namespaces_are_kept_apart(self):
+        index = self.open_index()
+        index.add(IDEA, index.embed(IDEA), "llama spec", namespace="llama3.1")
+        index.add(IDEA, index.embed(IDEA), "qwen spec", namespace="qwen2.5")
+
+        matches = index.search(index.embed(IDEA), k=5, namespace="qwen2.5")
+
+        self.assertEqual([match["requirements"] for match in matches], ["qwen spec"])
+        self.assertEqual(index.search(index.embed(IDEA), namespace="mistral"), [])
+
+    def test_two_instances_append_to_one_directory(self):
+        first, second = self.open_index(), self.open_index()
+        first.add(IDEA, first.embed(IDEA), "first spec")
+        second.add(FAR_IDEA, second.embed(FAR_IDEA), "second spec")
+
+        for index in (first, second, self.open_index()):
+            ideas = sorted(match["idea"] for match in index.search(index.embed(IDEA), k=5))
+            self.assertEqual(ideas, sorted([IDEA, FAR_IDEA]))
+
+    def test_embedding_size_mismatch_is_refused(self):
+        index = self.open_index()
+        index.add(IDEA, index.embed(IDEA), "spec")
+        with self.assertRaises(ValueError):
+            index.add("short", index._normalize([1.0, 0.0]), "spec")
+
+
+class RequirementsReuseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.llm = ScriptedChatModel(files=2, file_bytes=256)
+        self.orchestrator = SoftwareFactoryOrchestrator(
+            llm=self.llm, validate=False, embedder=EMBEDDER,
+            idea_index_dir=os.path.join(self.tmp.name, "ideas")
+        )
+
+    def tearDown(self):
+        self.orchestrator.idea_index.close()
+        self.tmp.cleanup()
+
+    def build(self, idea: str) -> Dict:
+        with redirect_stdout(io.StringIO()):
+            return self.orchestrator.build(idea, os.path.join(self.tmp.name, "output"))
+
+    def requirements_calls(self, idea: str) -> int:
+        """LLM calls the requirements phase of a build of `idea` made."""
+        result = self.build(idea)
+        self.requirements_result = result["requirements_raw"]
+        return result["metrics"]["phases"]["requirements"]["llm_calls"]
+
+    def test_similar_idea_reuses_requirements(self):
+        self.assertEqual(self.requirements_calls(IDEA), 1)
+        original = self.requirements_result["requirements"]
+
+        self.assertEqual(self.requirements_calls(NEAR_IDEA), 0)
+        self.assertEqual(self.requirements_result["requirements"], original)
+        self.assertEqual(self.requirements_result["reused_from"]["idea"], IDEA)
+
+    def test_dissimilar_idea_generates_requirements(self):
+        self.requirements_calls(IDEA)
+
+        self.assertEqual(self.requirements_calls(FAR_IDEA), 1)
+        self.assertNotIn("reused_from", self.requirements_result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Endpoint Pool Tests
+
+Routing, health checks and failover of the Ollama endpoint pool, against
+local stub servers (see ollama_stub.py).
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent.futures import ThreadPoolExecutor
+from ollama_pool import EndpointPool, NoHealthyEndpointError, PooledChatOllama
+from ollama_stub import OllamaStub, refused_url
+import asyncio
+import unittest
+
+
+CHAT_KWARGS = {"model": "stub-model", "temperature": 0}
+
+
+def pooled_model(pool: EndpointPool) -> PooledChatOllama:
+    return PooledChatOllama(pool=pool, chat_kwargs=CHAT_KWARGS)
+
+
+class RoutingTest(unittest.TestCase):
+    def setUp(self):
+        self.stubs = [OllamaStub(delay=0.3).start(), OllamaStub(delay=0.3).start()]
+        self.pool = EndpointPool([stub.url for stub in self.stubs])
+
+    def tearDown(self):
+        for stub in self.stubs:
+            stub.stop()
+
+    def test_acquire_picks_least_outstanding(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.assertIsNot(first, second)
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(), first)
+
+    def test_concurrent_calls_are_spread_over_endpoints(self):
+        model = pooled_model(self.pool)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            replies = list(executor.map(lambda _: model.invoke("hi").content, range(4)))
+        self.assertEqual(replies, ["stub reply"] * 4)
+        self.assertEqual([stub.chat_requests for stub in self.stubs], [2, 2])
+        self.assertEqual([stub.peak_in_flight for stub in self.stubs], [2, 2])
+        self.assertTrue(all(endpoint["outstanding"] == 0 for endpoint in self.pool.stats()))
+
+    def test_concurrency_cap_is_respected(self):
+        pool = EndpointPool([{"url": self.stubs[0].url, "max_concurrency": 1}])
+        model = pooled_model(pool)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda _: model.invoke("hi"), range(3)))
+        self.assertEqual(self.stubs[0].peak_in_flight, 1)
+        self.assertEqual(self.stubs[0].chat_requests, 3)
+
+
+class HealthTest(unittest.TestCase):
+    def setUp(self):
+        self.stub = OllamaStub().start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_unhealthy_endpoint_is_skipped(self):
+        pool = EndpointPool([refused_url(), self.stub.url], health_check_interval=60)
+        dead, live = pool.endpoints
+        self.assertFalse(pool.check_health(dead))
+        self.assertTrue(pool.check_health(live))
+
+        model = pooled_model(pool)
+        for _ in range(3):
+            self.assertEqual(model.invoke("hi").content, "stub reply")
+        self.assertEqual(dead.requests, 0)
+        self.assertEqual(live.requests, 3)
+        self.assertEqual(self.stub.chat_requests, 3)
+
+    def test_endpoint_recovers_after_health_check_interval(self):
+        pool = EndpointPool([self.stub.url], health_check_interval=0)
+        endpoint = pool.endpoints[0]
+        pool.release(pool.acquire(), failed=True)
+        self.assertFalse(endpoint.healthy)
+        self.assertEqual(pooled_model(pool).invoke("hi").content, "stub reply")
+        self.assertTrue(endpoint.healthy)
+
+    def test_all_endpoints_down(self):
+        pool = EndpointPool([refused_url(), refused_url()], health_check_timeout=0.5)
+        for endpoint in pool.endpoints:
+            pool.check_health(endpoint)
+        with self.assertRaises(NoHealthyEndpointError):
+            pooled_model(pool).invoke("hi")
+
+
+class FailoverTest(unittest.TestCase):
+    def setUp(self):
+        self.stub = OllamaStub().start()
+        # Both endpoints start out healthy; the first call is routed to the dead one
+        self.pool = EndpointPool([refused_url(), self.stub.url], health_check_interval=60)
+        self.dead, self.live = self.pool.endpoints
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def assert_failed_over(self):
+        self.assertEqual(self.dead.failures, 1)
+        self.assertFalse(self.dead.healthy)
+        self.assertEqual(self.stub.chat_requests, 1)
+        self.assertTrue(all(endpoint["outstanding"] == 0 for endpoint in self.pool.stats()))
+
+    def test_invoke_retries_on_connection_refused(self):
+        self.assertEqual(pooled_model(self.pool).invoke("hi").content, "stub reply")
+        self.assert_failed_over()
+
+    def test_stream_retries_on_connection_refused(self):
+        text = "".join(chunk.content for chunk in pooled_model(self.pool).stream("hi"))
+        self.assertEqual(text, "stub reply")
+        self.assert_failed_over()
+
+    def test_ainvoke_retries_on_connection_refused(self):
+        reply = asyncio.run(pooled_model(self.pool).ainvoke("hi"))
+        self.assertEqual(reply.content, "stub reply")
+        self.assert_failed_over()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Orchestrator Tests
+
+Whole builds driven by the scripted chat model of the benchmarks (no Ollama):
+the files a build writes and its validation, resuming an interrupted build
+from its phase checkpoints, and repairing a file that fails validation.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from contextlib import redirect_stdout
+from code_blocks import extract_files
+from orchestrator import SoftwareFactoryOrchestrator
+from scripted_llm import ScriptedChatModel, make_plan
+from typing import Any, Dict, Optional
+import io
+import tempfile
+import unittest
+
+
+IDEA = "Create a currency converter"
+
+FILES = 3
+
+
+class ScriptedBuildTest(unittest.TestCase):
+    """Base for tests that build with a scripted model in a temporary output directory."""
+
+    validate = False
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.tmp.name, "output")
+        self.orchestrators = []
+
+    def tearDown(self):
+        for orchestrator in self.orchestrators:
+            if orchestrator._validation_pool is not None:
+                orchestrator._validation_pool.shutdown()
+        self.tmp.cleanup()
+
+    def orchestrator(self, llm: Optional[ScriptedChatModel] = None, **options: Any) -> SoftwareFactoryOrchestrator:
+        orchestrator = SoftwareFactoryOrchestrator(
+            llm=llm or ScriptedChatModel(files=FILES, file_bytes=256), validate=self.validate, **options
+        )
+        self.orchestrators.append(orchestrator)
+        return orchestrator
+
+    def build(self, orchestrator: SoftwareFactoryOrchestrator, **options: Any) -> Dict[str, Any]:
+        with redirect_stdout(io.StringIO()):
+            return orchestrator.build(IDEA, self.output_dir, **options)
+
+    def code_dir(self, result: Dict[str, Any]) -> str:
+        return result["code_generation"]["code_dir"]
+
+
+class BuildTest(ScriptedBuildTest):
+    validate = True
+
+    def test_build_writes_the_planned_files(self):
+        result = self.build(self.orchestrator())
+
+        planned = extract_files(make_plan(FILES, 256))["files"]
+        for path, content in planned.items():
+            with open(os.path.join(self.code_dir(result), path), encoding="utf-8") as f:
+                self.assertEqual(f.read(), content)
+        self.assertEqual(result["validation"]["summary"]["failed"], 0)
+
+
+class FailingImplementator(ScriptedChatModel):
+    """Scripted model whose Implementator calls fail, as if the build was killed in phase 3."""
+
+    def _implementator_turn(self, messages):
+        raise RuntimeError("implementator crashed")
+
+
+class ResumeTest(ScriptedBuildTest):
+    def test_resume_skips_checkpointed_phases(self):
+        with self.assertRaises(RuntimeError):
+            self.build(self.orchestrator(FailingImplementator(files=FILES, file_bytes=256), fast_path=False))
+
+        llm = ScriptedChatModel(files=FILES, file_bytes=256)
+        result = self.build(self.orchestrator(llm, fast_path=False), resume=True)
+
+        resumed = {phase: info["resumed"] for phase, info in result["phases"].items()}
+        self.assertEqual(resumed, {"requirements": True, "implementation": True, "code_generation": False})
+        calls = {phase: info["llm_calls"] for phase, info in result["metrics"]["phases"].items()}
+        self.assertEqual((calls["requirements"], calls["implementation"]), (0, 0))
+        self.assertEqual(llm.calls, calls["code_generation"])
+        self.assertGreater(llm.calls, 0)
+        self.assertEqual(sorted(os.listdir(self.code_dir(result))), ["app", "main.py"])
+
+    def test_completed_build_resumes_without_calls(self):
+        self.build(self.orchestrator())
+
+        llm = ScriptedChatModel(files=FILES, file_bytes=256)
+        result = self.build(self.orchestrator(llm), resume=True)
+
+        self.assertTrue(all(info["resumed"] for info in result["phases"].values()))
+        self.assertEqual(llm.calls, 0)
+
+    def test_without_resume_every_phase_runs(self):
+        self.build(self.orchestrator())
+
+        result = self.build(self.orchestrator())
+
+        self.assertFalse(any(info["resumed"] for info in result["phases"].values()))
+
+
+class RepairTest(ScriptedBuildTest):
+    BROKEN = "app/module_1.py"
+
+    def setUp(self):
+        super().setUp()
+        orchestrator = self.orchestrator()
+        result = self.build(orchestrator)
+        self.project_dir = orchestrator.save_output(result, self.output_dir)
+        self.code = self.code_dir(result)
+        with open(os.path.join(self.code, self.BROKEN), encoding="utf-8") as f:
+            self.planned = f.read()
+        with open(os.path.join(self.code, self.BROKEN), "w", encoding="utf-8") as f:
+            f.write("def handler_1(value:\n    return value\n")
+        self.untouched = os.stat(os.path.join(self.code, "main.py")).st_mtime_ns
+
+    def repair(self, **options: Any) -> Dict[str, Any]:
+        orchestrator = self.orchestrator(repair_iterations=2, **options)
+        with redirect_stdout(io.StringIO()):
+            return orchestrator.repair(self.project_dir)
+
+    def test_repair_rewrites_only_the_failing_file(self):
+        result = self.repair()
+
+        self.assertEqual(result["repair"]["fixed"], [self.BROKEN])
+        self.assertEqual(result["repair"]["attempts"], {self.BROKEN: 1})
+        self.assertEqual(result["validation"]["summary"]["failed"], 0)
+        with open(os.path.join(self.code, self.BROKEN), encoding="utf-8") as f:
+            self.assertEqual(f.read(), self.planned)
+        self.assertEqual(os.stat(os.path.join(self.code, "main.py")).st_mtime_ns, self.untouched)
+
+    def test_unfixable_file_stops_after_the_last_round(self):
+        # Without the plan the scripted model can only echo the broken file back
+        os.remove(os.path.join(self.project_dir, "implementation.md"))
+
+        result = self.repair()
+
+        self.assertEqual(result["repair"]["unfixed"], [self.BROKEN])
+        self.assertEqual(result["repair"]["iterations"], 2)
+        self.assertEqual(result["repair"]["attempts"], {self.BROKEN: 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
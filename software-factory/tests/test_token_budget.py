@@ -0,0 +1,106 @@
+"""
+Token Budget Tests
+
+Early stopping and compaction of the Backend Engineer's plan, for plans whose
+files are not all under `## Code`.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from code_blocks import extract_files
+from token_budget import compact_plan, plan_cutoff
+import unittest
+
+
+PLAN_WITH_TESTS = """## Architecture
+A command-line converter with its tests.
+
+## Project Structure
+```
+app.py
+tests/test_app.py
+```
+
+## Code
+```python
+# app.py
+def convert(amount):
+    return amount * 2
+```
+
+## Tests
+```python
+# tests/test_app.py
+from app import convert
+
+def test_convert():
+    assert convert(1) == 2
+```
+
+## Setup Instructions
+```bash
+pip install pytest
+```
+
+## Usage
+Run `python app.py`.
+"""
+
+
+def cut(plan: str, chunk_size: int = 7):
+    """Feed a plan to the Backend Engineer's cutoff in small chunks, as a stream would."""
+    cutoff = plan_cutoff()
+    for start in range(0, len(plan), chunk_size):
+        if cutoff.feed(plan[start:start + chunk_size]):
+            break
+    return cutoff
+
+
+class PlanCutoffTest(unittest.TestCase):
+    def test_tests_section_does_not_stop_generation(self):
+        cutoff = cut(PLAN_WITH_TESTS)
+
+        self.assertEqual(cutoff.stopped_at, "Setup Instructions")
+        self.assertIn("def test_convert", cutoff.text)
+        self.assertNotIn("pip install", cutoff.text)
+
+    def test_stops_at_usage_without_setup(self):
+        plan = PLAN_WITH_TESTS.replace("## Setup Instructions\n```bash\npip install pytest\n```\n\n", "")
+
+        self.assertEqual(cut(plan).stopped_at, "Usage")
+
+    def test_files_under_tests_are_extracted(self):
+        files = extract_files(cut(PLAN_WITH_TESTS).text)["files"]
+
+        self.assertEqual(sorted(files), ["app.py", "tests/test_app.py"])
+
+
+class CompactPlanTest(unittest.TestCase):
+    def test_keeps_sections_with_listed_files(self):
+        compacted = compact_plan(PLAN_WITH_TESTS)
+
+        self.assertIn("## Tests", compacted)
+        self.assertIn("def test_convert", compacted)
+        self.assertEqual(extract_files(compacted)["files"], extract_files(PLAN_WITH_TESTS)["files"])
+
+    def test_drops_architecture_and_instructions(self):
+        compacted = compact_plan(PLAN_WITH_TESTS)
+
+        for title in ("## Architecture", "## Setup Instructions", "## Usage"):
+            self.assertNotIn(title, compacted)
+
+    def test_example_outside_code_is_not_a_file(self):
+        plan = PLAN_WITH_TESTS.replace("# tests/test_app.py\n", "")
+
+        self.assertNotIn("## Tests", compact_plan(plan))
+        self.assertEqual(sorted(extract_files(plan)["files"]), ["app.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Write Buffer Tests
+
+Committing and discarding staged writes, and recovering a `code/` directory
+from a commit interrupted between its two renames.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from source_tree import walk_files
+from write_buffer import WriteBuffer
+from typing import Dict
+import tempfile
+import unittest
+
+
+def write_tree(root: str, files: Dict[str, str]) -> None:
+    for path, content in files.items():
+        target = os.path.join(root, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def read_tree(root: str) -> Dict[str, str]:
+    files = {}
+    for path in walk_files(root):
+        with open(os.path.join(root, path), encoding="utf-8") as f:
+            files[path] = f.read()
+    return files
+
+
+class WriteBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.code_dir = os.path.join(self.tmp.name, "code")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def siblings(self):
+        """Staging and backup trees left next to the code directory."""
+        return sorted(name for name in os.listdir(self.tmp.name) if name.startswith(".code."))
+
+    def test_commit_writes_the_last_staged_content(self):
+        buffer = WriteBuffer(self.code_dir)
+        buffer.stage("main.py", "print('draft')\n")
+        buffer.stage("app/util.py", "VALUE = 1\n")
+        buffer.stage("main.py", "print('final')\n")
+
+        stats = buffer.commit()
+
+        self.assertEqual(read_tree(self.code_dir), {"app/util.py": "VALUE = 1\n", "main.py": "print('final')\n"})
+        self.assertEqual((stats["staged"], stats["rewrites"], stats["written"]), (3, 1, 2))
+        self.assertEqual(self.siblings(), [])
+
+    def test_commit_keeps_unstaged_files_and_skips_unchanged_ones(self):
+        write_tree(self.code_dir, {"main.py": "A = 1\n", "README.md": "notes\n", ".venv/lib/site.py": "# venv\n"})
+        buffer = WriteBuffer(self.code_dir)
+        buffer.stage("main.py", "A = 1\n")
+        buffer.stage("app.py", "B = 2\n")
+
+        stats = buffer.commit()
+
+        self.assertEqual((stats["written"], stats["unchanged"]), (1, 1))
+        self.assertEqual(read_tree(self.code_dir), {"README.md": "notes\n", "app.py": "B = 2\n", "main.py": "A = 1\n"})
+        self.assertTrue(os.path.isfile(os.path.join(self.code_dir, ".venv", "lib", "site.py")))
+
+    def test_discard_leaves_the_code_directory_as_it_was(self):
+        write_tree(self.code_dir, {"main.py": "A = 1\n"})
+        buffer = WriteBuffer(self.code_dir)
+        buffer.stage("main.py", "A = 2\n")
+        buffer.stage("app.py", "B = 2\n")
+
+        buffer.discard()
+        buffer.commit()
+
+        self.assertEqual(read_tree(self.code_dir), {"main.py": "A = 1\n"})
+        self.assertEqual(buffer.files, [])
+
+    def test_paths_outside_the_code_directory_are_refused(self):
+        buffer = WriteBuffer(self.code_dir)
+        for path in ("../escape.py", "/etc/passwd"):
+            with self.assertRaises(ValueError):
+                buffer.stage(path, "x")
+
+    def test_recover_restores_the_old_tree_when_the_swap_was_cut_short(self):
+        # Crashed after moving code/ aside and before renaming the staging tree in
+        write_tree(os.path.join(self.tmp.name, ".code.old-1"), {"main.py": "A = 1\n"})
+        write_tree(os.path.join(self.tmp.name, ".code.staging-1"), {"main.py": "A = 2\n"})
+
+        WriteBuffer.recover(self.code_dir)
+
+        self.assertEqual(read_tree(self.code_dir), {"main.py": "A = 1\n"})
+        self.assertEqual(self.siblings(), [])
+
+    def test_recover_moves_kept_trees_into_the_swapped_tree(self):
+        # Crashed after the swap, before the virtualenv was moved over
+        write_tree(self.code_dir, {"main.py": "A = 2\n"})
+        write_tree(os.path.join(self.tmp.name, ".code.old-1"), {"main.py": "A = 1\n", ".venv/pyvenv.cfg": "home\n"})
+
+        WriteBuffer(self.code_dir)
+
+        self.assertEqual(read_tree(self.code_dir), {"main.py": "A = 2\n"})
+        self.assertTrue(os.path.isfile(os.path.join(self.code_dir, ".venv", "pyvenv.cfg")))
+        self.assertEqual(self.siblings(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,272 @@
+"""
+Token Budgets
+
+Prompt-eval and generation time both grow with the number of tokens, so:
+
+- the handoff between phases is compacted to what the next agent uses: the
+  Backend Engineer gets the requirement bullets without the surrounding
+  prose, and the Implementator gets the `## Project Structure` and `## Code`
+  sections of the plan (and any other section holding a listed file, such as
+  `## Tests`) without the setup and usage instructions
+- an agent's generation is stopped once the sections the next phase needs are
+  complete, at the first heading that compaction would drop anyway; the
+  Backend Engineer only at a setup or usage heading
+
+Token counts are estimated from the text (about four characters per token);
+the counts Ollama reports are recorded per phase by the build metrics.
+"""
+
+from code_blocks import find_filename, is_file_block, parse_code_blocks, parse_project_structure
+from metrics import CHARS_PER_TOKEN
+from langchain_core.runnables import Runnable
+from typing import Any, Dict, List, Optional, Sequence
+import re
+
+
+# Requirement subsections the Backend Engineer designs from
+REQUIREMENT_SECTIONS = ("functional", "non-functional", "assumptions", "constraints")
+
+# Plan sections the Implementator writes the files from
+PLAN_SECTIONS = ("project structure", "code")
+
+# Plan sections that must be complete before the Backend Engineer is stopped
+PLAN_STOP_AFTER = ("architecture", "project structure", "code")
+
+# Plan sections after the code that hold no files; the Backend Engineer is stopped at one
+PLAN_TRAILING_SECTIONS = ("setup", "installation", "usage", "running", "how to run")
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_BOLD_HEADING_RE = re.compile(r"^\s*\*\*([^*]+?):?\*\*:?\s*$")
+_LABEL_HEADING_RE = re.compile(r"^([A-Z][\w /-]{0,40}):\s*$")
+_BULLET_RE = re.compile(r"^\s*(?:[-*+•]|\d+[.)])\s+\S")
+_FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})\s*(.*?)\s*$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a piece of text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _key(title: str) -> str:
+    """Section title reduced to lowercase letters, so "Non-Functional Requirements:" matches "non-functional"."""
+    return re.sub(r"[^a-z]", "", title.lower())
+
+
+def _matches(title: str, sections: Sequence[str]) -> bool:
+    key = _key(title)
+    return any(key.startswith(_key(section)) for section in sections)
+
+
+def compact_requirements(spec: str) -> str:
+    """
+    The bullets of a requirements specification's Functional, Non-Functional,
+    Assumptions and Constraints subsections, under their headings.
+
+    Headings may be markdown headings of any level, bold lines or `Label:`
+    lines. Returns the specification unchanged if it has none of the
+    subsections (e.g. the model ignored the format).
+    """
+    kept: List[str] = []
+    current: Optional[str] = None
+    in_bullet = False
+    for line in spec.splitlines():
+        if _BULLET_RE.match(line):
+            in_bullet = current is not None
+            if in_bullet:
+                kept.append(line.rstrip())
+            continue
+        heading = _HEADING_RE.match(line) or _BOLD_HEADING_RE.match(line) or _LABEL_HEADING_RE.match(line)
+        if heading:
+            title = heading.group(heading.lastindex).strip().replace("**", "").rstrip(":")
+            current = title if _matches(title, REQUIREMENT_SECTIONS) else None
+            in_bullet = False
+            if current:
+                kept.append(f"### {current}")
+            continue
+        if in_bullet and line.strip() and line[:1].isspace():
+            # Continuation of a wrapped bullet
+            kept.append(line.rstrip())
+        else:
+            in_bullet = False
+    if not any(_BULLET_RE.match(line) for line in kept):
+        return spec
+    return "\n".join(kept) + "\n"
+
+
+def compact_plan(implementation: str) -> str:
+    """
+    The `## Project Structure` and `## Code` sections of an implementation plan.
+
+    Sections titled with a filename (`## app/main.py`) are code too and kept,
+    as is any other section with a code block for a file the project
+    structure lists (e.g. the tests under `## Tests`). Returns the plan
+    unchanged if it has no `## Code` section.
+    """
+    parser = parse_code_blocks(implementation)
+    if "code" not in parser.sections:
+        return implementation
+    structure = parse_project_structure(parser.section_text("Project Structure"))
+    with_files = {
+        block.section.lower() for block in parser.blocks
+        if not _matches(block.section, PLAN_TRAILING_SECTIONS) and is_file_block(block, structure)
+    }
+    parts = [
+        f"## {parser.titles[key]}\n" + "\n".join(lines).strip("\n")
+        for key, lines in parser.sections.items()
+        if key in PLAN_SECTIONS or find_filename(key) or key in with_files
+    ]
+    return "\n\n".join(parts) + "\n"
+
+
+def handoff_stats(original: str, compacted: str) -> Dict[str, int]:
+    """Estimated tokens of a handoff before and after compaction."""
+    tokens = estimate_tokens(original)
+    sent = estimate_tokens(compacted)
+    return {"tokens": tokens, "sent_tokens": sent, "saved_tokens": tokens - sent}
+
+
+class SectionCutoff:
+    """
+    Watches an agent's output as it streams and tells when to stop generating.
+
+    Once every required section has content, the first heading (outside a
+    code block, up to `max_level`) that is neither one of the kept sections
+    nor a filename ends the useful output: the rest would be dropped from the
+    handoff anyway. With `stop_at`, only a heading matching one of those
+    sections does.
+    """
+
+    def __init__(
+        self,
+        keep: Sequence[str],
+        required: Sequence[str],
+        max_level: int = 2,
+        stop_at: Optional[Sequence[str]] = None
+    ):
+        """
+        Args:
+            keep: Sections that may follow the required ones (prefix match on the title)
+            required: Sections that must have content before generation is stopped
+            max_level: Deepest heading level that starts a section; deeper
+                headings belong to the section they are in
+            stop_at: Sections generation is stopped at (prefix match on the
+                title); default: any section not kept
+        """
+        self.keep = tuple(keep) + tuple(required)
+        self.required = tuple(required)
+        self.stop_at = tuple(stop_at) if stop_at is not None else None
+        self.max_level = max_level
+        self.stopped_at: Optional[str] = None
+        self._parts: List[str] = []
+        self._pending = ""
+        self._offset = 0
+        self._fence = ""
+        self._section: Optional[str] = None
+        self._filled: Dict[str, bool] = {}
+        self._cut: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        """The output so far, without the heading generation was stopped at."""
+        text = "".join(self._parts)
+        if self._cut is None:
+            return text
+        return text[:self._cut].rstrip() + "\n"
+
+    def feed(self, text: str) -> bool:
+        """Consume a chunk of output; True once generation should stop."""
+        if self.stopped_at is not None:
+            return True
+        self._parts.append(text)
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            if self._consume_line(line):
+                return True
+            self._offset += len(line) + 1
+        return False
+
+    def _consume_line(self, line: str) -> bool:
+        fence = _FENCE_RE.match(line)
+        if self._fence:
+            if fence and not fence.group(2) and fence.group(1)[0] == self._fence[0] \
+                    and len(fence.group(1)) >= len(self._fence):
+                self._fence = ""
+            return False
+        if fence:
+            self._fence = fence.group(1)
+            self._mark_filled()
+            return False
+
+        heading = _HEADING_RE.match(line)
+        if heading and len(heading.group(1)) <= self.max_level:
+            title = heading.group(2).strip()
+            if self._stops(title) and self._complete():
+                self.stopped_at = title
+                self._cut = self._offset
+                return True
+            self._section = title
+            return False
+        if line.strip():
+            self._mark_filled()
+        return False
+
+    def _stops(self, title: str) -> bool:
+        if self.stop_at is not None:
+            return _matches(title, self.stop_at)
+        return not _matches(title, self.keep) and not find_filename(title)
+
+    def _mark_filled(self) -> None:
+        if self._section is not None:
+            for section in self.required:
+                if _matches(self._section, (section,)):
+                    self._filled[section] = True
+
+    def _complete(self) -> bool:
+        return all(self._filled.get(section) for section in self.required)
+
+
+def requirements_cutoff() -> SectionCutoff:
+    """Cutoff for the Requirements Engineer: stop after the last requirement subsection."""
+    return SectionCutoff(keep=("final requirements",), required=REQUIREMENT_SECTIONS, max_level=3)
+
+
+def plan_cutoff() -> SectionCutoff:
+    """
+    Cutoff for the Backend Engineer: stop at the setup or usage instructions
+    once the code is written.
+
+    Other sections after the code (tests, configuration files) may still
+    hold files, so they do not stop generation.
+    """
+    return SectionCutoff(keep=(), required=PLAN_STOP_AFTER, max_level=2, stop_at=PLAN_TRAILING_SECTIONS)
+
+
+def stream_until(chain: Runnable, inputs: Dict[str, Any], cutoff: SectionCutoff) -> str:
+    """
+    Stream a text chain until the cutoff says stop, then close the stream.
+
+    Closing the stream closes the connection, which makes Ollama stop
+    generating. Returns the output without the heading it was stopped at.
+    """
+    stream = chain.stream(inputs)
+    try:
+        for chunk in stream:
+            if cutoff.feed(chunk):
+                break
+    finally:
+        stream.close()
+    return cutoff.text
+
+
+async def astream_until(chain: Runnable, inputs: Dict[str, Any], cutoff: SectionCutoff) -> str:
+    """Async version of stream_until()."""
+    stream = chain.astream(inputs)
+    try:
+        async for chunk in stream:
+            if cutoff.feed(chunk):
+                break
+    finally:
+        await stream.aclose()
+    return cutoff.text
+
@@ -0,0 +1,120 @@
+"""
+Trace Callbacks
+
+Records the LLM and tool calls of a traced build as spans, through a
+LangChain configure hook like the build metrics. The tracer imports this
+module when the first sampled build starts.
+"""
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+from tracing import Span, Trace, current_span
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+import asyncio
+import threading
+import time
+
+
+_active_handler: ContextVar[Optional["TraceCallbackHandler"]] = ContextVar(
+    "software_factory_trace_handler", default=None
+)
+register_configure_hook(_active_handler, inheritable=True)
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Records LLM and tool calls as spans under the span that was open when they started."""
+
+    # Recording is cheap; run inline so the caller's span is the parent
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._runs: Dict[UUID, Span] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_chars = sum(len(str(message.content)) for batch in messages for message in batch)
+        self._start_llm(run_id, serialized, prompt_chars, kwargs)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start_llm(run_id, serialized, sum(len(prompt) for prompt in prompts), kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is not None and token and "first_token_seconds" not in run.attributes:
+            run.attributes["first_token_seconds"] = round((time.time_ns() - run.start_ns) / 1e9, 3)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        from metrics import token_usage
+        run = self._pop(run_id)
+        if run is None:
+            return
+        prompt_tokens, completion_tokens = token_usage(response)
+        run.attributes["prompt_tokens"] = prompt_tokens
+        run.attributes["completion_tokens"] = completion_tokens
+        run.attributes["cached"] = any(
+            (generation.generation_info or {}).get("from_cache")
+            for generations in response.generations for generation in generations
+        )
+        self.trace.end_span(run)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._pop(run_id)
+        if run is None:
+            return
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            # Stream closed on purpose (stopped early or a cancelled candidate)
+            run.attributes["closed_early"] = True
+            self.trace.end_span(run)
+        else:
+            self.trace.end_span(run, error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, name, "tool", {"input_chars": len(input_str or "")})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._pop(run_id)
+        if run is not None:
+            self.trace.end_span(run)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._pop(run_id)
+        if run is not None:
+            self.trace.end_span(run, error)
+
+    def _start_llm(self, run_id: UUID, serialized: Dict[str, Any], prompt_chars: int, kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        model = params.get("model") or params.get("model_name") or metadata.get("ls_model_name") \
+            or ((serialized or {}).get("kwargs") or {}).get("model")
+        attributes: Dict[str, Any] = {"prompt_chars": prompt_chars}
+        if model:
+            attributes["model"] = str(model)
+        self._start(run_id, "llm", "llm", attributes)
+
+    def _start(self, run_id: UUID, name: str, category: str, attributes: Dict[str, Any]) -> None:
+        current = current_span()
+        parent = current[1] if current and current[0] is self.trace else self.trace.root
+        run = self.trace.start_span(name, category, parent.span_id, attributes)
+        with self._lock:
+            self._runs[run_id] = run
+
+    def _pop(self, run_id: UUID) -> Optional[Span]:
+        with self._lock:
+            return self._runs.pop(run_id, None)
+
+
+@contextmanager
+def record_calls(trace: Trace) -> Iterator[None]:
+    """Record the LLM and tool calls made in this context into a trace."""
+    token = _active_handler.set(TraceCallbackHandler(trace))
+    try:
+        yield
+    finally:
+        _active_handler.reset(token)
@@ -0,0 +1,333 @@
+"""
+Build Tracing
+
+Span-based timeline of builds: the build, its phases, every LLM and tool call
+(see trace_callbacks.py) and file I/O
+(code commits, single-file writes, checkpoints). Each finished build is
+exported as a trace, either to a Chrome trace file (JSON; opens in Perfetto
+and chrome://tracing) or to an OTLP/JSON file (one ExportTraceServiceRequest
+per line, as written by the OpenTelemetry Collector's file exporter). A
+Chrome trace file holds the most recent `chrome_max_builds` builds. Traces
+are written by a background thread, so a build never waits on the file.
+
+Whether a build is traced is decided when it starts (`sample_rate`). Builds
+that are not sampled record nothing: outside a sampled build, span() is a
+ContextVar lookup and no callback handler is attached. This module does not
+import LangChain, so modules that only record spans stay cheap to import.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import json
+import os
+import random
+import threading
+import time
+
+
+# Export formats; a path ending in .jsonl defaults to OTLP
+FORMATS = ("chrome", "otlp")
+
+# Chrome trace thread IDs reserved per build, one per lane of overlapping spans
+LANES_PER_TRACE = 1000
+
+# Builds kept in a Chrome trace file; older ones are dropped as new ones finish
+DEFAULT_CHROME_MAX_BUILDS = 20
+
+# OTLP span kinds
+_KIND_INTERNAL = 1
+_KIND_CLIENT = 3
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace."""
+
+    name: str
+    category: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class Trace:
+    """The spans of one build."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, "build", None, attributes)
+
+    def start_span(self, name: str, category: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> Span:
+        span = Span(name, category, os.urandom(8).hex(), parent_id, time.time_ns(), attributes=dict(attributes))
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.end_ns = time.time_ns()
+        if error is not None and span.error is None:
+            span.error = f"{type(error).__name__}: {error}"[:500]
+
+
+# (trace, innermost open span) of the current build, if it is sampled
+_current: ContextVar[Optional[Tuple[Trace, Span]]] = ContextVar("software_factory_trace", default=None)
+
+
+def current_span() -> Optional[Tuple[Trace, Span]]:
+    """(trace, innermost open span) in this context, or None outside a sampled build."""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, category: str = "step", **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Record the enclosed block as a span of the current build's trace.
+
+    Yields the span (to add attributes once they are known), or None when the
+    build is not traced.
+    """
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+    trace, parent = current
+    child = trace.start_span(name, category, parent.span_id, attributes)
+    token = _current.set((trace, child))
+    error = None
+    try:
+        yield child
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        trace.end_span(child, error)
+
+
+class Tracer:
+    """Samples builds, records their spans, and exports each finished trace to a file."""
+
+    def __init__(
+        self,
+        path: str,
+        format: Optional[str] = None,
+        sample_rate: float = 1.0,
+        service_name: str = "software-factory",
+        chrome_max_builds: int = DEFAULT_CHROME_MAX_BUILDS
+    ):
+        """
+        Args:
+            path: Trace file; rewritten after every build (Chrome) or appended to (OTLP)
+            format: "chrome" or "otlp" (default: otlp for a .jsonl path, chrome otherwise)
+            sample_rate: Fraction of builds traced, between 0 and 1
+            service_name: `service.name` resource attribute of OTLP traces
+            chrome_max_builds: Most recent builds kept in a Chrome trace file
+        """
+        format = format or ("otlp" if path.endswith(".jsonl") else "chrome")
+        if format not in FORMATS:
+            raise ValueError(f"Unknown trace format {format!r} (expected one of {', '.join(FORMATS)})")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.path = path
+        self.format = format
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self.sampled = 0
+        self.dropped = 0
+        self.spans = 0
+        # Chrome events of the most recent builds, one list per build (writer thread only)
+        self._builds: Deque[List[Dict[str, Any]]] = deque(maxlen=max(1, chrome_max_builds))
+        self._lock = threading.Lock()
+        # One writer thread keeps the writes in order and off the builds' threads and event loop
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-export")
+        self._pending: Optional[Future] = None
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Optional[Trace]]:
+        """
+        Trace the enclosed build, if it is sampled.
+
+        Inside an already traced build this is an ordinary span.
+        """
+        if _current.get() is not None:
+            with span(name, "build", **attributes):
+                yield _current.get()[0]
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            with self._lock:
+                self.dropped += 1
+            yield None
+            return
+
+        # LangChain is only imported once a build is actually traced
+        from trace_callbacks import record_calls
+        trace = Trace(name, attributes)
+        token = _current.set((trace, trace.root))
+        error = None
+        try:
+            with record_calls(trace):
+                yield trace
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current.reset(token)
+            trace.end_span(trace.root, error)
+            self._export(trace)
+
+    def flush(self) -> None:
+        """Wait until every finished trace is written."""
+        with self._lock:
+            pending = self._pending
+        if pending is not None:
+            pending.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Builds traced and skipped by sampling, and spans recorded (once their traces are written)."""
+        self.flush()
+        with self._lock:
+            return {
+                "path": self.path,
+                "format": self.format,
+                "sample_rate": self.sample_rate,
+                "sampled": self.sampled,
+                "dropped": self.dropped,
+                "spans": self.spans
+            }
+
+    def _export(self, trace: Trace) -> None:
+        # Spans still open (e.g. a call abandoned by a cancelled task) end with the build
+        for open_span in trace.spans:
+            if open_span.end_ns is None:
+                open_span.end_ns = trace.root.end_ns
+        with self._lock:
+            self.sampled += 1
+            self.spans += len(trace.spans)
+            # Submitted under the lock so traces are written in the order they are counted
+            self._pending = self._writer.submit(self._write, trace, self.sampled * LANES_PER_TRACE)
+
+    def _write(self, trace: Trace, track_base: int) -> None:
+        """Write a finished trace (on the writer thread, which owns the Chrome build buffer)."""
+        try:
+            if self.format == "otlp":
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self._otlp_request(trace)) + "\n")
+                return
+            self._builds.append(_chrome_events(trace, track_base=track_base))
+            events = [event for build in self._builds for event in build]
+            from write_buffer import write_atomic
+            write_atomic(self.path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️  Could not write trace to {self.path}: {e}")
+
+    def _otlp_request(self, trace: Trace) -> Dict[str, Any]:
+        """An ExportTraceServiceRequest in OTLP/JSON encoding."""
+        spans = []
+        for item in trace.spans:
+            otlp_span: Dict[str, Any] = {
+                "traceId": trace.trace_id,
+                "spanId": item.span_id,
+                "name": item.name,
+                "kind": _KIND_CLIENT if item.category == "llm" else _KIND_INTERNAL,
+                "startTimeUnixNano": str(item.start_ns),
+                "endTimeUnixNano": str(item.end_ns),
+                "attributes": _otlp_attributes({"category": item.category, **item.attributes})
+            }
+            if item.parent_id:
+                otlp_span["parentSpanId"] = item.parent_id
+            if item.error:
+                otlp_span["status"] = {"code": 2, "message": item.error}
+            spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({
+                    "service.name": self.service_name, "process.pid": os.getpid()
+                })},
+                "scopeSpans": [{"scope": {"name": "software_factory"}, "spans": spans}]
+            }]
+        }
+
+
+def _attribute_value(value: Any) -> Any:
+    """A span attribute as a JSON value: booleans and numbers as they are, anything else as a string."""
+    return value if isinstance(value, (bool, int, float)) else str(value)
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    values = []
+    for key, value in attributes.items():
+        value = _attribute_value(value)
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": value}
+        values.append({"key": key, "value": typed})
+    return values
+
+
+def _chrome_events(trace: Trace, track_base: int) -> List[Dict[str, Any]]:
+    """
+    Complete ("X") events for a trace's spans, plus track names.
+
+    Spans on one Chrome track must nest, but calls within a build overlap
+    (files generated concurrently, speculative candidates), so each span goes
+    to its parent's lane if it nests there and to the first lane it fits
+    otherwise.
+    """
+    pid = os.getpid()
+    lanes: List[List[int]] = []
+    lane_of: Dict[str, int] = {}
+    events: List[Dict[str, Any]] = []
+
+    def fits(lane: int, item: Span) -> bool:
+        stack = lanes[lane]
+        while stack and stack[-1] <= item.start_ns:
+            stack.pop()
+        return not stack or item.end_ns <= stack[-1]
+
+    for item in sorted(trace.spans, key=lambda s: (s.start_ns, -s.end_ns)):
+        preferred = lane_of.get(item.parent_id) if item.parent_id else None
+        candidates = ([preferred] if preferred is not None else []) + list(range(len(lanes)))
+        lane = next((candidate for candidate in candidates if fits(candidate, item)), None)
+        if lane is None:
+            lanes.append([])
+            lane = len(lanes) - 1
+        lanes[lane].append(item.end_ns)
+        lane_of[item.span_id] = lane
+        args = {str(key): _attribute_value(value) for key, value in item.attributes.items()}
+        if item.error:
+            args["error"] = item.error
+        events.append({
+            "name": item.name,
+            "cat": item.category,
+            "ph": "X",
+            "ts": item.start_ns / 1000,
+            "dur": (item.end_ns - item.start_ns) / 1000,
+            "pid": pid,
+            "tid": track_base + lane,
+            "args": args
+        })
+
+    label = trace.root.attributes.get("project_id") or trace.root.name
+    for lane in range(len(lanes)):
+        events.append({
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": track_base + lane,
+            "args": {"name": label if lane == 0 else f"{label} ({lane + 1})"}
+        })
+    return events
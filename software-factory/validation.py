@@ -0,0 +1,451 @@
+"""
+Code Validation
+
+Checks the files the Implementator wrote, in parallel across a process pool,
+so broken output is caught seconds after a build instead of by a human:
+
+- Python files are compiled (syntax errors, `return` outside a function, ...)
+- their imports must resolve to the standard library, another generated
+  module, or a distribution listed in a generated `requirements.txt`
+- optionally, generated test files are run in a subprocess with CPU,
+  memory, file-size and wall-clock limits, against a temporary copy of the
+  code directory. This is not a sandbox: the tests can read and write
+  anything the user running the factory can.
+
+Results are reported per file.
+"""
+
+from source_tree import SKIP_DIRS, walk_files
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import ast
+import asyncio
+import importlib.util
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: only the wall-clock limit applies
+    resource = None
+
+
+# Distributions whose import name differs from the normalized distribution name
+DIST_IMPORT_NAMES = {
+    "beautifulsoup4": ("bs4",),
+    "pillow": ("PIL",),
+    "pyyaml": ("yaml",),
+    "python_dotenv": ("dotenv",),
+    "scikit_learn": ("sklearn",),
+    "opencv_python": ("cv2",),
+    "opencv_python_headless": ("cv2",),
+    "python_dateutil": ("dateutil",),
+    "pyjwt": ("jwt",),
+    "psycopg2_binary": ("psycopg2",),
+    "protobuf": ("google",),
+    "attrs": ("attr", "attrs"),
+}
+
+_REQUIREMENT_NAME_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_TEST_FILE_RE = re.compile(r"^(test_.*|.*_test)\.py$")
+
+# Limits for test runs
+DEFAULT_TEST_TIMEOUT = 30.0
+DEFAULT_CPU_SECONDS = 20
+DEFAULT_MEMORY_BYTES = 1024 * 1024 * 1024
+DEFAULT_FILE_BYTES = 16 * 1024 * 1024
+
+
+def _stdlib_modules() -> FrozenSet[str]:
+    names = getattr(sys, "stdlib_module_names", None)
+    if names is not None:
+        return frozenset(names) | frozenset(sys.builtin_module_names)
+    # Python < 3.10: every top-level module found under the stdlib directory
+    stdlib = sysconfig.get_paths()["stdlib"]
+    found = set(sys.builtin_module_names)
+    for root in (stdlib, os.path.join(stdlib, "lib-dynload")):
+        if os.path.isdir(root):
+            for entry in os.listdir(root):
+                if entry != "site-packages":
+                    found.add(entry.split(".", 1)[0])
+    return frozenset(found)
+
+
+STDLIB_MODULES = _stdlib_modules()
+
+
+def normalize_distribution(name: str) -> str:
+    """PEP 503-style normalization with underscores, e.g. `Flask-SQLAlchemy` -> `flask_sqlalchemy`."""
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+def parse_requirements(text: str) -> List[str]:
+    """
+    Distribution names in a requirements file.
+
+    Options (`-r`, `-e`, `--index-url`) and comments are ignored; each line
+    names one requirement, as pip expects.
+    """
+    names = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line or line.startswith("-"):
+            continue
+        match = _REQUIREMENT_NAME_RE.match(line)
+        if match:
+            names.append(match.group(1))
+    return names
+
+
+def requirement_import_names(distributions: Iterable[str]) -> Set[str]:
+    """Top-level import names provided by a set of distributions (normalized, lower-case)."""
+    names: Set[str] = set()
+    for distribution in distributions:
+        normalized = normalize_distribution(distribution)
+        names.add(normalized)
+        names.update(name.lower() for name in DIST_IMPORT_NAMES.get(normalized, ()))
+    return names
+
+
+def _is_optional_import(node: ast.AST, parents: Dict[ast.AST, ast.AST]) -> bool:
+    """True for imports inside a `try` whose handlers catch ImportError."""
+    child = node
+    parent = parents.get(node)
+    while parent is not None:
+        if isinstance(parent, ast.Try) and child in parent.body:
+            for handler in parent.handlers:
+                caught = handler.type
+                names = caught.elts if isinstance(caught, ast.Tuple) else [caught]
+                if caught is None or any(
+                    isinstance(name, ast.Name) and name.id in ("ImportError", "ModuleNotFoundError", "Exception")
+                    for name in names
+                ):
+                    return True
+        child, parent = parent, parents.get(parent)
+    return False
+
+
+def _module_exists(directory: str, dotted: str) -> bool:
+    """Whether `dotted` is a module or package under `directory`."""
+    path = os.path.join(directory, *dotted.split("."))
+    return os.path.isfile(path + ".py") or os.path.isdir(path)
+
+
+def check_imports(
+    tree: ast.AST,
+    code_dir: str,
+    path: str,
+    requirements: FrozenSet[str]
+) -> Tuple[List[str], List[str]]:
+    """
+    Resolve the imports of a parsed module.
+
+    Absolute imports resolve against the standard library, modules next to
+    the file or anywhere up to the code directory (the file may be run as a
+    script or imported as part of a package), and the distributions in the
+    generated requirements. Relative imports must point at a generated module.
+
+    Returns:
+        Tuple of (errors, warnings); unresolved imports guarded by
+        `except ImportError` are only warnings
+    """
+    parents = {child: node for node in ast.walk(tree) for child in ast.iter_child_nodes(node)}
+    file_dir = os.path.dirname(os.path.join(code_dir, path))
+    search_dirs = []
+    directory = file_dir
+    while True:
+        search_dirs.append(directory)
+        if os.path.normpath(directory) == os.path.normpath(code_dir):
+            break
+        directory = os.path.dirname(directory)
+
+    errors: List[str] = []
+    warnings: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules = [node.module]
+        elif isinstance(node, ast.ImportFrom):
+            package_dir = file_dir
+            for _ in range(node.level - 1):
+                package_dir = os.path.dirname(package_dir)
+            if node.module and not _module_exists(package_dir, node.module):
+                errors.append(f"line {node.lineno}: relative import {'.' * node.level}{node.module} "
+                              f"does not match a generated module")
+            continue
+        else:
+            continue
+
+        for module in modules:
+            top = module.split(".", 1)[0]
+            if top in STDLIB_MODULES or top == "__future__":
+                continue
+            if any(_module_exists(directory, top) for directory in search_dirs):
+                continue
+            if top.lower() in requirements or normalize_distribution(top) in requirements:
+                continue
+            message = f"line {node.lineno}: import {module} is neither a standard library module, " \
+                      f"a generated module nor listed in requirements.txt"
+            (warnings if _is_optional_import(node, parents) else errors).append(message)
+    return errors, warnings
+
+
+def _limit_resources(cpu_seconds: int, memory_bytes: int, file_bytes: int) -> None:
+    """Runs in the test subprocess before exec: cap CPU, memory and file sizes."""
+    # SIGXCPU at the soft limit, SIGKILL a second later if it is ignored
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_bytes, file_bytes))
+
+
+def run_limited(
+    args: List[str],
+    cwd: str,
+    python_path: List[str],
+    timeout: float = DEFAULT_TEST_TIMEOUT,
+    cpu_seconds: int = DEFAULT_CPU_SECONDS,
+    memory_bytes: int = DEFAULT_MEMORY_BYTES,
+    file_bytes: int = DEFAULT_FILE_BYTES
+) -> Dict[str, Any]:
+    """
+    Run a Python command in a subprocess with resource limits.
+
+    The child gets a minimal environment (no inherited credentials), a
+    throwaway HOME, its own process group (killed as a whole on timeout) and,
+    where the `resource` module exists, CPU, address-space and file-size limits.
+    It is not isolated from the filesystem.
+
+    Returns:
+        Dictionary with `returncode` (None on timeout), `timed_out`, `seconds`
+        and the tail of the combined output
+    """
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="sf-home-") as home:
+        env = {
+            "PATH": os.environ.get("PATH", ""),
+            "HOME": home,
+            "TMPDIR": home,
+            "PYTHONPATH": os.pathsep.join(python_path),
+            "PYTHONDONTWRITEBYTECODE": "1",
+            "PYTHONHASHSEED": "0"
+        }
+        preexec = None if resource is None else partial(_limit_resources, cpu_seconds, memory_bytes, file_bytes)
+        process = subprocess.Popen(
+            [sys.executable] + args,
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            preexec_fn=preexec,
+            start_new_session=True
+        )
+        timed_out = False
+        try:
+            output, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except (AttributeError, OSError):
+                process.kill()
+            output, _ = process.communicate()
+
+    text = output.decode("utf-8", errors="replace")
+    return {
+        "returncode": None if timed_out else process.returncode,
+        "timed_out": timed_out,
+        "seconds": round(time.perf_counter() - started, 3),
+        "output": text[-2000:]
+    }
+
+
+def _run_test_file(code_dir: str, path: str, limits: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Run one generated test file against a copy of the code directory; returns
+    (run details, error or None).
+
+    The copy keeps tests from changing the generated files (or leaving caches
+    in them); it does not keep them from the rest of the filesystem.
+    """
+    if importlib.util.find_spec("pytest") is not None:
+        args = ["-m", "pytest", "-q", "-p", "no:cacheprovider", path]
+    else:
+        args = [path]
+    with tempfile.TemporaryDirectory(prefix="sf-tests-") as scratch:
+        copy_dir = os.path.join(scratch, "code")
+        shutil.copytree(code_dir, copy_dir, symlinks=True, ignore=shutil.ignore_patterns(*SKIP_DIRS))
+        python_path = [copy_dir, os.path.dirname(os.path.join(copy_dir, path))]
+        run = run_limited(args, copy_dir, python_path, **limits)
+    if run["timed_out"]:
+        return run, f"tests timed out after {limits.get('timeout', DEFAULT_TEST_TIMEOUT)}s"
+    if hasattr(signal, "SIGXCPU") and run["returncode"] == -signal.SIGXCPU:
+        return run, "tests exceeded the CPU time limit"
+    # pytest exits with 5 when the file collects no tests
+    if run["returncode"] not in (0, 5):
+        return run, f"tests failed (exit code {run['returncode']})"
+    return run, None
+
+
+def validate_file(
+    code_dir: str,
+    path: str,
+    requirements: FrozenSet[str],
+    run_tests: bool = False,
+    limits: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Validate one generated file; runs in a worker process.
+
+    Args:
+        code_dir: The project's code directory
+        path: File path relative to `code_dir`
+        requirements: Import names provided by the generated requirements
+        run_tests: Run the file with resource limits if it is a test file
+        limits: Keyword arguments for run_limited() (timeout, cpu_seconds, ...)
+
+    Returns:
+        Dictionary with `path`, `status` (passed/failed/skipped), `checks`,
+        `errors`, `warnings` and `seconds`
+    """
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"path": path, "status": "passed", "checks": [], "errors": [], "warnings": []}
+
+    def finish() -> Dict[str, Any]:
+        if report["errors"]:
+            report["status"] = "failed"
+        elif not report["checks"]:
+            report["status"] = "skipped"
+        report["seconds"] = round(time.perf_counter() - started, 4)
+        return report
+
+    if not path.endswith(".py"):
+        return finish()
+
+    try:
+        with open(os.path.join(code_dir, path), "r", encoding="utf-8") as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        report["checks"].append("compile")
+        report["errors"].append(f"cannot read file: {e}")
+        return finish()
+
+    # Same checks as py_compile, without writing bytecode into the output
+    report["checks"].append("compile")
+    try:
+        tree = ast.parse(source, filename=path)
+        compile(tree, path, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        line = f"line {e.lineno}: " if getattr(e, "lineno", None) else ""
+        report["errors"].append(f"{line}{getattr(e, 'msg', None) or e}")
+        return finish()
+
+    report["checks"].append("imports")
+    errors, warnings = check_imports(tree, code_dir, path, requirements)
+    report["errors"].extend(errors)
+    report["warnings"].extend(warnings)
+
+    if run_tests and _TEST_FILE_RE.match(os.path.basename(path)) and not errors:
+        report["checks"].append("tests")
+        run, error = _run_test_file(code_dir, path, limits or {})
+        report["tests"] = run
+        if error:
+            report["errors"].append(error)
+    return finish()
+
+
+def _start(
+    code_dir: str,
+    executor: Executor,
+    run_tests: bool,
+    limits: Optional[Dict[str, Any]]
+) -> List[Future]:
+    """Submit one validation job per generated file."""
+    files = walk_files(code_dir)
+    distributions: List[str] = []
+    for path in files:
+        if os.path.basename(path) == "requirements.txt":
+            with open(os.path.join(code_dir, path), "r", encoding="utf-8", errors="replace") as f:
+                distributions.extend(parse_requirements(f.read()))
+    requirements = frozenset(requirement_import_names(distributions))
+    return [
+        executor.submit(validate_file, code_dir, path, requirements, run_tests, limits)
+        for path in files
+    ]
+
+
+def _summarize(code_dir: str, reports: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+    summary = {"files": len(reports), "passed": 0, "failed": 0, "skipped": 0}
+    for report in reports:
+        summary[report["status"]] += 1
+    return {
+        "code_dir": code_dir,
+        "files": reports,
+        "summary": summary,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def validate_project(
+    code_dir: str,
+    executor: Optional[Executor] = None,
+    run_tests: bool = False,
+    max_workers: Optional[int] = None,
+    limits: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Validate every file in a generated code directory in parallel.
+
+    Args:
+        code_dir: Directory the Implementator wrote into
+        executor: Pool to run the checks in (default: a ProcessPoolExecutor
+            created for this call)
+        run_tests: Also run generated test files with resource limits
+        max_workers: Worker processes when no executor is given
+        limits: Sandbox limits for test runs (timeout, cpu_seconds, memory_bytes, file_bytes)
+
+    Returns:
+        Dictionary with `files` (one report per file, see validate_file()),
+        `summary` (passed/failed/skipped counts) and `seconds`
+    """
+    started = time.perf_counter()
+    if not os.path.isdir(code_dir):
+        return _summarize(code_dir, [], started)
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return validate_project(code_dir, pool, run_tests, limits=limits)
+
+    futures = _start(code_dir, executor, run_tests, limits)
+    return _summarize(code_dir, [future.result() for future in futures], started)
+
+
+async def avalidate_project(
+    code_dir: str,
+    executor: Executor,
+    run_tests: bool = False,
+    limits: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Async version of validate_project() for concurrent builds sharing one pool."""
+    started = time.perf_counter()
+    if not os.path.isdir(code_dir):
+        return _summarize(code_dir, [], started)
+    futures = _start(code_dir, executor, run_tests, limits)
+    reports = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+    return _summarize(code_dir, list(reports), started)
+
+
+def failed_files(validation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Reports of the Python files that failed validation: the files the repair loop rewrites."""
+    return [
+        report for report in validation["files"]
+        if report["status"] == "failed" and report["path"].endswith(".py")
+    ]
@@ -0,0 +1,389 @@
+"""
+Work Queue
+
+Durable queue of ideas to build, shared by any number of worker processes
+(`python main.py --worker`), so builds scale past one process's GIL and memory.
+
+Workers lease a job for a limited time and renew the lease with heartbeats
+while they build it. A job whose worker crashed is handed to another worker
+once its lease expires. A failed build is retried with exponential backoff,
+and moved to the dead-letter state after its last attempt.
+
+The default backend is a SQLite database, which serves every worker on one
+host (WAL mode, one short write transaction per state change). Other
+backends register a URL scheme with `register_backend()`; `open_queue()`
+picks the backend from the queue URL.
+"""
+
+from abc import ABC, abstractmethod
+from priorities import DEFAULT_TENANT
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+if TYPE_CHECKING:
+    from orchestrator import SoftwareFactoryOrchestrator
+
+
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Retry delay after the first failed attempt; doubled after every further one
+RETRY_BASE_SECONDS = 30.0
+RETRY_MAX_SECONDS = 30 * 60.0
+
+STATUSES = ("queued", "leased", "succeeded", "dead")
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before a job that failed `attempts` times is retried (exponential, with jitter)."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobQueue(ABC):
+    """
+    Interface of a work queue backend.
+
+    Jobs are dictionaries with at least `id`, `idea`, `status`, `attempts`,
+    `max_attempts` and `error`. Every method taking a `worker_id` only acts
+    while that worker still holds the job's lease, and returns False if it
+    does not.
+    """
+
+    @abstractmethod
+    def enqueue(self, ideas: Iterable[str], max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> List[int]:
+        """Add ideas to the queue; returns their job IDs."""
+
+    @abstractmethod
+    def lease(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Take the oldest available job (queued, or leased to a worker that stopped heartbeating)."""
+
+    @abstractmethod
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend a lease."""
+
+    @abstractmethod
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Mark a leased job as succeeded."""
+
+    @abstractmethod
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Schedule a retry with backoff, or dead-letter the job after its last attempt."""
+
+    @abstractmethod
+    def release(self, job_id: int, worker_id: str) -> bool:
+        """Give a job back without counting the attempt (e.g. on shutdown)."""
+
+    @abstractmethod
+    def retry_dead(self) -> int:
+        """Queue every dead-lettered job again with a fresh set of attempts and no error; returns how many."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+
+    @abstractmethod
+    def dead_letters(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recently dead-lettered jobs, with their last error."""
+
+    def close(self) -> None:
+        """Release the backend's connections (a no-op unless overridden)."""
+
+
+class SQLiteJobQueue(JobQueue):
+    """Work queue in a SQLite database, for workers on the same host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idea TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                worker_id TEXT,
+                lease_expires REAL,
+                error TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_available ON jobs (status, available_at)")
+
+    def _write(self, query: str, params: Iterable[Any]) -> bool:
+        with self._lock:
+            return self._conn.execute(query, tuple(params)).rowcount > 0
+
+    def enqueue(self, ideas: Iterable[str], max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> List[int]:
+        now = time.time()
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for idea in ideas:
+                    cursor = self._conn.execute(
+                        "INSERT INTO jobs (idea, status, max_attempts, available_at, created_at, updated_at) "
+                        "VALUES (?, 'queued', ?, ?, ?, ?)",
+                        (idea, max(1, max_attempts), now, now, now)
+                    )
+                    ids.append(cursor.lastrowid)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def lease(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers never lease the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases whose job has no attempts left are dead-lettered rather than retried
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'dead', worker_id = NULL, lease_expires = NULL, updated_at = ?, "
+                    "error = COALESCE(error, 'lease expired') "
+                    "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                    (now, now)
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'leased' AND lease_expires < ?) ORDER BY available_at, id LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'leased', worker_id = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + lease_seconds, now, row["id"])
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = dict(row)
+        job.update(status="leased", worker_id=worker_id, lease_expires=now + lease_seconds, attempts=row["attempts"] + 1)
+        return job
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        now = time.time()
+        return self._write(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (now + lease_seconds, now, job_id, worker_id)
+        )
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        return self._write(
+            "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (json.dumps(result), time.time(), job_id, worker_id)
+        )
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker_id = ? AND status = 'leased'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            if row["attempts"] >= row["max_attempts"]:
+                status, available_at = "dead", now
+            else:
+                status, available_at = "queued", now + retry_delay(row["attempts"])
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, error = ?, worker_id = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ? AND worker_id = ? AND status = 'leased'",
+                (status, available_at, error, now, job_id, worker_id)
+            ).rowcount > 0
+
+    def release(self, job_id: int, worker_id: str) -> bool:
+        now = time.time()
+        return self._write(
+            "UPDATE jobs SET status = 'queued', attempts = MAX(0, attempts - 1), available_at = ?, "
+            "worker_id = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (now, now, job_id, worker_id)
+        )
+
+    def retry_dead(self) -> int:
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, available_at = ?, updated_at = ? "
+                "WHERE status = 'dead'",
+                (now, now)
+            ).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in STATUSES}
+        with self._lock:
+            for row in self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+                counts[row["status"]] = row["n"]
+        return counts
+
+    def dead_letters(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                "SELECT * FROM jobs WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?", (limit,)
+            )]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# URL scheme -> factory taking the rest of the URL
+_BACKENDS: Dict[str, Callable[[str], JobQueue]] = {"sqlite": SQLiteJobQueue}
+
+
+def register_backend(scheme: str, factory: Callable[[str], JobQueue]) -> None:
+    """Make `scheme://...` queue URLs open with `factory` (called with the part after `://`)."""
+    _BACKENDS[scheme] = factory
+
+
+def open_queue(url: str) -> JobQueue:
+    """
+    Open a queue by URL: a plain file path or `sqlite:///queue.sqlite3`
+    (`sqlite:////abs/path` for an absolute path, as in SQLAlchemy URLs), or
+    `<scheme>://...` for a registered backend.
+    """
+    scheme, separator, location = url.partition("://")
+    if not separator:
+        return SQLiteJobQueue(url)
+    if scheme not in _BACKENDS:
+        raise ValueError(f"unknown queue backend {scheme!r} (known: {', '.join(sorted(_BACKENDS))})")
+    if scheme == "sqlite" and location.startswith("/"):
+        location = location[1:]
+    return _BACKENDS[scheme](location)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class QueueWorker:
+    """Pulls jobs from a queue and builds them one at a time, heartbeating while it works."""
+
+    def __init__(
+        self,
+        orchestrator: "SoftwareFactoryOrchestrator",
+        queue: JobQueue,
+        base_output_dir: str = "output",
+        worker_id: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_seconds: float = 2.0,
+        tenant: str = DEFAULT_TENANT
+    ):
+        """
+        Args:
+            orchestrator: Orchestrator used for every build
+            queue: Queue to take jobs from
+            base_output_dir: Directory the projects are written to
+            worker_id: Name of this worker in leases (default: host:pid)
+            lease_seconds: How long a lease lasts without a heartbeat; heartbeats
+                are sent every third of it
+            poll_seconds: Wait between polls when the queue is empty
+            tenant: Tenant the builds' LLM calls are fairly queued under (always
+                in the batch priority class)
+        """
+        self.orchestrator = orchestrator
+        self.queue = queue
+        self.base_output_dir = base_output_dir
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.tenant = tenant
+        self.counts = {"succeeded": 0, "failed": 0, "lost": 0}
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_empty: bool = False) -> Dict[str, int]:
+        """
+        Build jobs until stopped, `max_jobs` have run, or (with `exit_when_empty`) the queue is empty.
+
+        Returns:
+            Number of jobs that succeeded, failed, and whose lease was lost mid-build
+        """
+        done = 0
+        while max_jobs is None or done < max_jobs:
+            job = self.queue.lease(self.worker_id, self.lease_seconds)
+            if job is None:
+                if exit_when_empty:
+                    break
+                time.sleep(self.poll_seconds)
+                continue
+            self.run_job(job)
+            done += 1
+        return dict(self.counts)
+
+    def run_job(self, job: Dict[str, Any]) -> None:
+        """Build one leased job and report the outcome to the queue."""
+        print(f"\n📥 [{self.worker_id}] Job {job['id']} (attempt {job['attempts']}/{job['max_attempts']}): {job['idea']}")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job["id"], stop), daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            result = self.orchestrator.build(job["idea"], self.base_output_dir, priority="batch", tenant=self.tenant)
+            project_dir = self.orchestrator.save_output(result, self.base_output_dir)
+        except KeyboardInterrupt:
+            stop.set()
+            self.queue.release(job["id"], self.worker_id)
+            raise
+        except Exception as e:
+            stop.set()
+            seconds = round(time.perf_counter() - started, 3)
+            try:
+                self.orchestrator.record_failure(job["idea"], self.base_output_dir, str(e), seconds=seconds)
+            except Exception as record_error:
+                # The queue still has to hear about the failure, or the job stays leased
+                print(f"⚠️  [{self.worker_id}] Could not index the failed build of job {job['id']}: {record_error}")
+            if self.queue.fail(job["id"], self.worker_id, str(e)):
+                self.counts["failed"] += 1
+                print(f"❌ [{self.worker_id}] Job {job['id']} failed: {e}")
+            else:
+                self.counts["lost"] += 1
+            return
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        record = {
+            "project_dir": project_dir,
+            "project_id": result["project_id"],
+            "seconds": round(time.perf_counter() - started, 3),
+            "metrics": result["metrics"]["totals"]
+        }
+        if result.get("validation"):
+            record["validation"] = result["validation"]["summary"]
+        if self.queue.complete(job["id"], self.worker_id, record):
+            self.counts["succeeded"] += 1
+            print(f"✅ [{self.worker_id}] Job {job['id']} done: {project_dir}")
+        else:
+            # The lease expired and another worker took the job over; its build wins
+            self.counts["lost"] += 1
+            print(f"⚠️  [{self.worker_id}] Job {job['id']} finished after its lease was lost")
+
+    def _heartbeat(self, job_id: int, stop: threading.Event) -> None:
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                return
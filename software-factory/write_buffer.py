@@ -0,0 +1,257 @@
+"""
+Write Buffer
+
+Stages the files of a build in memory and commits the `code/` tree in one
+step, so a crashed run never leaves half-written files behind and a file the
+model rewrites several times only reaches the disk once.
+
+Content is kept by hash: files whose content matches what is already on
+disk are not rewritten on re-runs, and a commit that changes nothing touches
+nothing. The new tree is assembled next to `code/` (unchanged files are
+hard-linked, not copied) and swapped in with two renames; a crash between
+them is rolled back when the next buffer for that directory is opened.
+Trees the build does not own (virtualenvs, caches; see `source_tree.SKIP_DIRS`)
+are not relinked file by file but moved into the new tree after the swap.
+"""
+
+from code_blocks import is_safe_path
+from source_tree import SKIP_DIRS
+from tracing import span
+from typing import Any, Dict, List, Optional
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+
+def safe_join(code_dir: str, filename: str) -> str:
+    """
+    Resolve a generated file's path inside the code directory.
+
+    Raises:
+        ValueError: If the path is absolute, climbs out with `..`, or
+            resolves (through symlinks) outside the code directory
+    """
+    if not is_safe_path(filename):
+        raise ValueError(f"refusing to write {filename!r} outside the output directory")
+    root = os.path.realpath(code_dir)
+    path = os.path.realpath(os.path.join(root, filename))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f"refusing to write {filename!r} outside the output directory")
+    return os.path.join(code_dir, os.path.normpath(filename))
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_digest(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return _digest(f.read())
+    except OSError:
+        return None
+
+
+def write_atomic(path: str, content: str) -> bool:
+    """
+    Atomically replace a single file (temp file + rename) unless it already has this content.
+
+    Returns:
+        True if the file was written, False if it was unchanged
+    """
+    data = content.encode("utf-8")
+    if _file_digest(path) == _digest(data):
+        return False
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with span("write_file", "io", path=path, bytes=len(data)):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return True
+
+
+class WriteBuffer:
+    """In-memory staging area for one project's `code/` directory."""
+
+    def __init__(self, code_dir: str):
+        self.code_dir = os.path.normpath(code_dir)
+        self._blobs: Dict[str, bytes] = {}
+        self._files: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.stats = {"staged": 0, "rewrites": 0, "written": 0, "unchanged": 0, "bytes_written": 0}
+        self.recover(self.code_dir)
+
+    @staticmethod
+    def _sibling_pattern(code_dir: str, kind: str) -> str:
+        parent, name = os.path.split(os.path.normpath(code_dir))
+        return os.path.join(parent, f".{name}.{kind}-*")
+
+    @classmethod
+    def recover(cls, code_dir: str) -> None:
+        """Finish or roll back a commit interrupted between its two renames, and drop stale staging trees."""
+        backups = sorted(glob.glob(cls._sibling_pattern(code_dir, "old")), key=os.path.getmtime)
+        if backups and not os.path.exists(code_dir):
+            os.rename(backups.pop(), code_dir)
+        elif backups:
+            # Swapped, but the kept trees were not all moved over yet
+            cls._move_kept(backups[-1], code_dir, skip=set())
+        for leftover in backups + glob.glob(cls._sibling_pattern(code_dir, "staging")):
+            shutil.rmtree(leftover, ignore_errors=True)
+
+    @property
+    def files(self) -> List[str]:
+        """Paths staged so far."""
+        with self._lock:
+            return sorted(self._files)
+
+    def stage(self, filename: str, content: str) -> str:
+        """
+        Stage a file; a later write to the same path replaces this one.
+
+        Raises:
+            ValueError: If the path would escape the code directory
+
+        Returns:
+            The normalized relative path
+        """
+        path = os.path.relpath(safe_join(self.code_dir, filename), self.code_dir).replace(os.sep, "/")
+        data = content.encode("utf-8")
+        digest = _digest(data)
+        with self._lock:
+            self.stats["staged"] += 1
+            if path in self._files:
+                self.stats["rewrites"] += 1
+            self._files[path] = digest
+            self._blobs.setdefault(digest, data)
+        return path
+
+    def discard(self) -> None:
+        """Drop every staged write; the code directory is left as it was."""
+        with self._lock:
+            self._files.clear()
+            self._blobs.clear()
+
+    def commit(self) -> Dict[str, Any]:
+        """
+        Write the staged files, replacing the code directory in one step.
+
+        Files already on disk and not staged are kept. Nothing is touched if
+        every staged file matches the disk.
+
+        Returns:
+            Counters: files staged, rewrites of the same path, files written,
+            files skipped as unchanged, and bytes written
+        """
+        with span("commit_writes", "io", code_dir=self.code_dir) as traced:
+            stats = self._commit()
+            if traced:
+                traced.attributes.update(stats)
+        return stats
+
+    def _commit(self) -> Dict[str, Any]:
+        with self._lock:
+            files = dict(self._files)
+            blobs = dict(self._blobs)
+            self._files.clear()
+            self._blobs.clear()
+
+        changed = {}
+        for path, digest in files.items():
+            if _file_digest(os.path.join(self.code_dir, path)) == digest:
+                self.stats["unchanged"] += 1
+            else:
+                changed[path] = blobs[digest]
+        if not changed:
+            return dict(self.stats)
+
+        parent, name = os.path.split(self.code_dir)
+        os.makedirs(parent or ".", exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent or ".", prefix=f".{name}.staging-")
+        try:
+            if os.path.isdir(self.code_dir):
+                self._link_tree(self.code_dir, staging, skip=set(changed))
+            for path, data in changed.items():
+                target = os.path.join(staging, path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    f.write(data)
+
+            if os.path.isdir(self.code_dir):
+                backup = tempfile.mkdtemp(dir=parent or ".", prefix=f".{name}.old-")
+                os.rmdir(backup)
+                os.rename(self.code_dir, backup)
+                os.rename(staging, self.code_dir)
+                self._move_kept(backup, self.code_dir, skip=set(changed))
+                shutil.rmtree(backup, ignore_errors=True)
+            else:
+                os.rename(staging, self.code_dir)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.stats["written"] += len(changed)
+        self.stats["bytes_written"] += sum(len(data) for data in changed.values())
+        return dict(self.stats)
+
+    @staticmethod
+    def _kept(relative: str, changed: set) -> bool:
+        """True for a directory the build does not own: moved as a whole instead of relinked."""
+        if os.path.basename(relative) not in SKIP_DIRS:
+            return False
+        prefix = relative.replace(os.sep, "/") + "/"
+        return not any(path.startswith(prefix) for path in changed)
+
+    @classmethod
+    def _move_kept(cls, source: str, target: str, skip: set) -> None:
+        """Move the kept directories of the old tree `source` into the new tree `target`."""
+        for root, dirs, _ in os.walk(source):
+            relative_root = os.path.relpath(root, source)
+            for name in list(dirs):
+                relative = os.path.normpath(os.path.join(relative_root, name))
+                if os.path.islink(os.path.join(root, name)) or not cls._kept(relative, skip):
+                    continue
+                dirs.remove(name)
+                destination = os.path.join(target, relative)
+                if os.path.isdir(os.path.dirname(destination)) and not os.path.lexists(destination):
+                    os.rename(os.path.join(root, name), destination)
+
+    @classmethod
+    def _link_tree(cls, source: str, target: str, skip: set) -> None:
+        """
+        Recreate `source` under `target` with hard links (copies where links
+        are not possible). Symlinks are recreated as symlinks; kept
+        directories are left for _move_kept().
+        """
+        for root, dirs, filenames in os.walk(source):
+            relative_root = os.path.relpath(root, source)
+            os.makedirs(os.path.join(target, relative_root), exist_ok=True)
+            for name in list(dirs):
+                relative = os.path.normpath(os.path.join(relative_root, name))
+                src = os.path.join(root, name)
+                if os.path.islink(src):
+                    # os.walk does not descend into directory symlinks
+                    os.symlink(os.readlink(src), os.path.join(target, relative))
+                elif cls._kept(relative, skip):
+                    dirs.remove(name)
+            for filename in filenames:
+                relative = os.path.normpath(os.path.join(relative_root, filename))
+                if relative.replace(os.sep, "/") in skip:
+                    continue
+                src = os.path.join(root, filename)
+                dst = os.path.join(target, relative)
+                try:
+                    if os.path.islink(src):
+                        raise OSError("copy symlinks instead of linking them")
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy2(src, dst, follow_symlinks=False)